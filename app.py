@@ -1,5 +1,7 @@
 from middleware import configure_error_handlers, configure_security_headers
-from extensions import limiter, csrf
+from extensions import limiter, csrf, login_attempts, password_hasher, dashboard_cache, audit_queue
+from database import init_db
+from utils.actor import roles
 from dotenv import load_dotenv
 from config import config
 from flask import Flask
@@ -14,6 +16,12 @@ def create_app(config_name='default'):
     app.config.from_object(config[config_name])
     limiter.init_app(app)
     csrf.init_app(app)
+    login_attempts.init_app(app)
+    password_hasher.init_app(app)
+    dashboard_cache.init_app(app)
+    init_db(app)
+    roles.init_app(app)
+    audit_queue.init_app(app)
 
     # middleware
     configure_security_headers(app)
@@ -35,10 +43,19 @@ def create_app(config_name='default'):
     
     limiter.limit("10 per minute")(transaction_bp.route('/transfer', methods=['POST']))
     limiter.limit("10 per minute")(transaction_bp.route('/deposit', methods=['POST']))
+    limiter.limit("5 per minute")(transaction_bp.route('/transfer/batch', methods=['POST']))
+    limiter.limit("5 per minute")(transaction_bp.route('/statement'))
     app.register_blueprint(transaction_bp)
     
+    # a full export holds a connection for as long as the download runs
+    limiter.limit("2 per minute")(admin_bp.route('/admin/audit/export'))
     app.register_blueprint(admin_bp)
 
+    # scraped every few seconds, keep it out of the default limits
+    from routes.ops import ops_bp
+    limiter.exempt(ops_bp)
+    app.register_blueprint(ops_bp)
+
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,148 @@
+"""
+Dashboard reads per process: request threads vs. an event loop with a DB I/O pool.
+
+The numbers behind serving the app synchronously only (gunicorn gthread, no ASGI
+mode). Both modes do the DB work of one dashboard view, the shell's own accounts
+plus the lazily loaded transactions panel (the loaders of routes/main.py), on a
+connection checked out from the same ConnectionPool with the RLS context set,
+against the stand-in DB with --latency per round trip. Both get --threads
+threads that may talk to the database, so both hold the same connections:
+
+  sync   --threads request threads, each serving one dashboard at a time
+  async  one event loop with --clients dashboards in flight; every blocking
+         call (checkout, each procedure, release) is handed to an I/O pool of
+         --threads threads, pyodbc has no async API. At most --threads
+         checkouts at once, more would block the I/O threads the connection
+         holders need
+
+    python -m benchmarks.async_dashboard --mode sync --threads 8
+    python -m benchmarks.async_dashboard --mode async --threads 8 --clients 8
+    python -m benchmarks.async_dashboard --mode async --threads 8 --clients 64
+
+Run one mode per process, peak RSS is process-wide. In sync mode clients beyond
+the request threads wait in the listen backlog; their latency is estimated with
+Little's law for --clients waiting clients.
+"""
+import argparse
+import asyncio
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import report
+from benchmarks.datagen import generate
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def build(args):
+    from app import create_app
+    from benchmarks.standin import StandInDatabase
+    app = create_app('benchmark')
+    db = StandInDatabase(latency=0)
+    conn = db.connect()
+    user_ids = generate(conn, args.users, transfers_per_user=10)
+    conn.close()
+    db.latency = args.latency
+    app.config.update(DB_CONNECT=db.connect, DB_POOL_SIZE=args.threads)
+    return app, user_ids
+
+def panels(app, user_id):
+    from routes.main import _accounts_panel, _transactions_panel
+    return [_accounts_panel(user_id), _transactions_panel(user_id, app.config['DASHBOARD_TRANSACTIONS'])]
+
+def run_sync(app, pool, user_ids, args, deadline):
+    latencies = []  # list.append is atomic
+
+    def serve(n):
+        i = n
+        while time.perf_counter() < deadline:
+            user_id = user_ids[i % len(user_ids)]
+            i += args.threads
+            started = time.perf_counter()
+            with app.app_context(), pool.acquire(user_id, 2) as conn:
+                cursor = conn.cursor()
+                for load in panels(app, user_id):
+                    load(cursor)
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=serve, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+async def run_async(app, pool, user_ids, args, deadline):
+    loop = asyncio.get_running_loop()
+    io_pool = ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix='db-io')
+    checkouts = asyncio.Semaphore(args.threads)
+    latencies = []
+
+    def in_app(fn, *fn_args):
+        with app.app_context():
+            return fn(*fn_args)
+
+    async def client(n):
+        i = n
+        while time.perf_counter() < deadline:
+            user_id = user_ids[i % len(user_ids)]
+            i += args.clients
+            started = time.perf_counter()
+            async with checkouts:
+                conn = await loop.run_in_executor(io_pool, pool.acquire, user_id, 2)
+                try:
+                    cursor = conn.cursor()
+                    for load in panels(app, user_id):
+                        await loop.run_in_executor(io_pool, in_app, load, cursor)
+                finally:
+                    await loop.run_in_executor(io_pool, conn.close)
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        await asyncio.gather(*(client(n) for n in range(args.clients)))
+    finally:
+        io_pool.shutdown(wait=True)
+    return latencies
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--threads', type=int, default=8, help='threads that may use the database, both modes')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent dashboard requests')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=0.005, help='stand-in seconds per DB round trip')
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    app, user_ids = build(args)
+    from database import get_pool
+    with app.app_context():
+        pool = get_pool()
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    if args.mode == 'sync':
+        latencies = run_sync(app, pool, user_ids, args, deadline)
+    else:
+        latencies = asyncio.run(run_async(app, pool, user_ids, args, deadline))
+    elapsed = time.perf_counter() - started
+    peak = peak_rss_mb()
+
+    rate = len(latencies) / elapsed
+    latencies.sort()
+    in_flight = args.threads if args.mode == 'sync' else args.clients
+    print(f"{args.mode}: {args.threads} DB threads, {in_flight} dashboards in flight, {args.latency * 1000:.0f} ms per round trip")
+    print(f"  dashboards/sec   {rate:,.0f}")
+    if latencies:
+        print(f"  p50 / p99 ms     {report.percentile(latencies, 50) * 1000:.1f} / {report.percentile(latencies, 99) * 1000:.1f}"
+              + (f" (served), ~{args.clients / rate * 1000:.0f} for {args.clients} waiting clients"
+                 if args.mode == 'sync' and rate and args.clients > args.threads else ''))
+    print(f"  peak RSS MiB     {peak:.1f} (+{peak - baseline:.1f} over the seeded baseline)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
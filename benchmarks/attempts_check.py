@@ -0,0 +1,189 @@
+"""
+Checks for the failed-login lockout (utils/attempts.py), per attempt store.
+
+The same scenario runs against every store that is available:
+
+  memory     MemoryAttemptStore on a fake clock, so expiry is checked without waiting
+  fakeredis  RedisAttemptStore on fakeredis.FakeRedis, which runs the Lua scripts
+             (pip install "fakeredis[lua]"; skipped when it isn't installed)
+  redis      RedisAttemptStore on --redis-url (skipped when the server can't be reached)
+
+Scenario: the first failure arms the expiry, the failure that reaches
+MAX_LOGIN_ATTEMPTS re-arms it to the full lockout, emails are counted case and
+whitespace insensitive, failures past the limit don't extend the lockout,
+reset() clears the counter and the counter expires on its own. Also checked:
+the memory store's LRU bound, that a Redis error neither locks anyone out nor
+fails the login, and through the app on the stand-in DB the lockout message
+and that a successful login clears the counter.
+
+    python -m benchmarks.attempts_check
+    python -m benchmarks.attempts_check --redis-url redis://localhost:6379
+
+Exit code 1 if any check fails.
+"""
+import argparse
+import math
+import re
+import sys
+import time
+
+from utils.attempts import AttemptTracker, MemoryAttemptStore, RedisAttemptStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class Checks:
+    def __init__(self):
+        self.failed = 0
+
+    def check(self, name, ok, detail=''):
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}" + (f"  ({detail})" if detail and not ok else ''))
+        if not ok:
+            self.failed += 1
+
+def scenario(checks, tracker, advance, lockout):
+    """The lockout policy on one store; advance(seconds) moves its time forward"""
+    tracker.lockout_seconds = lockout
+    max_attempts = tracker.max_attempts
+    email, key = '  Check@Example.COM ', 'check@example.com'
+    tracker.reset(email)
+
+    left, locked = tracker.record_failure(email)
+    checks.check('first failure counts once, not locked', (left, locked) == (max_attempts - 1, 0), f'{left}, {locked}')
+    count, ttl = tracker.store.status(key)
+    checks.check('first failure arms the expiry', (count, ttl) == (1, lockout), f'{count}, {ttl}')
+
+    advance(lockout // 2)
+    for _ in range(max_attempts - 1):
+        left, locked = tracker.record_failure(email.strip())
+    checks.check('the locking failure re-arms the full lockout', (left, locked) == (0, lockout), f'{left}, {locked}')
+    locked_for = tracker.locked_for(key.upper())
+    checks.check('locked, whatever the case of the email', locked_for == lockout, locked_for)
+    if lockout % 60 == 0:
+        minutes = math.ceil(locked_for / 60)
+        checks.check('lockout message shows the configured minutes', minutes == lockout // 60, minutes)
+
+    advance(1)
+    left, locked = tracker.record_failure(email)
+    checks.check('failures past the limit stay locked', left < 0 and 0 < locked < lockout, f'{left}, {locked}')
+
+    tracker.reset(email)
+    checks.check('reset() clears the lockout', tracker.locked_for(email) == 0)
+    left, _ = tracker.record_failure(email)
+    checks.check('after reset() the count starts over', left == max_attempts - 1, left)
+
+    advance(lockout + 1)
+    checks.check('the counter expires on its own', tracker.store.status(key) == (0, 0), tracker.store.status(key))
+    tracker.reset(email)
+
+def check_memory(checks, max_attempts):
+    print("memory")
+    clock = FakeClock()
+    tracker = AttemptTracker(MemoryAttemptStore(clock=clock), max_attempts=max_attempts)
+    scenario(checks, tracker, clock.advance, 300)
+
+    store = MemoryAttemptStore(max_entries=3, clock=clock)
+    for key in ('a', 'b', 'c'):
+        store.incr(key, 60, max_attempts)
+    store.incr('a', 60, max_attempts)   # 'b' is now the least recently attempted
+    store.incr('d', 60, max_attempts)
+    checks.check('LRU bound drops the least recently attempted email',
+                 store.status('b') == (0, 0) and store.status('a')[0] == 2, store.status('b'))
+
+def check_redis(checks, name, client, max_attempts):
+    print(name)
+    # real seconds on a server clock: a short lockout keeps the run quick
+    tracker = AttemptTracker(RedisAttemptStore(client, prefix='ironvault:attempts_check:'), max_attempts=max_attempts)
+    scenario(checks, tracker, time.sleep, 3)
+
+def check_store_errors(checks, max_attempts):
+    print("redis unreachable")
+    # nothing listens on port 1, every call fails with a connection error
+    tracker = AttemptTracker(RedisAttemptStore.from_url('redis://127.0.0.1:1'), max_attempts=max_attempts)
+    checks.check('locked_for() lets the login through', tracker.locked_for('a@b.c') == 0)
+    checks.check('record_failure() reports nothing recorded', tracker.record_failure('a@b.c') == (max_attempts, 0))
+    try:
+        tracker.reset('a@b.c')
+        checks.check('reset() does not raise', True)
+    except Exception as e:
+        checks.check('reset() does not raise', False, e)
+
+def check_login_route(checks):
+    print("/login on the stand-in DB")
+    from benchmarks.loadtest import build_app
+    from benchmarks.datagen import bench_email, BENCH_PASSWORD
+    from extensions import login_attempts
+
+    app = build_app('standin', 2, 0)
+    app.config['WTF_CSRF_ENABLED'] = False
+    login_attempts.store = MemoryAttemptStore()
+    client = app.test_client()
+    email = bench_email(0)
+
+    def login(password):
+        response = client.post('/login', data={'email': email, 'password': password})
+        return response.status_code, response.get_data(as_text=True)
+
+    login('wrong')
+    login('wrong')
+    status, _ = login(BENCH_PASSWORD)
+    checks.check('a successful login signs in', status == 302, status)
+    _, page = login('wrong')
+    remaining = re.search(r'(\d+) attempt\(s\) remaining', page)
+    remaining = remaining and int(remaining.group(1))
+    checks.check('a successful login clears the failures', remaining == login_attempts.max_attempts - 1, remaining)
+
+    for _ in range(login_attempts.max_attempts - 1):
+        login('wrong')
+    _, page = login(BENCH_PASSWORD)
+    minutes = re.search(r'Try again in (\d+) minute', page)
+    minutes = minutes and int(minutes.group(1))
+    checks.check('a locked account is refused with the configured minutes',
+                 minutes == app.config['LOCKOUT_MINUTES'], minutes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--redis-url', help='also check against this redis server')
+    parser.add_argument('--max-attempts', type=int, default=5, help='MAX_LOGIN_ATTEMPTS')
+    parser.add_argument('--no-app', action='store_true', help='skip the /login checks on the stand-in DB')
+    args = parser.parse_args(argv)
+
+    checks = Checks()
+    check_memory(checks, args.max_attempts)
+
+    try:
+        import fakeredis
+    except ImportError:
+        print('fakeredis: skipped, not installed')
+    else:
+        check_redis(checks, 'fakeredis', fakeredis.FakeRedis(), args.max_attempts)
+
+    if args.redis_url:
+        import redis
+        client = redis.Redis.from_url(args.redis_url, socket_timeout=1)
+        try:
+            client.ping()
+        except redis.RedisError as e:
+            print(f'redis: skipped, {args.redis_url} unreachable ({e})')
+        else:
+            check_redis(checks, 'redis', client, args.max_attempts)
+
+    check_store_errors(checks, args.max_attempts)
+    if not args.no_app:
+        check_login_route(checks)
+
+    if checks.failed:
+        print(f"FAILED: {checks.failed} check(s)", file=sys.stderr)
+        return 1
+    print("OK: all checks passed")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
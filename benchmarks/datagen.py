@@ -0,0 +1,173 @@
+"""
+Synthetic data for the IronVault benchmarks.
+
+Procedure path (default): users, accounts, deposits and transfers all go through
+the real stored procedures, so encryption, the blind index and the audit rows are
+exactly what production writes.
+Bulk path (--bulk): users and accounts still go through sp_CreateAccount (the
+encryption happens server side), but the transaction history is inserted in
+batches with fast_executemany. This needs a login that may INSERT into
+[Transaction], e.g. ironvault_dba_login in DB_USERNAME. Those rows skip the
+procedures, so Account_Daily_Activity is rebuilt for them afterwards.
+
+    python -m benchmarks.datagen --users 1000 --transfers 20
+    python -m benchmarks.datagen --users 1000 --transfers 500 --bulk
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+from config import Config
+from utils.passwords import scrypt_hash
+
+BENCH_PASSWORD = 'Bench@12345'
+# one salt for every bench user, so the (deliberately slow) scrypt runs once per seeding
+BENCH_SALT = 'ironvault-bench-salt'
+
+def bench_email(i):
+    return f'bench{i}@ironvault.test'
+
+def create_users(conn, count, start=0):
+    """Register bench users through sp_CreateAccount, returns their UserIDs"""
+    cursor = conn.cursor()
+    user_ids = []
+    # the configured cost, so bench logins don't all rehash
+    password_hash = scrypt_hash(BENCH_PASSWORD, BENCH_SALT, Config.PASSWORD_SCRYPT_LN,
+                                Config.PASSWORD_SCRYPT_R, Config.PASSWORD_SCRYPT_P)
+    for i in range(start, start + count):
+        cursor.execute("""
+            EXEC dbo.sp_CreateAccount
+                @UserName = ?,
+                @Email = ?,
+                @PasswordHash = ?,
+                @Salt = ?,
+                @RoleID = 2
+        """, (f'Bench User {i}', bench_email(i), password_hash, BENCH_SALT))
+        user_ids.append(cursor.fetchone()[0])
+        conn.commit()
+    cursor.close()
+    return user_ids
+
+def seed_deposits(conn, user_ids, amount):
+    cursor = conn.cursor()
+    for user_id in user_ids:
+        cursor.execute(
+            "EXEC dbo.sp_Deposit @UserID = ?, @Amount = ?, @ActorIP = ?",
+            (user_id, amount, '10.0.0.1')
+        )
+        conn.commit()
+    cursor.close()
+
+def seed_transfers(conn, user_ids, per_user, rng):
+    """Real transfers between random bench users (account number is 100-<UserID>)"""
+    cursor = conn.cursor()
+    for user_id in user_ids:
+        for _ in range(per_user):
+            receiver = rng.choice(user_ids)
+            if receiver == user_id:
+                continue
+            cursor.execute(
+                "EXEC dbo.sp_TransferFunds @SenderUserID = ?, @ReceiverAccNumber = ?, @Amount = ?, @ActorIP = ?",
+                (user_id, f'100-{receiver}', round(rng.uniform(1, 20), 2), '10.0.0.1')
+            )
+            conn.commit()
+    cursor.close()
+
+def bulk_transactions(conn, account_ids, count, rng, batch_size=10000):
+    """Insert `count` history rows directly, balances are left untouched"""
+    def rows():
+        for _ in range(count):
+            sender, receiver = rng.sample(account_ids, 2)
+            yield (sender, receiver, Decimal(rng.randint(100, 50000)) / 100, 'TRANSFER', 'Online Transfer')
+
+    # the stand-in has no INSERT support, it takes the rows directly
+    standin = getattr(conn, 'db', None)
+    if standin is not None and hasattr(standin, 'bulk_insert_transactions'):
+        standin.bulk_insert_transactions(rows())
+        return
+
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    batch = []
+    for row in rows():
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(
+                "INSERT INTO [Transaction] (SenderAccountID, ReceiverAccountID, Amount, Transaction_Type, Description) VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+            conn.commit()
+            batch = []
+    if batch:
+        cursor.executemany(
+            "INSERT INTO [Transaction] (SenderAccountID, ReceiverAccountID, Amount, Transaction_Type, Description) VALUES (?, ?, ?, ?, ?)",
+            batch
+        )
+        conn.commit()
+    cursor.close()
+
+def rebuild_activity(conn, since):
+    """Recount the daily aggregates from `since` on, the bulk rows bypassed the procedures"""
+    cursor = conn.cursor()
+    cursor.execute("EXEC dbo.sp_RebuildAccountActivity @From = ?", (since,))
+    cursor.fetchall()
+    conn.commit()
+    cursor.close()
+
+def account_ids_for(conn, user_ids):
+    cursor = conn.cursor()
+    ids = []
+    for user_id in user_ids:
+        cursor.execute("EXEC dbo.sp_GetAccountsByUser @UserID = ?", (user_id,))
+        ids.extend(row[0] for row in cursor.fetchall())
+    cursor.close()
+    return ids
+
+def generate(conn, users, transfers_per_user=5, deposit=1000, bulk=False, seed=42, start=0):
+    """Populate a database, returns the bench UserIDs"""
+    rng = random.Random(seed)
+
+    # admin context so RLS lets the seeding see every account
+    cursor = conn.cursor()
+    cursor.execute(
+        "EXEC sp_set_session_context @key = N'user_id', @value = ?; "
+        "EXEC sp_set_session_context @key = N'role_id', @value = ?;",
+        (0, 1)
+    )
+    cursor.close()
+
+    user_ids = create_users(conn, users, start)
+    seed_deposits(conn, user_ids, deposit)
+    if bulk:
+        since = date.today()
+        bulk_transactions(conn, account_ids_for(conn, user_ids), users * transfers_per_user, rng)
+        rebuild_activity(conn, since)
+    else:
+        seed_transfers(conn, user_ids, transfers_per_user, rng)
+    return user_ids
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transfers', type=int, default=5, help='transfers per user')
+    parser.add_argument('--deposit', type=float, default=1000, help='opening deposit per user')
+    parser.add_argument('--start', type=int, default=0, help='first bench user number, to append to an existing set')
+    parser.add_argument('--bulk', action='store_true', help='insert the history with fast_executemany')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    import pyodbc
+    from database import build_connection_string
+
+    conn = pyodbc.connect(build_connection_string(vars(Config)))
+    started = time.perf_counter()
+    user_ids = generate(conn, args.users, args.transfers, args.deposit, args.bulk, args.seed, args.start)
+    conn.close()
+    print(f"Created {len(user_ids)} users in {time.perf_counter() - started:.1f}s "
+          f"(login: {bench_email(args.start)} / {BENCH_PASSWORD})")
+
+if __name__ == '__main__':
+    sys.exit(main())
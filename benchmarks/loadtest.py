@@ -0,0 +1,266 @@
+"""
+Load test for the IronVault routes.
+
+Each worker thread logs in as its own bench user (real CSRF token scraped from
+the form) and then loops over /dashboard (shell + transactions panel), /deposit
+and /transfer in the given mix.
+Ends with p50/p95/p99 and requests per second per endpoint.
+
+Backends:
+  standin    in-process app on the in-memory stand-in DB (no SQL Server needed),
+             seeded with benchmarks.datagen first
+  sqlserver  in-process app on the configured database (seed it with
+             `python -m benchmarks.datagen` first)
+  --url      a running server over HTTP instead of the Flask test client
+
+    python -m benchmarks.loadtest --concurrency 8 --duration 20
+    python -m benchmarks.loadtest --json baseline.json
+    python -m benchmarks.loadtest --baseline baseline.json --max-regression 0.2
+    python -m benchmarks.loadtest --url http://localhost:5000 --concurrency 16
+    python -m benchmarks.loadtest --replica     # reads on a read-only stand-in target, prints the routing counters
+"""
+import argparse
+import http.cookiejar
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks import report
+from benchmarks.datagen import BENCH_PASSWORD, bench_email
+
+CSRF_RE = re.compile(r'name="csrf_token" value="([^"]+)"')
+ACC_NUMBER_RE = re.compile(r'Account Number:\s*([\w-]+)')
+
+class TestClient:
+    """Flask test client, one per worker (cookies are per client)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        resp = self.client.get(path)
+        return resp.status_code, resp.get_data(as_text=True)
+
+    def post(self, path, data):
+        resp = self.client.post(path, data=data)
+        return resp.status_code, resp.get_data(as_text=True)
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # we time the POST itself, the redirect target is measured on its own
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class HttpClient:
+    """Same interface over real HTTP, for a server started with gunicorn or app.py"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect()
+        )
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=30) as resp:
+                return resp.status, resp.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode('utf-8', 'replace')
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data):
+        body = urllib.parse.urlencode(data).encode()
+        return self._open(urllib.request.Request(self.base_url + path, data=body))
+
+class Worker(threading.Thread):
+    def __init__(self, client, email, mix, deadline, samples, accounts, rng):
+        super().__init__(daemon=True)
+        self.client = client
+        self.email = email
+        self.mix = mix
+        self.deadline = deadline
+        self.samples = samples
+        self.accounts = accounts
+        self.rng = rng
+        self.csrf_token = None
+        self.acc_number = None
+        self.error = None
+
+    def timed(self, endpoint, call, *args):
+        started = time.perf_counter()
+        status, body = call(*args)
+        self.samples.append((endpoint, time.perf_counter() - started, status))
+        return status, body
+
+    def scrape(self, body):
+        match = CSRF_RE.search(body)
+        if match:
+            self.csrf_token = match.group(1)
+        match = ACC_NUMBER_RE.search(body)
+        if match and self.acc_number is None:
+            self.acc_number = match.group(1)
+            self.accounts.append(self.acc_number)
+
+    def login(self, attempts=10):
+        for attempt in range(attempts):
+            status, body = self.timed('GET /login', self.client.get, '/login')
+            self.scrape(body)
+            status, body = self.timed('POST /login', self.client.post, '/login', {
+                'csrf_token': self.csrf_token,
+                'email': self.email,
+                'password': BENCH_PASSWORD,
+            })
+            if status != 503:
+                break
+            # the password queue is full (PASSWORD_QUEUE_MAX), try again like a person would
+            time.sleep(self.rng.uniform(0.1, 0.5) * (attempt + 1))
+        if status != 302:
+            raise RuntimeError(f'login failed for {self.email} (HTTP {status})')
+
+    def dashboard(self):
+        status, body = self.timed('GET /dashboard', self.client.get, '/dashboard')
+        self.scrape(body)
+        # the shell only has the balances, the page fetches the history panel right after
+        self.timed('GET /api/dashboard/transactions', self.client.get, '/api/dashboard/transactions')
+
+    def deposit(self):
+        self.timed('POST /deposit', self.client.post, '/deposit', {
+            'csrf_token': self.csrf_token,
+            'amount': f'{self.rng.randint(1, 50)}.00',
+        })
+
+    def transfer(self):
+        others = [acc for acc in list(self.accounts) if acc != self.acc_number]
+        if not others:
+            return self.dashboard()
+        self.timed('POST /transfer', self.client.post, '/transfer', {
+            'csrf_token': self.csrf_token,
+            'receiver_acc': self.rng.choice(others),
+            'amount': f'{self.rng.randint(1, 5)}.00',
+        })
+
+    def run(self):
+        try:
+            self.login()
+            self.dashboard()
+            actions = [getattr(self, name) for name in self.mix]
+            weights = list(self.mix.values())
+            while time.perf_counter() < self.deadline:
+                self.rng.choices(actions, weights)[0]()
+        except Exception as e:
+            self.error = e
+
+def parse_mix(value):
+    """'dashboard=6,deposit=2,transfer=2' -> {'dashboard': 6, ...}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ('dashboard', 'deposit', 'transfer'):
+            raise argparse.ArgumentTypeError(f'unknown action {name!r}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def build_app(backend, users, latency, replica=False):
+    """In-process app for the test client, plus the stand-in DB when used"""
+    from app import create_app
+    app = create_app('benchmark')
+
+    if backend == 'standin':
+        from benchmarks.datagen import generate
+        from benchmarks.standin import StandInDatabase
+        db = StandInDatabase(latency=latency)
+        conn = db.connect()
+        generate(conn, users, transfers_per_user=5)
+        conn.close()
+        app.config['DB_CONNECT'] = db.connect
+        if replica:
+            # reads are routed to a read-only stand-in target, writes hitting it would fail
+            app.config['DB_READ_CONNECT'] = db.connect_replica
+    return app
+
+def print_read_routing():
+    """Where the reads went, from the same counters /metrics exposes"""
+    from utils.instrumentation import metrics
+    for line in metrics.render().splitlines():
+        if line.startswith(('ironvault_db_read_route_total', 'ironvault_db_replica_fallbacks_total')):
+            print(line)
+
+def run(args):
+    mix = parse_mix(args.mix)
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        app = build_app(args.backend, max(args.users, args.concurrency), args.latency, args.replica)
+        make_client = lambda: TestClient(app)
+
+    samples = []     # list.append is atomic, no lock needed
+    accounts = []
+    deadline = time.perf_counter() + args.warmup + args.duration
+    workers = [
+        Worker(make_client(), bench_email(i % args.users), mix, deadline, samples, accounts, random.Random(args.seed + i))
+        for i in range(args.concurrency)
+    ]
+    for w in workers:
+        w.start()
+
+    # drop what was recorded during warm-up (logins, cold pool, first compiles)
+    if args.warmup:
+        time.sleep(args.warmup)
+        warm = len(samples)
+    else:
+        warm = 0
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    for w in workers:
+        if w.error:
+            print(f"worker {w.email}: {w.error}", file=sys.stderr)
+    return report.summarize(samples[warm:], elapsed), elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['standin', 'sqlserver'], default='standin')
+    parser.add_argument('--url', help='drive a running server over HTTP instead')
+    parser.add_argument('--users', type=int, default=50, help='bench users to log in as (seeded for the stand-in)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds before measuring starts')
+    parser.add_argument('--mix', default='dashboard=6,deposit=2,transfer=2')
+    parser.add_argument('--latency', type=float, default=0.001, help='stand-in seconds per DB round trip')
+    parser.add_argument('--replica', action='store_true', help='stand-in: route reads to a read-only replica target')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write the summary to this file')
+    parser.add_argument('--baseline', help='compare with a summary saved by --json')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    summary, elapsed = run(args)
+    print(report.format_table(summary))
+    if args.replica and not args.url:
+        print_read_routing()
+
+    if args.json:
+        report.save(summary, args.json, meta={
+            'backend': 'http' if args.url else args.backend,
+            'concurrency': args.concurrency,
+            'duration': round(elapsed, 2),
+            'mix': args.mix,
+        })
+    if args.baseline:
+        failures = report.compare(summary, report.load(args.baseline), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
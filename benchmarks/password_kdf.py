@@ -0,0 +1,104 @@
+"""
+Pick the scrypt cost for this hardware: login latency under a spike, per cost.
+
+For each ln (N = 2**ln) a burst of --concurrency simultaneous logins, --logins each,
+verifies passwords through utils.passwords.PasswordHasher with --workers threads and
+--queue-max, like the app does. A login's latency includes its wait in the queue;
+logins turned away by the queue bound are counted, not timed.
+
+    python -m benchmarks.password_kdf --target-p99-ms 250
+    python -m benchmarks.password_kdf --workers 4 --concurrency 64 --ln 14-17
+
+The recommendation is the highest cost whose p99 stays under the target with no
+more than --max-rejected of the logins turned away. Run it on the deployment
+hardware with the production PASSWORD_WORKERS, then set PASSWORD_SCRYPT_LN.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from utils.passwords import PasswordHasher, PasswordBusy, scrypt_hash
+
+SALT = 'calibration-salt'
+PASSWORD = 'Calibrate@12345'
+
+def spike(hasher, stored, concurrency, logins):
+    """(sorted latencies in ms, rejected) of `concurrency` threads logging in at once"""
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency)
+
+    def client():
+        mine = []
+        turned_away = 0
+        start.wait()
+        for _ in range(logins):
+            started = time.perf_counter()
+            try:
+                assert hasher.verify(PASSWORD, SALT, stored)
+            except PasswordBusy:
+                turned_away += 1
+                continue
+            mine.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(mine)
+            rejected[0] += turned_away
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return latencies, rejected[0]
+
+def percentile(values, q):
+    return values[min(int(len(values) * q), len(values) - 1)] if values else float('nan')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ln', default='13-17', help='range of log2(N) to try, e.g. 14-16')
+    parser.add_argument('--r', type=int, default=8)
+    parser.add_argument('--p', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_WORKERS')
+    parser.add_argument('--queue-max', type=int, default=32, help='PASSWORD_QUEUE_MAX')
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous logins')
+    parser.add_argument('--logins', type=int, default=5, help='per simultaneous client')
+    parser.add_argument('--target-p99-ms', type=float, default=250)
+    parser.add_argument('--max-rejected', type=float, default=0.0, help='share of logins that may be turned away')
+    args = parser.parse_args(argv)
+
+    low, _, high = args.ln.partition('-')
+    lns = range(int(low), int(high or low) + 1)
+    total = args.concurrency * args.logins
+    print(f"{args.concurrency} simultaneous logins x {args.logins}, {args.workers} workers, queue max {args.queue_max}")
+
+    best = None
+    for ln in lns:
+        hasher = PasswordHasher(ln, args.r, args.p, workers=args.workers, queue_max=args.queue_max, timeout=60)
+        started = time.perf_counter()
+        stored = scrypt_hash(PASSWORD, SALT, ln, args.r, args.p)
+        single = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        latencies, rejected = spike(hasher, stored, args.concurrency, args.logins)
+        elapsed = time.perf_counter() - started
+        memory = args.workers * 128 * args.r * 2 ** ln / 1024 / 1024
+        p99 = percentile(latencies, 0.99)
+        ok = latencies and p99 <= args.target_p99_ms and rejected / total <= args.max_rejected
+        print(f"  ln={ln:<3} one hash {single:7.1f} ms | p50 {percentile(latencies, 0.5):7.1f} ms, "
+              f"p99 {p99:7.1f} ms, {len(latencies) / elapsed:6.1f} logins/s, {rejected} rejected, "
+              f"~{memory:.0f} MiB hashing {'ok' if ok else ''}")
+        if ok:
+            best = ln
+
+    if best is None:
+        print(f"no cost meets p99 <= {args.target_p99_ms:.0f} ms, add workers (cores) or lower the target")
+        return 1
+    print(f"\nPASSWORD_SCRYPT_LN={best}  PASSWORD_SCRYPT_R={args.r}  PASSWORD_WORKERS={args.workers}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Per-request overhead of the rate limiter storages (RATELIMIT_STORAGE_URI).
+
+Every simulated request hits all of --limits for one key, the way Flask-Limiter
+checks the default limits plus a route's own, through the same limits strategy
+(fixed window) and storages the app uses:
+
+    python -m benchmarks.ratelimit_overhead
+    python -m benchmarks.ratelimit_overhead --modes redis,hybrid --redis-url redis://cache:6379 --threads 8
+    python -m benchmarks.ratelimit_overhead --keys 1       # everyone on one key, worst case for redis
+
+memory is the floor (no sharing between workers), redis is one round trip per limit,
+hybrid+redis counts locally and syncs in the background. Redis modes are skipped
+when the server can't be reached.
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from limits import parse_many
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import utils.ratelimit  # noqa: F401, registers hybrid+redis://
+
+def storage_uri(mode, redis_url):
+    if mode == 'memory':
+        return 'memory://'
+    if mode == 'redis':
+        return redis_url
+    return 'hybrid+' + redis_url
+
+def run(limiter, items, keys, requests, threads):
+    """Per-request latencies in µs, (allowed, denied)"""
+    latencies = []
+    counts = [0, 0]
+    lock = threading.Lock()
+
+    def worker(n):
+        mine = []
+        allowed = denied = 0
+        for i in range(requests):
+            key = f'user:{(n * requests + i) % keys}'
+            started = time.perf_counter()
+            ok = all([limiter.hit(item, 'bench', key) for item in items])
+            mine.append((time.perf_counter() - started) * 1e6)
+            if ok:
+                allowed += 1
+            else:
+                denied += 1
+        with lock:
+            latencies.extend(mine)
+            counts[0] += allowed
+            counts[1] += denied
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies, counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='memory,redis,hybrid', help='comma separated: memory, redis, hybrid')
+    parser.add_argument('--redis-url', default='redis://localhost:6379')
+    parser.add_argument('--limits', default='200 per day;50 per hour;10 per minute',
+                        help='checked on every request, RATELIMIT_DEFAULT plus a route limit')
+    parser.add_argument('--requests', type=int, default=20000, help='per thread')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--keys', type=int, default=1000, help='distinct users')
+    parser.add_argument('--sync-interval', type=float, default=0.25, help='hybrid only')
+    args = parser.parse_args(argv)
+
+    items = parse_many(args.limits)
+    total = args.requests * args.threads
+    print(f"{total} requests x {len(items)} limits, {args.threads} threads, {args.keys} keys")
+    for mode in args.modes.split(','):
+        mode = mode.strip()
+        options = {'sync_interval': args.sync_interval} if mode == 'hybrid' else {}
+        try:
+            storage = storage_from_string(storage_uri(mode, args.redis_url), **options)
+            if not storage.check():
+                raise ConnectionError(f"no answer from {args.redis_url}")
+            storage.reset()
+        except Exception as e:
+            print(f"  {mode:<7} skipped: {e}")
+            continue
+
+        started = time.perf_counter()
+        latencies, (allowed, denied) = run(FixedWindowRateLimiter(storage), items, args.keys, args.requests, args.threads)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        print(f"  {mode:<7} {statistics.mean(latencies):8.1f} µs/request mean, "
+              f"p50 {latencies[len(latencies) // 2]:.1f}, p99 {latencies[int(len(latencies) * 0.99)]:.1f}, "
+              f"{total / elapsed:,.0f} req/s, {allowed} allowed / {denied} denied")
+        if mode == 'hybrid':
+            started = time.perf_counter()
+            synced = storage.sync()
+            print(f"          final sync: {synced} keys in {(time.perf_counter() - started) * 1000:.1f} ms")
+        storage.reset()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
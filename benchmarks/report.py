@@ -0,0 +1,78 @@
+"""
+Latency / throughput report for the load tests.
+
+Samples are (endpoint, seconds, status) tuples. Percentiles use the nearest-rank
+method so small runs give real observed values, not interpolated ones.
+"""
+import json
+import math
+from collections import defaultdict
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(samples, elapsed):
+    """Per-endpoint stats, plus an 'ALL' row"""
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    for endpoint, seconds, status in samples:
+        by_endpoint[endpoint].append(seconds)
+        by_endpoint['ALL'].append(seconds)
+        if status >= 500:
+            errors[endpoint] += 1
+            errors['ALL'] += 1
+
+    summary = {}
+    for endpoint, values in by_endpoint.items():
+        values.sort()
+        summary[endpoint] = {
+            'requests': len(values),
+            'errors': errors[endpoint],
+            'rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2),
+        }
+    return summary
+
+def format_table(summary):
+    header = f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    lines = [header, '-' * len(header)]
+    # ALL goes last
+    for endpoint in sorted(summary, key=lambda e: (e == 'ALL', e)):
+        s = summary[endpoint]
+        lines.append(
+            f"{endpoint:<16}{s['requests']:>10}{s['errors']:>8}{s['rps']:>10}"
+            f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}"
+        )
+    return '\n'.join(lines)
+
+def save(summary, path, meta=None):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta or {}, 'endpoints': summary}, f, indent=2)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['endpoints']
+
+def compare(summary, baseline, max_regression):
+    """
+    Regressions against a saved baseline: p95 slower or rps lower by more than
+    max_regression (0.2 = 20%). Returns a list of messages, empty means pass.
+    """
+    failures = []
+    for endpoint, base in baseline.items():
+        current = summary.get(endpoint)
+        if current is None:
+            continue
+        if base['p95_ms'] and current['p95_ms'] > base['p95_ms'] * (1 + max_regression):
+            failures.append(f"{endpoint}: p95 {current['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if base['rps'] and current['rps'] < base['rps'] * (1 - max_regression):
+            failures.append(f"{endpoint}: {current['rps']} rps vs baseline {base['rps']} rps")
+        if current['errors'] > base['errors']:
+            failures.append(f"{endpoint}: {current['errors']} errors vs baseline {base['errors']}")
+    return failures
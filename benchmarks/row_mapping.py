@@ -0,0 +1,118 @@
+"""
+Cost of turning driver rows into what the routes use: dict(zip(columns, row)) per
+row, as every read did before utils/procedures.py, against its cached row classes.
+
+One page of transaction history (sp_GetTransactionsByUserPage, 12 columns) with
+--rows rows is read from the stand-in DB once; both modes then map the same driver
+rows, replayed from memory, so only the mapping is measured:
+
+  dict   column list from cursor.description, fetchall, a dict per row
+  rows   procedures.fetch_rows: row class by shape, fetchmany batches, a tuple per row
+
+Then the rows are rendered through templates/_transaction_rows.html, the partial
+of the history pages: Jinja tries getattr() first for {{ trans.Amount }}, which
+a dict only answers after an AttributeError. Reported per 100k rows: best-of
+--repeat time to map and to render, and from tracemalloc (a separate, untimed
+run) the memory blocks allocated and kept by the mapped rows.
+
+    python -m benchmarks.row_mapping --rows 100000 --repeat 5
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from utils import procedures
+
+class ReplayCursor:
+    """description + fetch of rows already read from the driver"""
+
+    def __init__(self, description, rows):
+        self.description = description
+        self._rows = rows
+        self._at = 0
+
+    def fetchall(self):
+        rows, self._at = self._rows[self._at:], len(self._rows)
+        return rows
+
+    def fetchmany(self, size):
+        rows = self._rows[self._at:self._at + size]
+        self._at += len(rows)
+        return rows
+
+def driver_rows(count):
+    """(description, rows) of one history page with `count` rows, rows as the driver returns them"""
+    from benchmarks.datagen import generate, account_ids_for, bulk_transactions
+    from benchmarks.standin import StandInDatabase
+    db = StandInDatabase(latency=0)
+    conn = db.connect()
+    user_ids = generate(conn, 2, transfers_per_user=0)
+    bulk_transactions(conn, account_ids_for(conn, user_ids), count, random.Random(42))
+    cursor = conn.cursor()
+    cursor.execute(procedures.PROCEDURES['sp_GetTransactionsByUserPage'].sql, (user_ids[0], count, None, None))
+    return cursor.description, cursor.fetchall()
+
+def as_dicts(cursor):
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def as_rows(cursor):
+    return procedures.fetch_rows(cursor, procedures.PROCEDURES['sp_GetTransactionsByUserPage'])
+
+MODES = {'dict': as_dicts, 'rows': as_rows}
+
+def history_template():
+    # the partial needs no Flask context, plain Jinja renders it like render_template would
+    from jinja2 import Environment, FileSystemLoader
+    root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+    return Environment(loader=FileSystemLoader(root), autoescape=True).get_template('_transaction_rows.html')
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def allocations(fn):
+    """(blocks, bytes) still allocated by fn's result, the driver rows themselves excluded"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'filename')
+    del result
+    return sum(stat.count_diff for stat in stats), sum(stat.size_diff for stat in stats)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    description, rows = driver_rows(args.rows)
+    per_100k = 100000 / len(rows)
+    print(f"{len(rows)} rows x {len(description)} columns, figures per 100k rows")
+    template = history_template()
+    print(f"  {'mode':<6} {'map ms':>8} {'render ms':>10} {'blocks':>10} {'KiB':>10}")
+    for name, mapping in MODES.items():
+        map_time, mapped = best_of(args.repeat, lambda: mapping(ReplayCursor(description, rows)))
+        render_time, _ = best_of(args.repeat, lambda: template.render(transactions=mapped))
+        del mapped
+        blocks, size = allocations(lambda: mapping(ReplayCursor(description, rows)))
+        print(f"  {name:<6} {map_time * 1000 * per_100k:>8.1f} {render_time * 1000 * per_100k:>10.1f} "
+              f"{blocks * per_100k:>10,.0f} {size / 1024 * per_100k:>10,.0f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,669 @@
+"""
+In-memory stand-in for IronVaultDB, exposed as a minimal DB-API driver.
+
+It understands the statements the app sends (EXEC of the stored procedures in
+sql/Procedures, sp_set_session_context, SELECT 1) and implements each procedure
+in Python, so the routes, the pool and the benchmarks can run without SQL Server.
+It is a behavioural model for load testing, not a database: there is no real
+transaction isolation, writes are applied immediately under one lock.
+
+    db = StandInDatabase(latency=0.002)   # 2ms per round trip
+    app.config['DB_CONNECT'] = db.connect
+    app.config['DB_READ_CONNECT'] = db.connect_replica   # optional, a read-only target
+
+connect_replica() models a readable secondary of the same data: write procedures
+fail on it like on a read-only database, and its round trips are counted apart, so
+the read/write routing in database.py can be checked. It has no replication lag.
+"""
+import random
+import re
+import threading
+import time
+import inspect
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+ROLES = {1: 'Admin', 2: 'Customer', 3: 'Manager'}
+
+# Account_Daily_Activity counters, in column order
+ACTIVITY_COLUMNS = ('Deposit_Count', 'Deposit_Amount', 'Transfer_In_Count', 'Transfer_In_Amount',
+                    'Transfer_Out_Count', 'Transfer_Out_Amount')
+
+class StandInError(Exception):
+    """Raised where SQL Server would RAISERROR/THROW"""
+
+def read_only_database(name):
+    # SQL Server's error 3906 on a readable secondary
+    return StandInError('25000', f"[25000] [SQL Server]Failed to update database \"IronVaultDB\" because the "
+                                 f"database is read-only. ({name}) (3906)")
+
+# procedures that write; everything else may run on the replica
+WRITE_PROCEDURES = frozenset({
+    'sp_CreateAccount', 'sp_UserLogin', 'sp_WriteAuditEvents', 'sp_Deposit', 'sp_TransferFunds',
+    'sp_TransferFundsBatch', 'sp_DeleteUser', 'sp_UpdateUserRoleAndStatus', 'sp_UpdatePasswordHash',
+    'sp_RebuildAccountActivity',
+})
+
+def deadlock_victim():
+    # same shape as the pyodbc error, database.sql_error_number() finds the 1205
+    return StandInError('40001', '[40001] [SQL Server]Transaction was deadlocked on lock resources with another '
+                                 'process and has been chosen as the deadlock victim. Rerun the transaction. (1205)')
+
+_EXEC_RE = re.compile(r'^\s*EXEC\s+(?:dbo\.)?(\w+)\s*(.*)$', re.IGNORECASE | re.DOTALL)
+_NAMED_ARG_RE = re.compile(r"@(\w+)\s*=\s*(\?|NULL|N?'[^']*'|-?\d+(?:\.\d+)?)", re.IGNORECASE)
+_CONTEXT_RE = re.compile(r"@key\s*=\s*N'(\w+)'\s*,\s*@value\s*=\s*(\?|NULL|-?\d+)", re.IGNORECASE)
+
+_row_classes = {}
+
+def _row_class(columns):
+    # one class per result shape, like pyodbc rows: index and attribute access
+    cls = _row_classes.get(columns)
+    if cls is None:
+        cls = _row_classes[columns] = namedtuple('Row', columns, rename=True)
+    return cls
+
+def _literal(token, params):
+    if token == '?':
+        return next(params)
+    if token.upper() == 'NULL':
+        return None
+    if token.startswith(("'", "N'")):
+        return token[token.index("'") + 1:-1]
+    return Decimal(token) if '.' in token else int(token)
+
+def mask_name(name):
+    return name if len(name) <= 2 else name[:2] + '*' * (len(name) - 2)
+
+def mask_email(email):
+    if not email or '@' not in email:
+        return '[PROTECTED]'
+    at = email.index('@')
+    return email[0] + '*' * max(at - 1, 0) + email[at:]
+
+def mask_ip(ip):
+    if ip and ip.count('.') == 3:
+        return ip.rsplit('.', 1)[0] + '.xxx'
+    return ip
+
+class StandInDatabase:
+    """The shared 'server': tables plus procedure implementations"""
+
+    def __init__(self, latency=0.0, deadlock_rate=0.0):
+        self.latency = latency  # seconds added to every round trip
+        self.deadlock_rate = deadlock_rate  # share of transfers chosen as deadlock victim, exercises the app's retry
+        self.lock = threading.RLock()
+
+        self.users = {}
+        self.users_by_email = {}
+        self.accounts = {}
+        self.accounts_by_user = {}
+        self.accounts_by_number = {}
+        self.transactions = []
+        self.transactions_by_account = defaultdict(list)
+        self.audit_log = []
+        self.daily_activity = {}  # (date, AccountID) -> [counters in ACTIVITY_COLUMNS order]
+
+        self._next_user_id = 1
+        self._next_transaction_id = 1
+        self._next_log_id = 1
+
+        self.round_trips = 0
+        self.replica_round_trips = 0
+        self.connections_opened = 0
+
+    def connect(self, conn_str=None, **kwargs):
+        with self.lock:
+            self.connections_opened += 1
+        return StandInConnection(self)
+
+    def connect_replica(self, conn_str=None, **kwargs):
+        with self.lock:
+            self.connections_opened += 1
+        return StandInConnection(self, read_only=True)
+
+    # ---------- helpers ----------
+
+    def _audit(self, user_id, user_name, role_name, action, status, message, ip):
+        self.audit_log.append({
+            'LogID': self._next_log_id,
+            'UserID': user_id,
+            'User_Name': user_name,
+            'Role_Name': role_name,
+            'Action_Type': action,
+            'Action_Date': datetime.now(),
+            'IP_Address': ip,
+            'Status': status,
+            'Message': message,
+        })
+        self._next_log_id += 1
+
+    def _record_transaction(self, sender_id, receiver_id, amount, tx_type, description):
+        now = datetime.now()
+        tx = {
+            'TransactionID': self._next_transaction_id,
+            'SenderAccountID': sender_id,
+            'ReceiverAccountID': receiver_id,
+            'Amount': amount,
+            'Transaction_Type': tx_type,
+            'Description': description,
+            'Transaction_Date': now.replace(microsecond=now.microsecond // 1000 * 1000),  # DATETIME precision
+        }
+        self._next_transaction_id += 1
+        self.transactions.append(tx)
+        if sender_id is not None:
+            self.transactions_by_account[sender_id].append(tx)
+        if receiver_id is not None and receiver_id != sender_id:
+            self.transactions_by_account[receiver_id].append(tx)
+        self._add_activity(tx, 1)
+        return tx
+
+    def _add_activity(self, tx, sign):
+        """Account_Daily_Activity upkeep of the write procedures, sign -1 takes a transaction out"""
+        day = tx['Transaction_Date'].date()
+        amount = tx['Amount'] * sign
+        receiver_index = 0 if tx['Transaction_Type'] == 'DEPOSIT' else 2
+        for account_id, index in ((tx['ReceiverAccountID'], receiver_index), (tx['SenderAccountID'], 4)):
+            if account_id is None:
+                continue
+            counters = self.daily_activity.get((day, account_id))
+            if counters is None:
+                counters = self.daily_activity[(day, account_id)] = [0, Decimal('0.00')] * 3
+            counters[index] += sign
+            counters[index + 1] += amount
+
+    def _transaction_row(self, tx, my_accounts):
+        sender = self.accounts.get(tx['SenderAccountID'])
+        receiver = self.accounts.get(tx['ReceiverAccountID'])
+        return (
+            tx['TransactionID'], tx['Transaction_Date'], tx['Transaction_Type'], tx['Amount'], tx['Description'],
+            tx['SenderAccountID'], tx['ReceiverAccountID'],
+            sender['Acc_Number'] if sender else None,
+            receiver['Acc_Number'] if receiver else None,
+            self.users[sender['UserID']]['User_Name'] if sender else None,
+            self.users[receiver['UserID']]['User_Name'] if receiver else None,
+            'Debit' if tx['SenderAccountID'] in my_accounts else 'Credit',
+        )
+
+    _TRANSACTION_COLUMNS = (
+        'TransactionID', 'Transaction_Date', 'Transaction_Type', 'Amount', 'Description',
+        'SenderAccountID', 'ReceiverAccountID', 'SenderAccount', 'ReceiverAccount',
+        'SenderName', 'ReceiverName', 'Transaction_Direction',
+    )
+
+    def _user_transactions(self, user_id):
+        """Newest first, like ORDER BY Transaction_Date DESC, TransactionID DESC"""
+        account_id = self.accounts_by_user.get(user_id)
+        if account_id is None:
+            return set(), []
+        return {account_id}, reversed(self.transactions_by_account[account_id])
+
+    def bulk_insert_transactions(self, rows):
+        """Fast path for benchmarks.datagen: (sender, receiver, amount, type, description) tuples"""
+        with self.lock:
+            for sender_id, receiver_id, amount, tx_type, description in rows:
+                self._record_transaction(sender_id, receiver_id, amount, tx_type, description)
+
+    # ---------- procedures (named like the SQL parameters) ----------
+
+    def sp_CreateAccount(self, ctx, UserName, Email, PasswordHash, Salt, RoleID=2):
+        email = Email.lower()
+        if email in self.users_by_email:
+            raise StandInError('Email already registered.')
+        user_id = self._next_user_id
+        self._next_user_id += 1
+        self.users[user_id] = {
+            'UserID': user_id, 'User_Name': UserName, 'User_Email': Email,
+            'User_PasswordHash': PasswordHash, 'User_Salt': Salt,
+            'Status': 'Active', 'RoleID': int(RoleID), 'Last_Login': None,
+        }
+        self.users_by_email[email] = user_id
+        acc_number = f'100-{user_id}'
+        self.accounts[user_id] = {'AccountID': user_id, 'UserID': user_id, 'Acc_Number': acc_number, 'Acc_Balance': Decimal('0.00')}
+        self.accounts_by_user[user_id] = user_id
+        self.accounts_by_number[acc_number] = user_id
+        return [(('UserID',), [(user_id,)])]
+
+    def sp_GetUserByEmail(self, ctx, Email):
+        user = self.users.get(self.users_by_email.get(Email.lower()))
+        rows = [(user['UserID'], user['User_Name'], user['User_PasswordHash'], user['User_Salt'], user['RoleID'])] if user else []
+        return [(('UserID', 'User_Name', 'User_PasswordHash', 'User_Salt', 'RoleID'), rows)]
+
+    def sp_GetUserById(self, ctx, UserID):
+        user = self.users.get(int(UserID))
+        rows = [(user['UserID'], user['User_Name'], ROLES.get(user['RoleID']), user['RoleID'])] if user else []
+        return [(('UserID', 'User_Name', 'Role_Name', 'RoleID'), rows)]
+
+    def sp_GetRoles(self, ctx):
+        return [(('RoleID', 'Role_Name'), sorted(ROLES.items()))]
+
+    def sp_UserLogin(self, ctx, UserID, IP_Address):
+        user = self.users[UserID]
+        user['Last_Login'] = datetime.now()
+        self._audit(UserID, user['User_Name'], ROLES.get(user['RoleID']), 'LOGIN', 'Success', 'User logged in successfully', IP_Address)
+
+    def sp_UpdatePasswordHash(self, ctx, UserID, PasswordHash):
+        if not PasswordHash.startswith('$scrypt$'):
+            raise StandInError('Only scrypt hashes may be written.')
+        self.users[int(UserID)]['User_PasswordHash'] = PasswordHash
+
+    def sp_WriteAuditEvents(self, ctx, Events):
+        for user_id, user_name, role_name, action, action_date, ip, status, message in Events:
+            self._audit(user_id if user_id in self.users else None, user_name, role_name, action, status, message, ip)
+            self.audit_log[-1]['Action_Date'] = action_date
+
+    def sp_GetAccountsByUser(self, ctx, UserID):
+        user = self.users.get(UserID)
+        account = self.accounts.get(self.accounts_by_user.get(UserID))
+        rows = []
+        if user and account:
+            rows.append((account['AccountID'], UserID, user['User_Name'], account['Acc_Number'], account['Acc_Balance']))
+        return [(('AccountID', 'UserID', 'User_Name', 'Acc_Number', 'Acc_Balance'), rows)]
+
+    def sp_GetTransactionsByUser(self, ctx, UserID):
+        mine, txs = self._user_transactions(UserID)
+        return [(self._TRANSACTION_COLUMNS, [self._transaction_row(tx, mine) for tx in txs])]
+
+    def sp_GetTransactionsByUserPage(self, ctx, UserID, PageSize=20, CursorDate=None, CursorID=None):
+        mine, txs = self._user_transactions(UserID)
+        rows = []
+        for tx in txs:
+            if CursorDate is not None and (tx['Transaction_Date'], tx['TransactionID']) >= (CursorDate, CursorID):
+                continue
+            rows.append(self._transaction_row(tx, mine))
+            if len(rows) >= PageSize:
+                break
+        return [(self._TRANSACTION_COLUMNS, rows)]
+
+    def sp_GetStatementByUser(self, ctx, UserID, From, To):
+        account = self.accounts.get(self.accounts_by_user.get(UserID))
+        if account is None:
+            return [(('Acc_Number', 'Opening_Balance'), [(None, Decimal('0.00'))])] + [(self._STATEMENT_COLUMNS, [])]
+        account_id = account['AccountID']
+        history = self.transactions_by_account[account_id]
+
+        def signed(tx):
+            if tx['SenderAccountID'] == tx['ReceiverAccountID']:
+                return 0
+            return -tx['Amount'] if tx['SenderAccountID'] == account_id else tx['Amount']
+
+        opening = account['Acc_Balance'] - sum(signed(tx) for tx in history if tx['Transaction_Date'] >= From)
+
+        def rows():
+            # lazy like a server-side cursor, so the benchmarks measure the app's memory, not this one's
+            for tx in history:
+                if not From <= tx['Transaction_Date'] < To:
+                    continue
+                debit = tx['SenderAccountID'] == account_id
+                other = self.accounts.get(tx['ReceiverAccountID'] if debit else tx['SenderAccountID'])
+                yield (tx['TransactionID'], tx['Transaction_Date'], tx['Transaction_Type'], tx['Description'],
+                       'Debit' if debit else 'Credit',
+                       other['Acc_Number'] if other else None,
+                       self.users[other['UserID']]['User_Name'] if other else None,
+                       tx['Amount'])
+
+        return [(('Acc_Number', 'Opening_Balance'), [(account['Acc_Number'], opening)]), (self._STATEMENT_COLUMNS, rows())]
+
+    _STATEMENT_COLUMNS = (
+        'TransactionID', 'Transaction_Date', 'Transaction_Type', 'Description', 'Transaction_Direction',
+        'Counterparty_Account', 'Counterparty_Name', 'Amount',
+    )
+
+    @staticmethod
+    def _listing_page(rows, matches, PageNumber, PageSize, SortBy, SortDir, sort_keys):
+        # shared paging of sp_GetAllUsers / sp_GetAllCustomerAccounts: filter, sort, slice, TotalCount
+        rows = [row for row in rows if matches(row)]
+        key = sort_keys.get(SortBy)
+        rows.sort(key=lambda r: (key(r), r['UserID']) if key else r['UserID'], reverse=SortDir == 'DESC')
+        start = (max(int(PageNumber), 1) - 1) * int(PageSize)
+        return rows[start:start + int(PageSize)], len(rows)
+
+    @staticmethod
+    def _search_matches(search):
+        search = (search or '').strip()
+        if not search:
+            return lambda row: True
+        return lambda row: row['User_Name'].startswith(search) or str(row['UserID']) == search \
+            or row.get('Acc_Number') == search
+
+    def sp_GetAllCustomerAccounts(self, ctx, PageNumber=1, PageSize=50, Search=None, SortBy='UserID', SortDir='ASC'):
+        rows = []
+        for user in self.users.values():
+            if user['RoleID'] != 2:
+                continue
+            account = self.accounts[self.accounts_by_user[user['UserID']]]
+            rows.append(dict(user, Acc_Number=account['Acc_Number'], Acc_Balance=account['Acc_Balance']))
+        page, total = self._listing_page(rows, self._search_matches(Search), PageNumber, PageSize, SortBy, SortDir, {
+            'User_Name': lambda r: r['User_Name'],
+            'Acc_Balance': lambda r: r['Acc_Balance'],
+        })
+        return [(('UserID', 'User_Name', 'User_Email', 'Acc_Number', 'Acc_Balance', 'TotalCount'),
+                 [(r['UserID'], mask_name(r['User_Name']), mask_email(r['User_Email']), r['Acc_Number'], r['Acc_Balance'], total)
+                  for r in page])]
+
+    def sp_GetAllUsers(self, ctx, PageNumber=1, PageSize=50, Search=None, SortBy='UserID', SortDir='ASC'):
+        page, total = self._listing_page(list(self.users.values()), self._search_matches(Search), PageNumber, PageSize, SortBy, SortDir, {
+            'User_Name': lambda r: r['User_Name'],
+            'Role_Name': lambda r: ROLES.get(r['RoleID']),
+            'Status': lambda r: r['Status'] or 'Active',
+        })
+        return [(('UserID', 'User_Name', 'User_Email', 'Role_Name', 'RoleID', 'Status', 'TotalCount'),
+                 [(u['UserID'], mask_name(u['User_Name']), mask_email(u['User_Email']), ROLES.get(u['RoleID']), u['RoleID'], u['Status'] or 'Active', total)
+                  for u in page])]
+
+    def sp_GetAuditLogs(self, ctx, Top=50):
+        rows = []
+        for log in reversed(self.audit_log):
+            if not self._rls_visible(ctx, log['UserID']):
+                continue
+            rows.append((log['LogID'], log['UserID'], log['User_Name'], log['Role_Name'], log['Action_Type'],
+                         log['Status'], log['Message'], log['Action_Date'], mask_ip(log['IP_Address'])))
+            if len(rows) >= Top:
+                break
+        return [(('LogID', 'UserID', 'User_Name', 'Role_Name', 'Action_Type', 'Status', 'Message', 'Action_Date', 'IP_Address'), rows)]
+
+    def sp_SearchAuditLogs(self, ctx, From=None, To=None, ActionType=None, Status=None, UserID=None,
+                           PageSize=50, CursorDate=None, CursorID=None):
+        rows = []
+        for log in sorted(self.audit_log, key=lambda l: (l['Action_Date'], l['LogID']), reverse=True):
+            key = (log['Action_Date'], log['LogID'])
+            if (From is not None and key[0] < From) or (To is not None and key[0] >= To):
+                continue
+            if (ActionType is not None and log['Action_Type'] != ActionType) or (Status is not None and log['Status'] != Status):
+                continue
+            if (UserID is not None and log['UserID'] != UserID) or not self._rls_visible(ctx, log['UserID']):
+                continue
+            if CursorDate is not None and key >= (CursorDate, CursorID):
+                continue
+            rows.append((log['LogID'], log['UserID'], log['User_Name'], log['Role_Name'], log['Action_Type'],
+                         log['Status'], log['Message'], log['Action_Date'], mask_ip(log['IP_Address'])))
+            if PageSize is not None and len(rows) >= PageSize:
+                break
+        return [(('LogID', 'UserID', 'User_Name', 'Role_Name', 'Action_Type', 'Status', 'Message', 'Action_Date', 'IP_Address'), rows)]
+
+    def sp_GetAccountActivitySummary(self, ctx, Days=30, Top=10):
+        Days = Days if 1 <= Days <= 366 else 30
+        Top = Top if 1 <= Top <= 100 else 10
+        since = datetime.now().date() - timedelta(days=Days - 1)
+        visible = {aid: a for aid, a in self.accounts.items() if self._rls_visible(ctx, a['UserID'])}
+        window, daily = {}, {}
+        for (day, account_id), counters in self.daily_activity.items():
+            if day < since or account_id not in visible:
+                continue
+            totals = window.setdefault(account_id, [0, Decimal('0.00')] * 3)
+            per_day = daily.setdefault(day, [0, Decimal('0.00'), 0, Decimal('0.00'), 0])
+            for i, value in enumerate(counters):
+                totals[i] += value
+            per_day[0] += counters[0]
+            per_day[1] += counters[1]
+            per_day[2] += counters[4]
+            per_day[3] += counters[5]
+            per_day[4] += 1
+        totals = (
+            len(visible), sum((a['Acc_Balance'] for a in visible.values()), Decimal('0.00')),
+            len(window), len(visible) - len(window),
+            sum(w[0] for w in window.values()), sum((w[1] for w in window.values()), Decimal('0.00')),
+            sum(w[4] for w in window.values()), sum((w[5] for w in window.values()), Decimal('0.00')),
+            since,
+        )
+        ranked = sorted(window.items(), key=lambda item: (-(item[1][1] + item[1][3] + item[1][5]), visible[item[0]]['UserID']))
+        top = []
+        for account_id, w in ranked[:Top]:
+            account = visible[account_id]
+            top.append((account['UserID'], mask_name(self.users[account['UserID']]['User_Name']), account['Acc_Balance'],
+                        w[0] + w[2] + w[4], w[1] + w[3] + w[5]))
+        return [
+            (('Accounts', 'Total_Balance', 'Active_Accounts', 'Dormant_Accounts', 'Deposit_Count', 'Deposit_Amount',
+              'Transfer_Count', 'Transfer_Amount', 'Since'), [totals]),
+            (('Activity_Date', 'Deposit_Count', 'Deposit_Amount', 'Transfer_Count', 'Transfer_Amount', 'Active_Accounts'),
+             [(day,) + tuple(values) for day, values in sorted(daily.items())]),
+            (('UserID', 'User_Name', 'Acc_Balance', 'Transaction_Count', 'Volume'), top),
+        ]
+
+    def sp_RebuildAccountActivity(self, ctx, From=None, To=None, ChunkDays=31):
+        kept = {key: c for key, c in self.daily_activity.items()
+                if (From is not None and key[0] < From) or (To is not None and key[0] >= To)}
+        self.daily_activity = {}
+        for tx in self.transactions:
+            day = tx['Transaction_Date'].date()
+            if (From is None or day >= From) and (To is None or day < To):
+                self._add_activity(tx, 1)
+        written = len(self.daily_activity)
+        self.daily_activity.update(kept)
+        return [(('From_Date', 'To_Date', 'Rows_Written'), [(From, To, written)])]
+
+    def sp_Deposit(self, ctx, UserID, Amount, ActorIP, ActorUserName=None, ActorRoleName=None):
+        amount = Decimal(str(Amount)).quantize(Decimal('0.01'))
+        account = self.accounts.get(self.accounts_by_user.get(UserID))
+        if account is None:
+            raise StandInError('Account not found.')
+        user = self.users[UserID]
+        account['Acc_Balance'] += amount
+        self._record_transaction(None, account['AccountID'], amount, 'DEPOSIT', 'ATM Cash Deposit')
+        self._audit(UserID, ActorUserName or user['User_Name'], ActorRoleName or ROLES.get(user['RoleID']),
+                    'DEPOSIT', 'Success', f'Deposited RM {amount:,.2f}', ActorIP)
+
+    def sp_TransferFunds(self, ctx, SenderUserID, ReceiverAccNumber, Amount, ActorIP, VerifyReceiver=1, ActorUserName=None, ActorRoleName=None):
+        amount = Decimal(str(Amount)).quantize(Decimal('0.01'))
+        user = self.users.get(SenderUserID)
+        name, role = (user['User_Name'], ROLES.get(user['RoleID'])) if user else ('Unknown', 'Unknown')
+        name, role = ActorUserName or name, ActorRoleName or role
+        if self.deadlock_rate and random.random() < self.deadlock_rate:
+            # rolled back before any write, and not audited (see sp_TransferFunds CATCH)
+            raise deadlock_victim()
+        try:
+            sender = self.accounts.get(self.accounts_by_user.get(SenderUserID))
+            if sender is None:
+                raise StandInError('Sender account not found.')
+            if sender['Acc_Balance'] < amount:
+                raise StandInError('Insufficient funds.')
+            receiver = self.accounts.get(self.accounts_by_number.get(ReceiverAccNumber.strip()))
+            if receiver is None:
+                raise StandInError('Receiver account not found.')
+            if receiver is sender:
+                raise StandInError('Cannot transfer to the same account.')
+            sender['Acc_Balance'] -= amount
+            receiver['Acc_Balance'] += amount
+            self._record_transaction(sender['AccountID'], receiver['AccountID'], amount, 'TRANSFER', 'Online Transfer')
+            self._audit(SenderUserID, name, role, 'TRANSFER', 'Success', f'Transferred RM {amount:,.2f} to account {ReceiverAccNumber}', ActorIP)
+        except StandInError as e:
+            self._audit(SenderUserID, name, role, 'TRANSFER', 'Failed', str(e), ActorIP)
+            raise
+
+    def sp_TransferFundsBatch(self, ctx, SenderUserID, Transfers, ActorIP, ActorUserName=None, ActorRoleName=None):
+        user = self.users.get(SenderUserID)
+        name = ActorUserName or (user['User_Name'] if user else 'Unknown')
+        role = ActorRoleName or (ROLES.get(user['RoleID']) if user else 'Unknown')
+        sender = self.accounts.get(self.accounts_by_user.get(SenderUserID))
+        if sender is None:
+            raise StandInError('Sender account not found.')
+
+        results = []
+        for row_no, acc_number, amount in Transfers:
+            amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+            receiver = self.accounts.get(self.accounts_by_number.get(acc_number.strip()))
+            message = None
+            if amount <= 0:
+                message = 'Amount must be greater than 0.'
+            elif receiver is None:
+                message = 'Receiver account not found.'
+            elif receiver is sender:
+                message = 'Cannot transfer to the same account.'
+            results.append([row_no, acc_number, amount, receiver, 'Rejected' if message else 'Pending', message])
+
+        pending = [r for r in results if r[4] == 'Pending']
+        total = sum((r[2] for r in pending), Decimal('0.00'))
+        if pending and sender['Acc_Balance'] < total:
+            for r in pending:
+                r[4], r[5] = 'Rejected', f'Insufficient funds for the batch total of RM {total:,.2f}.'
+            self._audit(SenderUserID, name, role, 'TRANSFER_BATCH', 'Failed', f'Insufficient funds for {len(pending)} transfer(s) totalling RM {total:,.2f}', ActorIP)
+        elif pending:
+            sender['Acc_Balance'] -= total
+            for r in pending:
+                r[3]['Acc_Balance'] += r[2]
+                self._record_transaction(sender['AccountID'], r[3]['AccountID'], r[2], 'TRANSFER', 'Batch Transfer')
+                self._audit(SenderUserID, name, role, 'TRANSFER', 'Success', f'Transferred RM {r[2]:,.2f} to account {r[1]}', ActorIP)
+                r[4] = 'Success'
+            self._audit(SenderUserID, name, role, 'TRANSFER_BATCH', 'Success', f'Batch of {len(pending)} transfer(s) totalling RM {total:,.2f}', ActorIP)
+
+        rows = [(r[0], r[1], r[2], r[4], r[5]) for r in sorted(results, key=lambda r: r[0])]
+        return [(('RowNo', 'ReceiverAccNumber', 'Amount', 'Status', 'Message'), rows)]
+
+    def sp_DeleteUser(self, ctx, UserID, ActorUserID, ActorUserName, ActorRoleName, ActorIP):
+        user = self.users.pop(UserID, None)
+        if user:
+            self.users_by_email.pop(user['User_Email'].lower(), None)
+            account = self.accounts.pop(self.accounts_by_user.pop(UserID, None), None)
+            if account:
+                self.accounts_by_number.pop(account['Acc_Number'], None)
+                removed = self.transactions_by_account.pop(account['AccountID'], [])
+                for tx in removed:
+                    self._add_activity(tx, -1)  # the counterparties' side, like sp_DeleteUser
+                self.daily_activity = {key: c for key, c in self.daily_activity.items() if key[1] != account['AccountID']}
+                gone = {id(tx) for tx in removed}
+                self.transactions = [tx for tx in self.transactions if id(tx) not in gone]
+            self.audit_log = [log for log in self.audit_log if log['UserID'] != UserID]
+        self._audit(ActorUserID, ActorUserName, ActorRoleName, 'DELETE_USER', 'Success', f'Deleted User ID {UserID}', ActorIP)
+
+    def sp_UpdateUserRoleAndStatus(self, ctx, TargetUserID, NewRoleID, ActorUserID, ActorUserName, ActorRoleName, ActorIP, NewStatus='Active'):
+        user = self.users.get(int(TargetUserID))
+        if user is None:
+            raise StandInError('Target user not found.')
+        user['RoleID'] = int(NewRoleID)
+        user['Status'] = NewStatus
+        self._audit(ActorUserID, ActorUserName, ActorRoleName, 'USER_UPDATE', 'Success', f'Updated User {TargetUserID}', ActorIP)
+
+    @staticmethod
+    def _rls_visible(ctx, owner_user_id):
+        role_id = ctx.get('role_id')
+        if role_id in (1, 3):
+            return True
+        return ctx.get('user_id') is not None and ctx.get('user_id') == owner_user_id
+
+    # ---------- statement dispatch ----------
+
+    def execute(self, ctx, sql, params, read_only=False):
+        """Run one batch, returns a list of (columns, rows) result sets"""
+        self.round_trips += 1
+        if read_only:
+            self.replica_round_trips += 1
+        params = iter(params or ())
+        text = sql.strip()
+
+        if 'sp_set_session_context' in text:
+            for key, token in _CONTEXT_RE.findall(text):
+                ctx[key] = _literal(token, params)
+            return []
+
+        if text.upper().startswith('SELECT 1'):
+            return [(('',), [(1,)])]
+
+        if 'SESSION_CONTEXT' in text.upper():
+            return [(('ContextUserID', 'ContextRoleID'), [(ctx.get('user_id'), ctx.get('role_id'))])]
+
+        match = _EXEC_RE.match(text)
+        if not match:
+            raise StandInError(f'Stand-in cannot run statement: {text[:80]}')
+        name, args = match.groups()
+        procedure = getattr(self, name, None)
+        if procedure is None or not name.startswith('sp_'):
+            raise StandInError(f"Could not find stored procedure '{name}'.")
+        if read_only and name in WRITE_PROCEDURES:
+            raise read_only_database(name)
+
+        if '@' in args:
+            kwargs = {key: _literal(token, params) for key, token in _NAMED_ARG_RE.findall(args)}
+        else:
+            # positional EXEC sp_UserLogin ?, ?
+            names = list(inspect.signature(procedure).parameters)[1:]
+            values = [_literal(token.strip(), params) for token in args.split(',') if token.strip()]
+            kwargs = dict(zip(names, values))
+
+        with self.lock:
+            return procedure(ctx, **kwargs) or []
+
+class StandInConnection:
+    def __init__(self, db, read_only=False):
+        self.db = db
+        self.read_only = read_only
+        self.context = {}  # SESSION_CONTEXT of this "session"
+        self.timeout = 0
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self):
+        if self.closed:
+            raise StandInError('Attempt to use a closed connection.')
+        return StandInCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class StandInCursor:
+    arraysize = 1
+
+    def __init__(self, conn):
+        self.connection = conn
+        self.description = None
+        self.rowcount = -1
+        self.fast_executemany = False
+        self._results = []
+        self._rows = iter(())
+
+    def execute(self, sql, params=()):
+        db = self.connection.db
+        if db.latency:
+            time.sleep(db.latency)
+        if params and not isinstance(params, (list, tuple)):
+            params = (params,)
+        self._results = db.execute(self.connection.context, sql, params, self.connection.read_only)
+        self._load_next()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        for params in seq_of_params:
+            self.execute(sql, params)
+
+    def _load_next(self):
+        if not self._results:
+            self.description = None
+            self.rowcount = -1
+            self._rows = iter(())
+            return False
+        columns, rows = self._results.pop(0)
+        columns = tuple(columns)
+        row_class = _row_class(columns)
+        self.description = tuple((c, None, None, None, None, None, None) for c in columns)
+        self.rowcount = len(rows) if isinstance(rows, list) else -1
+        self._rows = (row_class(*row) for row in rows)
+        return True
+
+    def nextset(self):
+        return self._load_next()
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        batch = []
+        for row in self._rows:
+            batch.append(row)
+            if len(batch) >= size:
+                break
+        return batch
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        self._rows = iter(())
+
+    def __iter__(self):
+        return self._rows
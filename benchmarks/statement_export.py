@@ -0,0 +1,116 @@
+"""
+Throughput and memory of the streamed account statement (/statement).
+
+Seeds one account with --rows history rows, then reads its whole statement through
+database.execute_statement + utils.export.stream_statement on a pooled connection,
+exactly like the route does, and reports rows/sec, CSV bytes and peak RSS.
+
+    python -m benchmarks.statement_export --rows 1000000
+    python -m benchmarks.statement_export --rows 1000000 --mode fetchall   # the non-streaming way, for comparison
+    python -m benchmarks.statement_export --backend sqlserver --user-id 42 # an account seeded with datagen --bulk
+
+Peak RSS is the process-wide high-water mark, so run one mode per process. With the
+stand-in the seeded tables live in this process too: compare the growth over the
+baseline taken after seeding, not the absolute numbers.
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.datagen import generate, account_ids_for, bulk_transactions
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def build(args):
+    """App plus the UserID whose statement is read"""
+    from app import create_app
+    app = create_app('benchmark')
+
+    if args.backend == 'standin':
+        from benchmarks.standin import StandInDatabase
+        db = StandInDatabase(latency=0)
+        app.config['DB_CONNECT'] = db.connect
+        conn = db.connect()
+    else:
+        import pyodbc
+        from database import build_connection_string
+        conn = pyodbc.connect(build_connection_string(app.config))
+
+    if args.user_id is not None:
+        conn.close()
+        return app, args.user_id
+
+    started = time.perf_counter()
+    user_ids = generate(conn, 2, transfers_per_user=0, start=args.start)
+    # every row is between the two bench accounts, so all of them land on the first one's statement
+    bulk_transactions(conn, account_ids_for(conn, user_ids), args.rows, random.Random(args.seed))
+    conn.close()
+    print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+    return app, user_ids[0]
+
+def read_statement(pool, user_id, role_id, mode, batch_size):
+    """(rows, bytes) of one full statement"""
+    from database import execute_statement
+    from utils.export import stream_statement
+
+    date_from, date_to = datetime(2000, 1, 1), datetime.now() + timedelta(days=1)
+    with pool.acquire(user_id, role_id) as conn:
+        cursor = conn.cursor()
+        _, opening_balance = execute_statement(cursor, user_id, date_from, date_to)
+        if mode == 'fetchall':
+            rows = cursor.fetchall()
+            chunks = list(stream_statement(_Replay(rows), opening_balance, batch_size))
+            size = sum(len(chunk) for chunk in chunks)
+            return len(rows), size
+
+        count = size = 0
+        for chunk in stream_statement(cursor, opening_balance, batch_size):
+            count += chunk.count('\n')
+            size += len(chunk)
+        return count - 3, size  # header, opening and closing balance
+
+class _Replay:
+    """Materialized rows behind the cursor interface stream_csv reads"""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._pos = 0
+
+    def fetchmany(self, size):
+        batch = self._rows[self._pos:self._pos + size]
+        self._pos += size
+        return batch
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['standin', 'sqlserver'], default='standin')
+    parser.add_argument('--rows', type=int, default=1000000, help='history rows to seed')
+    parser.add_argument('--user-id', type=int, help='read this existing user instead of seeding')
+    parser.add_argument('--mode', choices=['stream', 'fetchall'], default='stream')
+    parser.add_argument('--batch', type=int, default=1000, help='rows per fetchmany()')
+    parser.add_argument('--start', type=int, default=800000, help='first bench user number for the seeded users')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    app, user_id = build(args)
+    from database import get_pool
+    with app.app_context():
+        pool = get_pool()
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        rows, size = read_statement(pool, user_id, 2, args.mode, args.batch)
+        elapsed = time.perf_counter() - started
+        peak = peak_rss_mb()
+
+    print(f"{args.mode}, batch {args.batch}: {rows} rows, {size / 1024 / 1024:.1f} MiB of CSV in {elapsed:.2f}s")
+    print(f"  rows/sec       {rows / elapsed:,.0f}" if elapsed else "  rows/sec       n/a")
+    print(f"  peak RSS MiB   {peak:.1f} (baseline {baseline:.1f}, +{peak - baseline:.1f})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Concurrency stress test for sp_TransferFunds and the deadlock retry.
+
+Many threads move money back and forth between a few hot accounts (every pair, both
+directions, which is what used to deadlock), each transfer through
+database.run_with_retry exactly like routes/transactions.transfer. Afterwards the
+balances of the hot accounts must add up to what they started with and none may be
+negative; the exit code is 1 otherwise.
+
+    python -m benchmarks.stress_transfers --accounts 4 --threads 16 --duration 20
+    python -m benchmarks.stress_transfers --backend sqlserver --accounts 2 --threads 32
+    python -m benchmarks.stress_transfers --deadlock-rate 0.05   # stand-in, exercise the retry path
+
+The sqlserver backend registers its own hot users (bench numbers from --start) in the
+configured database.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks import report
+from benchmarks.datagen import generate
+
+def balances(pool, user_ids):
+    # admin context, RLS shows every account
+    with pool.acquire(0, 1) as conn:
+        cursor = conn.cursor()
+        result = {}
+        for user_id in user_ids:
+            cursor.execute("EXEC dbo.sp_GetAccountsByUser @UserID = ?", (user_id,))
+            for row in cursor.fetchall():
+                result[row.Acc_Number] = Decimal(row.Acc_Balance)
+        return result
+
+class Worker(threading.Thread):
+    def __init__(self, app, user_ids, deadline, max_amount, rng):
+        super().__init__(daemon=True)
+        self.app = app
+        self.user_ids = user_ids
+        self.deadline = deadline
+        self.max_amount = max_amount
+        self.rng = rng
+        self.latencies = []
+        self.attempts = 0
+        self.insufficient = 0
+        self.errors = []
+
+    def transfer(self, pool, sender, receiver, amount):
+        from database import run_with_retry
+
+        def work(cursor):
+            self.attempts += 1
+            cursor.execute(
+                "EXEC dbo.sp_TransferFunds @SenderUserID = ?, @ReceiverAccNumber = ?, @Amount = ?, @ActorIP = ?",
+                (sender, f'100-{receiver}', amount, '10.0.0.1')
+            )
+
+        with pool.acquire(sender, 2) as conn:
+            run_with_retry(conn, work)
+
+    def run(self):
+        from database import get_pool
+        with self.app.app_context():
+            pool = get_pool()
+            while time.perf_counter() < self.deadline:
+                sender, receiver = self.rng.sample(self.user_ids, 2)
+                amount = Decimal(self.rng.randint(1, self.max_amount * 100)) / 100
+                started = time.perf_counter()
+                try:
+                    self.transfer(pool, sender, receiver, amount)
+                    self.latencies.append(time.perf_counter() - started)
+                except Exception as e:
+                    if 'Insufficient funds' in str(e):
+                        self.insufficient += 1
+                    else:
+                        self.errors.append(e)
+
+def build(args):
+    """App with its pool sized for the threads, plus the hot users"""
+    from app import create_app
+    app = create_app('benchmark')
+    app.config['DB_POOL_SIZE'] = args.threads + 1
+
+    if args.backend == 'standin':
+        from benchmarks.standin import StandInDatabase
+        db = StandInDatabase(latency=args.latency, deadlock_rate=args.deadlock_rate)
+        app.config['DB_CONNECT'] = db.connect
+        conn = db.connect()
+    else:
+        import pyodbc
+        from database import build_connection_string
+        conn = pyodbc.connect(build_connection_string(app.config))
+
+    user_ids = generate(conn, args.accounts, transfers_per_user=0, deposit=args.deposit, start=args.start)
+    conn.close()
+    return app, user_ids
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['standin', 'sqlserver'], default='standin')
+    parser.add_argument('--accounts', type=int, default=4, help='hot accounts, fewer means more contention')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--deposit', type=float, default=100, help='opening balance per hot account')
+    parser.add_argument('--max-amount', type=int, default=20, help='largest single transfer')
+    parser.add_argument('--start', type=int, default=900000, help='first bench user number for the hot users')
+    parser.add_argument('--latency', type=float, default=0.001, help='stand-in seconds per DB round trip')
+    parser.add_argument('--deadlock-rate', type=float, default=0.0, help='stand-in share of deadlock victims')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.accounts < 2:
+        parser.error('--accounts must be at least 2')
+
+    app, user_ids = build(args)
+    from database import get_pool
+    with app.app_context():
+        pool = get_pool()
+        before = balances(pool, user_ids)
+
+        deadline = time.perf_counter() + args.duration
+        workers = [Worker(app, user_ids, deadline, args.max_amount, random.Random(args.seed + i)) for i in range(args.threads)]
+        started = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - started
+
+        after = balances(pool, user_ids)
+
+    latencies = sorted(l for w in workers for l in w.latencies)
+    committed = len(latencies)
+    attempts = sum(w.attempts for w in workers)
+    insufficient = sum(w.insufficient for w in workers)
+    errors = [e for w in workers for e in w.errors]
+
+    print(f"{args.threads} threads, {args.accounts} hot accounts, {elapsed:.1f}s")
+    print(f"  committed      {committed}  ({committed / elapsed:.1f}/s)")
+    print(f"  insufficient   {insufficient}")
+    print(f"  retries        {attempts - committed - insufficient - len(errors)}")
+    print(f"  failed         {len(errors)}")
+    if latencies:
+        print(f"  latency ms     p50 {report.percentile(latencies, 50) * 1000:.1f}  "
+              f"p95 {report.percentile(latencies, 95) * 1000:.1f}  p99 {report.percentile(latencies, 99) * 1000:.1f}")
+    for e in errors[:5]:
+        print(f"  error: {e}", file=sys.stderr)
+
+    total_before, total_after = sum(before.values()), sum(after.values())
+    negative = {acc: balance for acc, balance in after.items() if balance < 0}
+    print(f"  balance sum    {total_before} -> {total_after}")
+    if total_before != total_after or negative or errors:
+        print("FAILED: money was created or lost, a balance went negative, or a transfer errored", file=sys.stderr)
+        return 1
+    print("OK: balances conserved")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 from dotenv import load_dotenv
 
@@ -10,8 +11,81 @@ class Config:
     USERNAME = os.getenv("DB_USERNAME")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-    # flask-limiters
+    # connection pool
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_POOL_TIMEOUT = 30       # seconds to wait for a free connection
+    DB_POOL_RECYCLE = 1800     # seconds before a connection is replaced
+    DB_POOL_PING_AFTER = 30    # idle seconds before a health check on checkout
+    DB_RETRY_ATTEMPTS = 4      # tries for a write that lost a deadlock (1205) or timed out on a lock (1222)
+    DB_RETRY_BACKOFF = 0.05    # seconds, doubled per retry, with full jitter
+
+    # read replica (optional): dashboard panels, history, statements and the audit explorer read there
+    DB_READ_SERVER_NAME = os.getenv('DB_READ_SERVER_NAME')     # replica host, or the AG listener together with DB_READ_INTENT
+    DB_READ_INTENT = os.getenv('DB_READ_INTENT', '0') == '1'    # ApplicationIntent=ReadOnly, read-only routing picks a secondary
+    DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', 10))
+    READ_AFTER_WRITE_WINDOW = 10    # seconds a user's reads stay on the primary after they wrote
+    DB_READ_CACHE_TTL = 30          # dashboard cache entries read from the replica, they may trail by its lag
+
+    # gunicorn (gunicorn.conf.py), 2 * cores + 1 processes so throughput scales with CPUs
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', 0)) or multiprocessing.cpu_count() * 2 + 1
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 4))      # keep <= DB_POOL_SIZE, each thread may hold a connection
+    WEB_TIMEOUT = 30            # seconds before a stuck worker is killed and replaced
+    WEB_GRACEFUL_TIMEOUT = 30   # seconds in-flight requests get to finish on restart/deploy
+    WEB_KEEPALIVE = 5
+    DB_POOL_WARM = int(os.getenv('DB_POOL_WARM', 2))    # connections each worker opens right after fork
+    HEALTH_CHECK_TTL = 5        # seconds a /readyz database check is reused
+
+    ROLE_CATALOG_TTL = 3600     # seconds before the [Role] table is re-read
+
+    # transaction history paging
+    DASHBOARD_TRANSACTIONS = 10     # latest rows shown on the dashboard
+    TRANSACTIONS_PAGE_SIZE = 25
+    TRANSACTIONS_MAX_PAGE_SIZE = 100
+    ADMIN_LIST_PAGE_SIZE = 50       # admin user list / manager customer list
+
+    # dashboard panels, each loaded by its own request (utils/dashboard.py)
+    DASHBOARD_QUERY_TIMEOUT = 5     # seconds a panel's query gets before the server cancels it and it shows as unavailable
+
+    # own accounts + latest transactions are cached per user until a transfer/deposit/admin action (utils/cache.py)
+    DASHBOARD_CACHE_ENABLED = os.getenv('DASHBOARD_CACHE_ENABLED', '1') == '1'
+    DASHBOARD_CACHE_TTL = 300           # seconds, upper bound even without a version bump
+    DASHBOARD_CACHE_MAX_ENTRIES = 10000 # per process
+    DASHBOARD_CACHE_URL = os.getenv('DASHBOARD_CACHE_URL')  # redis for the version counters, required with several workers
+    DASHBOARD_CACHE_SHARED = os.getenv('DASHBOARD_CACHE_SHARED', '0') == '1'  # also keep the entries in redis
+
+    # instrumentation
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 200))   # log round trips slower than this
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')            # file for the slow-query log, stderr if unset
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')              # bearer token for /metrics, open if unset (404 in production)
+    METRICS_REQUIRE_TOKEN = False
+    SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'  # per-procedure timings in the response headers, for every client
+
+    # account statements (/statement)
+    STATEMENT_DEFAULT_DAYS = 90
+    STATEMENT_BATCH = 1000          # rows per fetchmany() while streaming
+
+    # manager analytics (/manager/analytics), answered from Account_Daily_Activity
+    ANALYTICS_DAYS = 30
+    ANALYTICS_MAX_DAYS = 366
+    ANALYTICS_TOP_ACCOUNTS = 10
+
+    # audit log explorer (/admin/audit)
+    AUDIT_PAGE_SIZE = 50
+    AUDIT_MAX_PAGE_SIZE = 500
+    AUDIT_EXPORT_BATCH = 1000       # rows per fetchmany() while streaming the CSV export
+
+    # app-side audit events, written behind the request (utils/audit.py)
+    AUDIT_QUEUE_ENABLED = True
+    AUDIT_QUEUE_MAX = 10000         # events buffered per process while the DB is slow/down, then dropped
+    AUDIT_BATCH_SIZE = 500          # events per sp_WriteAuditEvents call
+    AUDIT_FLUSH_INTERVAL = 1.0      # seconds between flushes
+
+    # batch transfers (/transfer/batch)
+    TRANSFER_BATCH_MAX_ROWS = 5000
+
+    # flask-limiters, keyed per user once logged in (utils/ratelimit.py)
     RATELIMIT_DEFAULT = "200 per day;50 per hour"
+    RATELIMIT_STORAGE_URI = 'memory://'
 
     # flask-wtf
     WTF_CSRF_ENABLED = True
@@ -20,18 +94,50 @@ class Config:
     # attempts
     MAX_LOGIN_ATTEMPTS=5
     LOCKOUT_MINUTES=5
+    LOGIN_ATTEMPTS_STORAGE_URL = os.getenv('LOGIN_ATTEMPTS_STORAGE_URL', 'memory://')
+    LOGIN_ATTEMPTS_MAX_ENTRIES = 10000  # memory backend only, least recently attempted emails are dropped
+
+    # password hashing (utils/passwords.py), calibrate with benchmarks/password_kdf.py
+    PASSWORD_SCRYPT_LN = int(os.getenv('PASSWORD_SCRYPT_LN', 15))  # N = 2**15
+    PASSWORD_SCRYPT_R = 8            # memory per hash is 128 * N * r bytes, 32 MiB here
+    PASSWORD_SCRYPT_P = 1
+    PASSWORD_WORKERS = int(os.getenv('PASSWORD_WORKERS', 2))      # hashes in parallel per process
+    PASSWORD_QUEUE_RESERVE = 2       # request threads per process that never wait on a hash
+    # queued + running, beyond that logins get "try again" while the reserve still serves other pages
+    PASSWORD_QUEUE_MAX = int(os.getenv('PASSWORD_QUEUE_MAX', 0)) or max(1, WEB_THREADS - PASSWORD_QUEUE_RESERVE)
+    PASSWORD_TIMEOUT = 10            # seconds a login waits for its hash
+
+    # response policy (utils/response_policy.py)
+    STATIC_MAX_AGE = 31536000       # seconds, versioned assets (?v=<content hash>) never change
+    COMPRESS_MIN_SIZE = 1024        # bytes, smaller bodies aren't worth compressing
+    COMPRESS_LEVEL = 6              # gzip level
 
 
 class DevelopmentConfig(Config):
-    RATELIMIT_STORAGE_URL='memory://'
+    RATELIMIT_STORAGE_URI='memory://'
+    SERVER_TIMING = os.getenv('SERVER_TIMING', '1') == '1'
     DEBUG=True
 
 class ProductionConfig(Config):
-    RATELIMIT_STORAGE_URL='redis://localhost:6379'
+    # counted per worker, reconciled with redis every sync_interval seconds (redis:// for exact limits)
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'hybrid+redis://localhost:6379')
+    RATELIMIT_STORAGE_OPTIONS = {'sync_interval': 0.25, 'max_entries': 100000} \
+        if RATELIMIT_STORAGE_URI.startswith('hybrid+') else {}
+    LOGIN_ATTEMPTS_STORAGE_URL = os.getenv('LOGIN_ATTEMPTS_STORAGE_URL', 'redis://localhost:6379')
+    DASHBOARD_CACHE_URL = os.getenv('DASHBOARD_CACHE_URL', 'redis://localhost:6379')
+    METRICS_REQUIRE_TOKEN = True    # /metrics answers 404 until METRICS_TOKEN is set
+    DEBUG=False
+
+class BenchmarkConfig(Config):
+    # load tests hammer /login and /transfer, keep CSRF but drop the rate limits
+    SECRET_KEY = os.getenv('SECRET_KEY') or 'benchmark-only-secret'
+    RATELIMIT_STORAGE_URI='memory://'
+    RATELIMIT_ENABLED=False
     DEBUG=False
 
 config = {
     'development':DevelopmentConfig,
     'production': ProductionConfig,
+    'benchmark': BenchmarkConfig,
     'default':DevelopmentConfig
 }
\ No newline at end of file
@@ -1,53 +1,564 @@
 import pyodbc
-from flask import current_app, session
+import random
+import re
+import threading
+import time
+from collections import deque
+from flask import current_app, session, g
+from utils.pagination import encode_cursor
+from utils import procedures
+from utils.instrumentation import InstrumentedCursor, record_query, metrics
 
-def get_db_connection():
-    conn_str = (
+_pool_lock = threading.Lock()
+
+# deadlock victim, lock request timeout: nothing was written, the same call can simply run again
+RETRYABLE_ERRORS = (1205, 1222)
+_NATIVE_ERROR_RE = re.compile(r'\((\d{3,5})\)')
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up within DB_POOL_TIMEOUT seconds"""
+
+def build_connection_string(config, read_only=False):
+    server = (config.get('DB_READ_SERVER_NAME') or config['SERVER_NAME']) if read_only else config['SERVER_NAME']
+    return (
         f"DRIVER={{ODBC Driver 18 for SQL Server}};" # this is the driver for the SQL Server, this is required to connect to the SQL Server
-        f"SERVER={current_app.config['SERVER_NAME']};"
-        f"DATABASE={current_app.config['DATABASE_NAME']};"
-        f"UID={current_app.config['USERNAME']};"
-        f"PWD={current_app.config['DB_PASSWORD']};"
+        f"SERVER={server};"
+        f"DATABASE={config['DATABASE_NAME']};"
+        f"UID={config['USERNAME']};"
+        f"PWD={config['DB_PASSWORD']};"
         "TrustServerCertificate=yes;"
         "Encrypt=yes;"  # Enable SSL/TLS encryption in transit
+        # against an availability group listener, read-only routing sends this to a readable secondary
+        + ("ApplicationIntent=ReadOnly;" if read_only else "")
     )
-    conn = pyodbc.connect(conn_str)
-    
-    # SECURITY: Set RLS session context if user is logged in
-    # This enables Row-Level Security to automatically filter rows
-    if 'user_id' in session and 'role_id' in session:
+
+def replica_configured(config):
+    """True when reads have a target of their own (replica host, read intent, or a stub driver)"""
+    return bool(config.get('DB_READ_SERVER_NAME') or config.get('DB_READ_INTENT') or config.get('DB_READ_CONNECT'))
+
+class _PoolEntry:
+    """A raw DB-API connection plus the bookkeeping the pool needs"""
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+class PooledConnection:
+    """
+    Handle for one checkout of a pooled connection.
+    close() (or leaving a `with` block) hands the connection back to the pool
+    instead of tearing down the TLS session. Uncommitted work is rolled back.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    @property
+    def closed(self):
+        return self._entry is None
+
+    def _raw(self):
+        if self._entry is None:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return self._entry.raw
+
+    def cursor(self):
+        # timed per request, see utils/instrumentation.py
+        return InstrumentedCursor(self._raw().cursor())
+
+    def commit(self):
+        self._raw().commit()
+
+    def rollback(self):
+        self._raw().rollback()
+
+    def close(self):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __getattr__(self, name):
+        # anything else (timeout, autocommit, ...) goes to the driver connection
+        return getattr(self._raw(), name)
+
+    def __setattr__(self, name, value):
+        # conn.timeout = 5 sets the driver's query timeout
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw(), name, value)
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of warm database connections.
+
+    connect: zero-argument callable returning a DB-API connection, so the pool
+    can be driven by pyodbc in production or by a stub driver locally.
+    On checkout the RLS session context is (re)applied for the caller,
+    on return it is cleared, so a connection never leaks one user's identity.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=30, recycle=1800, ping_after=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # LIFO, so the warmest connection is reused first
+        self._size = 0
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'evicted': 0,
+        }
+
+    def acquire(self, user_id=None, role_id=None, timeout=None):
+        """Check out a connection with the RLS context set for user_id/role_id"""
+        entry = None
+        waited = False
+        started = time.monotonic()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = started + timeout
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1  # reserve the slot, connect outside the lock
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection available after {timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds'] += time.monotonic() - started
+
         try:
-            cursor = conn.cursor()
-            set_rls_session_context(cursor, session['user_id'], session['role_id'])
-            cursor.close()
-        except:
-            # If RLS is not configured, continue without it
-            pass
-    
-    return conn
+            if entry is None:
+                entry = self._new_entry()
+            else:
+                entry = self._validate(entry)
+            _apply_session_context(entry.raw, user_id, role_id)
+        except Exception:
+            if entry is not None:
+                self._discard(entry)
+            else:
+                self._free_slot()
+            raise
+
+        return PooledConnection(self, entry)
+
+    def _new_entry(self):
+        entry = _PoolEntry(self._connect())
+        with self._cond:
+            self._stats['created'] += 1
+        return entry
+
+    def _validate(self, entry):
+        """Replace connections that are too old or fail a health check"""
+        now = time.monotonic()
+        stale = self.recycle and now - entry.created_at > self.recycle
+        if not stale and now - entry.last_used > self.ping_after:
+            stale = not _ping(entry.raw)
+        if not stale:
+            return entry
+
+        _close_quietly(entry.raw)
+        with self._cond:
+            self._stats['evicted'] += 1
+        entry.raw = self._connect()
+        entry.created_at = entry.last_used = time.monotonic()
+        with self._cond:
+            self._stats['created'] += 1
+        return entry
+
+    def _release(self, entry):
+        try:
+            entry.raw.rollback()
+            _reset_session_context(entry.raw)
+        except Exception:
+            # broken connection, don't hand it to the next request
+            self._discard(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def _discard(self, entry):
+        _close_quietly(entry.raw)
+        with self._cond:
+            self._stats['evicted'] += 1
+        self._free_slot()
+
+    def _free_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def warm(self, count):
+        """Open up to `count` connections ahead of the first request"""
+        conns = []
+        try:
+            for _ in range(min(count, self.max_size)):
+                conns.append(self.acquire())
+        finally:
+            for conn in conns:
+                conn.close()
+        return len(conns)
+
+    def close_all(self):
+        """Close every idle connection; checked-out ones close when returned"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            _close_quietly(entry.raw)
 
-def get_user_role_name(cursor, user_id):
-    """Get the role name for a user"""
+    def metrics(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self.max_size
+        return stats
+
+def _ping(raw):
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+def _close_quietly(raw):
     try:
-        cursor.execute("""
-            SELECT r.Role_Name 
-            FROM [User] u
-            JOIN [Role] r ON u.RoleID = r.RoleID
-            WHERE u.UserID = ?
-        """, (user_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
-    except:
+        raw.close()
+    except Exception:
+        pass
+
+def _apply_session_context(raw, user_id, role_id):
+    # nothing to apply for anonymous checkouts, the context was cleared on return
+    if user_id is None or role_id is None:
+        return
+    cursor = raw.cursor()
+    # both keys in one batch, one round trip
+    cursor.execute(
+        "EXEC sp_set_session_context @key = N'user_id', @value = ?; "
+        "EXEC sp_set_session_context @key = N'role_id', @value = ?;",
+        (user_id, role_id)
+    )
+    cursor.close()
+
+def _reset_session_context(raw):
+    cursor = raw.cursor()
+    cursor.execute(
+        "EXEC sp_set_session_context @key = N'user_id', @value = NULL; "
+        "EXEC sp_set_session_context @key = N'role_id', @value = NULL;"
+    )
+    cursor.close()
+    raw.commit()
+
+def init_db(app):
+    """Register the request teardown that hands connections back to the pool"""
+    app.extensions['db_pool'] = None  # created lazily, so each worker process gets its own
+    app.extensions['db_read_pool'] = None
+
+    @app.teardown_appcontext
+    def release_db_connection(exc):
+        for key in ('db_conn', 'db_read_conn'):
+            conn = g.pop(key, None)
+            if conn is not None:
+                conn.close()
+
+def reset_pool(app):
+    """
+    Forget a pool inherited from the parent process (gunicorn preload_app).
+    The sockets are shared with the parent, so they are dropped, not closed.
+    """
+    app.extensions['db_pool'] = None
+    app.extensions['db_read_pool'] = None
+
+def warm_pool(app, count):
+    """Called once per worker after fork, so the first requests don't pay for the TLS handshake"""
+    try:
+        opened = get_pool(app).warm(count)
+        print(f"DB pool warmed with {opened} connection(s)")
+    except Exception as e:
+        # the database may not be up yet, requests will connect on demand
+        print(f"DB pool warm-up skipped: {e}")
+
+def _lazy_pool(app, key, conn_str, connect, max_size):
+    pool = app.extensions.get(key)
+    if pool is None:
+        with _pool_lock:
+            pool = app.extensions.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    lambda: connect(conn_str),
+                    max_size=max_size,
+                    timeout=app.config['DB_POOL_TIMEOUT'],
+                    recycle=app.config['DB_POOL_RECYCLE'],
+                    ping_after=app.config['DB_POOL_PING_AFTER'],
+                )
+                app.extensions[key] = pool
+    return pool
+
+def get_pool(app=None):
+    """The primary: every write, and the reads that must see them"""
+    app = app or current_app._get_current_object()
+    return _lazy_pool(
+        app, 'db_pool', build_connection_string(app.config),
+        app.config.get('DB_CONNECT') or pyodbc.connect,  # DB_CONNECT lets a stub driver stand in
+        app.config['DB_POOL_SIZE'],
+    )
+
+def get_read_pool(app=None):
+    """The read replica's own pool, None when no replica is configured"""
+    app = app or current_app._get_current_object()
+    if not replica_configured(app.config):
         return None
-    
+    return _lazy_pool(
+        app, 'db_read_pool', build_connection_string(app.config, read_only=True),
+        app.config.get('DB_READ_CONNECT') or pyodbc.connect,
+        app.config['DB_READ_POOL_SIZE'],
+    )
+
+def get_db_connection():
+    """
+    Check out a pooled connection for the current request.
+    SECURITY: the RLS session context is applied from the Flask session on checkout,
+    and the connection is returned (context cleared) on request teardown even if the route raised.
+    """
+    conn = g.get('db_conn')
+    if conn is None or conn.closed:
+        user_id = session.get('user_id') if 'role_id' in session else None
+        started = time.perf_counter()
+        conn = get_pool().acquire(user_id, session.get('role_id'))
+        # includes the wait for a free connection and the RLS context round trip
+        record_query('pool_checkout', time.perf_counter() - started)
+        g.db_conn = conn
+    return conn
+
+def record_write():
+    """
+    Call after a committed write: this user's reads stay on the primary for
+    READ_AFTER_WRITE_WINDOW seconds, so they see their own transfer even if the
+    replica is behind. Kept in the session cookie, so it holds across workers.
+    """
+    session['db_wrote_at'] = time.time()
+    g.db_read_target = 'primary'
+
+def read_target():
+    """'replica' or 'primary' for this request's reads, decided once per request"""
+    target = g.get('db_read_target')
+    if target is None:
+        app = current_app._get_current_object()
+        wrote_at = session.get('db_wrote_at')
+        if not replica_configured(app.config):
+            target, reason = 'primary', 'no_replica'
+        elif wrote_at and time.time() - wrote_at < app.config['READ_AFTER_WRITE_WINDOW']:
+            target, reason = 'primary', 'recent_write'
+        else:
+            target, reason = 'replica', 'read_only'
+        metrics.inc('ironvault_db_read_route_total', {'target': target, 'reason': reason})
+        g.db_read_target = target
+    return target
+
+def read_stream_connection(user_id, role_id):
+    """
+    Connection of its own for a read that outlives the request's connections (streamed
+    exports). Checked out before the response starts, so a replica that can't hand one
+    out falls back to the primary instead of cutting the download short after the 200.
+    The caller closes it, see Response.call_on_close.
+    """
+    if read_target() == 'replica':
+        started = time.perf_counter()
+        try:
+            conn = get_read_pool().acquire(user_id, role_id)
+            record_query('replica_pool_checkout', time.perf_counter() - started)
+            return conn
+        except Exception as e:
+            print(f"Read replica unavailable, streaming from the primary: {e}")
+            metrics.inc('ironvault_db_replica_fallbacks_total', {})
+    return get_pool().acquire(user_id, role_id)
+
+def get_read_connection():
+    """
+    Check out a connection for the current request's reads, see read_target().
+    Falls back to the primary when the replica can't hand out a connection.
+    SECURITY: same RLS session context as get_db_connection.
+    """
+    if read_target() != 'replica':
+        return get_db_connection()
+    conn = g.get('db_read_conn')
+    if conn is None or conn.closed:
+        user_id = session.get('user_id') if 'role_id' in session else None
+        started = time.perf_counter()
+        try:
+            conn = get_read_pool().acquire(user_id, session.get('role_id'))
+        except Exception as e:
+            # replica down or saturated, the primary can still answer
+            print(f"Read replica unavailable, reading from the primary: {e}")
+            metrics.inc('ironvault_db_replica_fallbacks_total', {})
+            g.db_read_target = 'primary'
+            return get_db_connection()
+        record_query('replica_pool_checkout', time.perf_counter() - started)
+        g.db_read_conn = conn
+    return conn
+
+def sql_error_number(exc):
+    """Native SQL Server error number of a driver error, e.g. 1205; None if there is none"""
+    for arg in getattr(exc, 'args', ()):
+        match = _NATIVE_ERROR_RE.search(str(arg))
+        if match:
+            return int(match.group(1))
+    return None
+
+def run_with_retry(conn, work, attempts=None, backoff=None):
+    """
+    work(cursor) and commit. Deadlock victims and lock timeouts (RETRYABLE_ERRORS) are
+    rolled back and run again after a jittered exponential backoff, so two requests that
+    collided don't collide again in lockstep. Other errors and the last attempt raise.
+    """
+    config = current_app.config
+    attempts = attempts or config['DB_RETRY_ATTEMPTS']
+    backoff = config['DB_RETRY_BACKOFF'] if backoff is None else backoff
+
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work(conn.cursor())
+            conn.commit()
+            return result
+        except Exception as e:
+            conn.rollback()
+            number = sql_error_number(e)
+            if number not in RETRYABLE_ERRORS or attempt == attempts:
+                raise
+            metrics.inc('ironvault_db_retries_total', {'error': str(number)})
+            # full jitter: anywhere between 0 and backoff * 2^(attempt-1)
+            time.sleep(random.uniform(0, backoff * 2 ** (attempt - 1)))
+
+def fetch_transaction_page(cursor, user_id, page_size, cursor_date=None, cursor_id=None):
+    """
+    One page of a user's transaction history, newest first.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    # ask for one extra row to know whether there is a next page
+    rows = procedures.fetch(cursor, 'sp_GetTransactionsByUserPage',
+                            UserID=user_id, PageSize=page_size + 1, CursorDate=cursor_date, CursorID=cursor_id)
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.Transaction_Date, last.TransactionID)
+    return rows, next_cursor
+
+def execute_audit_search(cursor, filters, page_size=None, cursor_date=None, cursor_id=None):
+    """
+    Run sp_SearchAuditLogs, newest first; the caller fetches (returns the Procedure).
+    filters: date_from, date_to, action_type, status, user_id (all optional).
+    page_size None is every matching row, for the streaming export.
+    """
+    return procedures.execute(
+        cursor, 'sp_SearchAuditLogs',
+        From=filters.get('date_from'), To=filters.get('date_to'), ActionType=filters.get('action_type'),
+        Status=filters.get('status'), UserID=filters.get('user_id'),
+        PageSize=page_size, CursorDate=cursor_date, CursorID=cursor_id
+    )
+
+def fetch_audit_page(cursor, filters, page_size, cursor_date=None, cursor_id=None):
+    """One page of the audit explorer, returns (rows, next_cursor) like fetch_transaction_page"""
+    procedure = execute_audit_search(cursor, filters, page_size + 1, cursor_date, cursor_id)
+    rows = procedures.fetch_rows(cursor, procedure)
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.Action_Date, last.LogID)
+    return rows, next_cursor
+
+def execute_statement(cursor, user_id, date_from, date_to):
+    """
+    Run sp_GetStatementByUser for [date_from, date_to), returns (acc_number, opening_balance)
+    and leaves the cursor on the transactions, oldest first, for the caller to fetch.
+    """
+    header = procedures.fetch_first(cursor, 'sp_GetStatementByUser', UserID=user_id, From=date_from, To=date_to)
+    cursor.nextset()
+    return header.Acc_Number, header.Opening_Balance
+
+def fetch_activity_summary(cursor, days, top):
+    """
+    sp_GetAccountActivitySummary for the last `days` days: returns (totals, daily, top_accounts),
+    totals one row, the other two lists of rows
+    """
+    totals, daily, top_accounts = procedures.fetch_all_results(cursor, 'sp_GetAccountActivitySummary', Days=days, Top=top)
+    return totals[0], daily, top_accounts
+
+# sortable columns per listing procedure, anything else falls back to UserID
+LISTING_SORTS = {
+    'sp_GetAllUsers': ('UserID', 'User_Name', 'Role_Name', 'Status'),
+    'sp_GetAllCustomerAccounts': ('UserID', 'User_Name', 'Acc_Balance'),
+}
+
+def fetch_listing_page(cursor, procedure, page=1, page_size=50, search=None, sort_by='UserID', sort_dir='ASC'):
+    """
+    One page of the admin/manager listings (sp_GetAllUsers, sp_GetAllCustomerAccounts).
+    Returns (rows, total, page), total counts every row matching the search;
+    a page past the end (e.g. after deletes) falls back to the first one.
+    """
+    if sort_by not in LISTING_SORTS[procedure]:
+        sort_by = 'UserID'
+    sort_dir = 'DESC' if str(sort_dir).upper() == 'DESC' else 'ASC'
+
+    rows = procedures.fetch(cursor, procedure,
+                            PageNumber=page, PageSize=page_size, Search=search or None, SortBy=sort_by, SortDir=sort_dir)
+    if not rows and page > 1:
+        return fetch_listing_page(cursor, procedure, 1, page_size, search, sort_by, sort_dir)
+    total = rows[0].TotalCount if rows else 0
+    return rows, total, page
+
 def set_rls_session_context(cursor, user_id, role_id):
     """
     Set session context for Row-Level Security (RLS)
     This tells SQL Server who the current user is so RLS can filter rows automatically
     """
     try:
-        cursor.execute("EXEC sp_set_session_context @key = N'user_id', @value = ?", (user_id,))
-        cursor.execute("EXEC sp_set_session_context @key = N'role_id', @value = ?", (role_id,))
+        cursor.execute(
+            "EXEC sp_set_session_context @key = N'user_id', @value = ?; "
+            "EXEC sp_set_session_context @key = N'role_id', @value = ?;",
+            (user_id, role_id)
+        )
     except Exception as e:
         # If RLS is not configured, this will fail silently
         # This allows the app to work even if RLS scripts haven't been run yet
@@ -60,11 +571,9 @@ def clear_rls_session_context(cursor):
     """
     try:
         cursor.execute(
-            "EXEC sp_set_session_context @key = N'user_id', @value = NULL"
-        )
-        cursor.execute(
-            "EXEC sp_set_session_context @key = N'role_id', @value = NULL"
+            "EXEC sp_set_session_context @key = N'user_id', @value = NULL; "
+            "EXEC sp_set_session_context @key = N'role_id', @value = NULL;"
         )
     except Exception as e:
         print(f"RLS session context not cleared (safe to ignore): {e}")
-        pass
\ No newline at end of file
+        pass
@@ -1,17 +1,31 @@
 from flask import session, flash, redirect, url_for
-from flask_limiter.util import get_remote_address
 from flask_limiter import Limiter
 from flask_wtf import CSRFProtect
+from utils.attempts import AttemptTracker
+from utils.cache import DashboardCache
+from utils.audit import AuditQueue
+from utils.passwords import PasswordHasher
+from utils.ratelimit import rate_limit_key  # also registers the hybrid+redis:// storage
 from functools import wraps
 
 # Initialize extensions
-limiter = Limiter(
-    key_func=get_remote_address,
-    storage_uri="memory://"
-)
+# storage from RATELIMIT_STORAGE_URI / RATELIMIT_STORAGE_OPTIONS, per user once logged in
+limiter = Limiter(key_func=rate_limit_key)
 
 csrf = CSRFProtect()
 
+# brute force protection, failed logins per email (shared via redis in production)
+login_attempts = AttemptTracker()
+
+# scrypt on a bounded pool of threads, so a login spike can't tie up every request thread
+password_hasher = PasswordHasher()
+
+# customer dashboard view model, invalidated by version bumps on every money movement
+dashboard_cache = DashboardCache()
+
+# app-side audit events (failed logins, lockouts), written in batches off the request path
+audit_queue = AuditQueue()
+
 def role_required(*allowed_roles):
     def decorator(f):
         @wraps(f)
@@ -0,0 +1,48 @@
+# gunicorn settings, taken from config.py so there is one place to tune them
+#   gunicorn -c gunicorn.conf.py wsgi:app
+from config import config
+import os
+
+env = os.getenv('FLASK_ENV', 'production')
+settings = config.get(env, config['production'])
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = settings.WEB_WORKERS
+threads = settings.WEB_THREADS
+worker_class = 'gthread'
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+keepalive = settings.WEB_KEEPALIVE
+
+# import the app once in the master and fork it, workers start faster and share memory.
+# Safe with extensions.py: CSRF is stateless (signed with SECRET_KEY), the limiter and
+# login-attempt stores are either per-process memory or redis-py clients, which reconnect
+# after a fork on their own. The hybrid limiter storage starts its sync thread per worker.
+# No DB connection is opened in the master (the pool is lazy), and post_fork drops any
+# that was, see below.
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+def post_fork(server, worker):
+    from database import reset_pool, warm_pool
+    from utils.actor import roles
+    from wsgi import app
+
+    # never share an ODBC socket with the master or a sibling
+    reset_pool(app)
+    warm_pool(app, settings.DB_POOL_WARM)
+    roles.names()  # load the role catalog before the first request
+
+def worker_exit(server, worker):
+    # graceful shutdown: close the idle connections instead of dropping the sockets
+    from extensions import audit_queue
+    from wsgi import app
+
+    # queued audit events first, they need the pool
+    audit_queue.close()
+    for key in ('db_pool', 'db_read_pool'):
+        pool = app.extensions.get(key)
+        if pool is not None:
+            pool.close_all()
@@ -1,13 +1,38 @@
-from flask import request, render_template
+from flask import request, render_template, g
+from utils.instrumentation import finish_request, server_timing, slow_query_log
+from utils.response_policy import apply_cache_policy, compress_response, asset_url
+import logging
+import time
 
 def configure_security_headers(app):
 
+    # slow-query log, one JSON object per line
+    if not slow_query_log.handlers:
+        handler = logging.FileHandler(app.config['SLOW_QUERY_LOG']) if app.config.get('SLOW_QUERY_LOG') else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        slow_query_log.addHandler(handler)
+        slow_query_log.setLevel(logging.WARNING)
+        slow_query_log.propagate = False
+
+    # versioned /static URLs, see utils/response_policy.py
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
     @app.after_request
     def add_security_headers(response):
-        # cache control headers
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
+        # per-request DB timings (utils/instrumentation.py)
+        started = g.get('request_started')
+        if started is not None:
+            total = time.perf_counter() - started
+            queries = finish_request(request.endpoint or 'unmatched', response.status_code, total, app.config.get('SLOW_QUERY_MS'))
+            if app.config.get('SERVER_TIMING'):
+                response.headers['Server-Timing'] = server_timing(queries, total)
+
+        # cache control headers: no-store for pages, immutable for versioned static assets
+        apply_cache_policy(response)
 
         # X-Frame-Options header to prevent clickjacking
         response.headers['X-Content-Type-Options'] = 'nosniff'
@@ -21,7 +46,8 @@ def configure_security_headers(app):
         if request.is_secure:
             response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
 
-        return response
+        # last, once the body is final
+        return compress_response(response)
     
 def configure_error_handlers(app):
     
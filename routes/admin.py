@@ -1,45 +1,151 @@
-from flask import Blueprint, request, redirect, url_for, session, flash
-from database import get_db_connection, get_user_role_name
-from extensions import role_required
-from utils.security import get_client_ip
+from datetime import datetime, timedelta
+from flask import Blueprint, request, redirect, url_for, flash, render_template, jsonify, current_app, Response, stream_with_context
+from database import get_db_connection, get_read_connection, read_stream_connection, record_write, fetch_audit_page, execute_audit_search, fetch_activity_summary
+from extensions import role_required, dashboard_cache, audit_queue
+from utils.actor import get_actor, update_actor_role
+from utils.pagination import decode_cursor, clamp_page_size
+from utils.serialization import json_safe
+from utils.export import stream_csv
+from utils import procedures
 
 admin_bp = Blueprint('admin', __name__)
 
+# Action_Type values written by the procedures and utils/audit.py, for the filter dropdown
+AUDIT_ACTIONS = ('LOGIN', 'ACCOUNT_LOCKOUT', 'TRANSFER', 'TRANSFER_BATCH', 'DEPOSIT', 'DELETE_USER', 'USER_UPDATE', 'ROLE_CHANGE', 'AUDIT_EXPORT')
+AUDIT_STATUSES = ('Success', 'Failed', 'Blocked')
+_AUDIT_FILTER_ARGS = ('from', 'to', 'action', 'status', 'user_id')
+
+def _audit_filter_args():
+    """The filters as given in the query string, carried over to the paging and export links"""
+    return {key: request.args[key] for key in _AUDIT_FILTER_ARGS if request.args.get(key)}
+
+def _audit_filters():
+    """Filters for sp_SearchAuditLogs, raises ValueError on malformed input"""
+    args = _audit_filter_args()
+    filters = {}
+    if 'from' in args:
+        filters['date_from'] = datetime.strptime(args['from'], '%Y-%m-%d')
+    if 'to' in args:
+        # the 'to' day itself is included
+        filters['date_to'] = datetime.strptime(args['to'], '%Y-%m-%d') + timedelta(days=1)
+    if 'action' in args:
+        filters['action_type'] = args['action'].strip().upper()[:255]
+    if 'status' in args:
+        if args['status'] not in AUDIT_STATUSES:
+            raise ValueError(f"Unknown status {args['status']!r}")
+        filters['status'] = args['status']
+    if 'user_id' in args:
+        filters['user_id'] = int(args['user_id'])
+    return filters
+
+@admin_bp.route('/admin/audit')
+@role_required(1)
+def audit():
+    try:
+        filters = _audit_filters()
+        cursor_date, cursor_id = decode_cursor(request.args.get('before'))
+    except ValueError:
+        flash("Invalid filter or page link!", "error")
+        return redirect(url_for('admin.audit'))
+
+    page_size = clamp_page_size(
+        request.args.get('limit'),
+        current_app.config['AUDIT_PAGE_SIZE'],
+        current_app.config['AUDIT_MAX_PAGE_SIZE']
+    )
+
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        logs, next_cursor = fetch_audit_page(cursor, filters, page_size, cursor_date, cursor_id)
+
+    if request.args.get('format') == 'json':
+        return jsonify(logs=[json_safe(log) for log in logs], next_cursor=next_cursor)
+
+    return render_template('admin_audit.html',
+                           logs=logs,
+                           next_cursor=next_cursor,
+                           filters=_audit_filter_args(),
+                           actions=AUDIT_ACTIONS,
+                           statuses=AUDIT_STATUSES)
+
+@admin_bp.route('/admin/audit/export')
+@role_required(1)
+def audit_export():
+    """Every row matching the filters as CSV, streamed in fetchmany batches"""
+    try:
+        filters = _audit_filters()
+    except ValueError:
+        flash("Invalid filter!", "error")
+        return redirect(url_for('admin.audit'))
+
+    actor = get_actor()
+    audit_queue.record('AUDIT_EXPORT', 'Success', f"CSV export, filters: {_audit_filter_args() or 'none'}",
+                       actor.user_id, actor.user_name, actor.role_name, actor.ip)
+
+    # its own connection for the whole download, not the request's: it is handed back
+    # when the last batch is sent or the client disconnects (GeneratorExit)
+    conn = read_stream_connection(actor.user_id, actor.role_id)
+    batch_size = current_app.config['AUDIT_EXPORT_BATCH']
+
+    def generate():
+        with conn:
+            cursor = conn.cursor()
+            execute_audit_search(cursor, filters)
+            yield from stream_csv(cursor, batch_size)
+
+    filename = f"audit_log_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    response = Response(stream_with_context(generate()), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',  # a proxy in front must not buffer the whole file
+    })
+    # also when the body is never read, closing twice is a no-op
+    response.call_on_close(conn.close)
+    return response
+
+@admin_bp.route('/manager/analytics')
+@role_required(3)
+def analytics():
+    """Deposit / transfer totals, a daily series and the top accounts, from the daily aggregates"""
+    days = clamp_page_size(request.args.get('days'), current_app.config['ANALYTICS_DAYS'], current_app.config['ANALYTICS_MAX_DAYS'])
+    top = clamp_page_size(request.args.get('top'), current_app.config['ANALYTICS_TOP_ACCOUNTS'], 100)
+
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        totals, daily, top_accounts = fetch_activity_summary(cursor, days, top)
+
+    return jsonify(days=days,
+                   totals=json_safe(totals),
+                   daily=[json_safe(day) for day in daily],
+                   top_accounts=[json_safe(account) for account in top_accounts])
+
 @admin_bp.route('/delete_user/<int:user_id>', methods=['POST'])
 @role_required(3)
 def delete_user(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Check if user exists first
-        cursor.execute("EXEC dbo.sp_GetUserById @UserID = ?", (user_id,))
-        user_check = cursor.fetchone()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
 
-        if not user_check:
-            flash(f"User ID {user_id} not found!", "error")
-            conn.close()
-            return redirect(url_for('main.dashboard'))
-        
-        actor_user_id = session['user_id']
-        actor_user_name = session['user_name']
-        actor_role_name = get_user_role_name(cursor, actor_user_id)
-        actor_ip = get_client_ip()
-
-        cursor.execute(
-            "EXEC dbo.sp_DeleteUser @UserID = ?, @ActorUserID = ?, @ActorUserName = ?, @ActorRoleName = ?, @ActorIP = ?",
-            (user_id, actor_user_id, actor_user_name, actor_role_name, actor_ip)
-        )
-
-        conn.commit()
-        flash(f"User deleted successfully!", "success")
-
-    except Exception as e:
-        conn.rollback()
-        print(e)
-        flash("Failed to delete user. Please try again.", "error")
-    finally:
-        conn.close()
+        try:
+            # Check if user exists first
+            user_check = procedures.fetch_first(cursor, 'sp_GetUserById', UserID=user_id)
+
+            if not user_check:
+                flash(f"User ID {user_id} not found!", "error")
+                return redirect(url_for('main.dashboard'))
+            
+            actor = get_actor()
+
+            procedures.execute(cursor, 'sp_DeleteUser', UserID=user_id, ActorUserID=actor.user_id,
+                               ActorUserName=actor.user_name, ActorRoleName=actor.role_name, ActorIP=actor.ip)
+
+            conn.commit()
+            dashboard_cache.bump(user_ids=[user_id])
+            record_write()
+            flash(f"User deleted successfully!", "success")
+
+        except Exception as e:
+            conn.rollback()
+            print(e)
+            flash("Failed to delete user. Please try again.", "error")
         
     return redirect(url_for('main.dashboard'))
 
@@ -54,47 +160,35 @@ def update_role():
         flash("Missing required fields!", "error")
         return redirect(url_for('main.dashboard'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if user exists
-    cursor.execute("EXEC dbo.sp_GetUserById @UserID = ?", (target_user_id,))
-    user_check = cursor.fetchone()
-    
-    if not user_check:
-        flash(f"User ID {target_user_id} not found!", "error")
-        conn.close()
-        return redirect(url_for('main.dashboard'))
-    
-    try:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         
+        # Check if user exists
+        user_check = procedures.fetch_first(cursor, 'sp_GetUserById', UserID=target_user_id)
+        
+        if not user_check:
+            flash(f"User ID {target_user_id} not found!", "error")
+            return redirect(url_for('main.dashboard'))
         
-        actor_user_id = session['user_id']
-        actor_user_name = session['user_name']
-        actor_role_name = get_user_role_name(cursor, actor_user_id)
-        actor_ip = get_client_ip()
-
-        cursor.execute(
-            """
-            EXEC dbo.sp_UpdateUserRoleAndStatus 
-                @TargetUserID = ?, 
-                @NewRoleID = ?, 
-                @NewStatus = ?, 
-                @ActorUserID = ?, 
-                @ActorUserName = ?, 
-                @ActorRoleName = ?, 
-                @ActorIP = ?
-            """,
-            (target_user_id, new_role_id, new_status, actor_user_id, actor_user_name, actor_role_name, actor_ip)
-        )
-
-        conn.commit()
-        flash("User updated successfully!", "success")
-
-    except Exception as e:
-        conn.rollback()
-        flash(f"Failed to update user. Error: {str(e)}", "error")
-    finally:
-        conn.close()
+        try:
+            actor = get_actor()
+
+            procedures.execute(cursor, 'sp_UpdateUserRoleAndStatus',
+                               TargetUserID=target_user_id, NewRoleID=new_role_id, NewStatus=new_status,
+                               ActorUserID=actor.user_id, ActorUserName=actor.user_name,
+                               ActorRoleName=actor.role_name, ActorIP=actor.ip)
+
+            conn.commit()
+            dashboard_cache.bump(user_ids=[int(target_user_id)])
+            record_write()
+
+            # changed their own role: the session (and RLS context) must follow
+            if int(target_user_id) == actor.user_id:
+                update_actor_role(int(new_role_id))
+            flash("User updated successfully!", "success")
+
+        except Exception as e:
+            conn.rollback()
+            flash(f"Failed to update user. Error: {str(e)}", "error")
         
     return redirect(url_for('main.dashboard'))
\ No newline at end of file
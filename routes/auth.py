@@ -1,17 +1,15 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from utils.validation import validate_email, validate_name, validate_password
-from utils.security import hash_password, generate_salt, get_client_ip
-from database import get_db_connection, get_user_role_name, set_rls_session_context, clear_rls_session_context
-from datetime import datetime, timedelta
-from extensions import limiter
+from utils.security import generate_salt, get_client_ip, email_fingerprint
+from utils.passwords import PasswordBusy
+from database import get_db_connection, record_write
+from utils.actor import roles
+from utils import procedures
+from extensions import limiter, login_attempts, password_hasher, audit_queue
+import math
 
 auth_bp = Blueprint('auth', __name__)
 
-# Brute force protection - track failed login attempts
-failed_attempts = {}  # {email: {'count': 0, 'lockout_until': None}}
-MAX_ATTEMPTS = 5
-LOCKOUT_MINUTES = 5
-
 @auth_bp.route('/')
 def home():
     return redirect(url_for('auth.login'))
@@ -22,57 +20,71 @@ def login():
         email = request.form['email']
         password_input = request.form['password']
 
-        # Check if account is locked
-        if email in failed_attempts:
-            lockout_until = failed_attempts[email].get('lockout_until')
-            if lockout_until and datetime.now() < lockout_until:
-                remaining = (lockout_until - datetime.now()).seconds // 60 + 1
-                flash(f"Account locked. Try again in {remaining} minute(s).", "error")
-                return render_template('login.html')
-            elif lockout_until and datetime.now() >= lockout_until:
-                # Reset after lockout expires
-                failed_attempts[email] = {'count': 0, 'lockout_until': None}
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # Check if account is locked (counter shared by every worker, see utils/attempts.py)
+        locked_for = login_attempts.locked_for(email)
+        if locked_for:
+            audit_queue.record('LOGIN', 'Blocked', f'Login attempt on locked account {email_fingerprint(email)}', ip=get_client_ip())
+            remaining = math.ceil(locked_for / 60)
+            flash(f"Account locked. Try again in {remaining} minute(s).", "error")
+            return render_template('login.html')
 
-        cursor.execute("EXEC dbo.sp_GetUserByEmail @Email = ?", (email,))
-        user = cursor.fetchone()
+        # only the lookup holds a connection, the hash below can take a while under load
+        with get_db_connection() as conn:
+            user = procedures.fetch_first(conn.cursor(), 'sp_GetUserByEmail', Email=email)
 
         if user:
             stored_hash = user.User_PasswordHash
             stored_salt = user.User_Salt
-            input_hash = hash_password(password_input, stored_salt) #Re-create the hash using the Input Password + Stored Salt
-            
-            if input_hash == stored_hash:
-                if email in failed_attempts:
-                    del failed_attempts[email]
+            try:
+                # scrypt or legacy SHA-256, on the password pool (utils/passwords.py)
+                valid = password_hasher.verify(password_input, stored_salt, stored_hash)
+            except PasswordBusy:
+                flash("Too many sign-ins right now, please try again in a moment.", "error")
+                return render_template('login.html'), 503
+
+            if valid:
+                login_attempts.reset(email)
+
+                # upgrade legacy / outdated hashes while we have the plain password
+                new_hash = None
+                if password_hasher.needs_rehash(stored_hash):
+                    try:
+                        new_hash = password_hasher.hash(password_input, stored_salt)
+                    except PasswordBusy:
+                        pass  # still valid, upgraded on a later login
 
                 session['user_id'] = user.UserID
                 session['user_name'] = user.User_Name
                 session['role_id'] = user.RoleID
 
-                set_rls_session_context(cursor, user.UserID, user.RoleID)
+                # checked out again with the user's RLS session context
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    if new_hash is not None:
+                        procedures.execute(cursor, 'sp_UpdatePasswordHash', UserID=user.UserID, PasswordHash=new_hash)
+
+                    # Update last_login timestamp
+                    ip_address = get_client_ip()
+                    procedures.execute(cursor, 'sp_UserLogin', UserID=user.UserID, IP_Address=ip_address)
+                    conn.commit()
+                # the first dashboard reads from the primary, a just-registered account may not be on the replica yet
+                record_write()
 
-                # Update last_login timestamp
-                ip_address = get_client_ip()
-                cursor.execute("EXEC sp_UserLogin ?, ?", (user.UserID, ip_address))
-                conn.commit()
-            
                 return redirect(url_for('main.dashboard'))
             else:
-                if email not in failed_attempts:
-                    failed_attempts[email] = {'count': 0, 'lockout_until': None}
-                failed_attempts[email]['count'] += 1
-                attempts_left = MAX_ATTEMPTS - failed_attempts[email]['count']
-                if attempts_left <= 0:
-                    failed_attempts[email]['lockout_until'] = datetime.now() + timedelta(minutes=LOCKOUT_MINUTES)
-                    flash(f"Too many failed attempts. Account locked for {LOCKOUT_MINUTES} minutes.", "error")
+                attempts_left, locked_for = login_attempts.record_failure(email)
+                # queued, written in batches by utils/audit.py
+                actor = (user.UserID, user.User_Name, roles.name(user.RoleID), get_client_ip())
+                audit_queue.record('LOGIN', 'Failed', 'Invalid password', *actor)
+                if locked_for:
+                    lockout_minutes = login_attempts.lockout_seconds // 60
+                    audit_queue.record('ACCOUNT_LOCKOUT', 'Success', f'Locked for {lockout_minutes} minutes after too many failed attempts', *actor)
+                    flash(f"Too many failed attempts. Account locked for {lockout_minutes} minutes.", "error")
                 else:
                     flash(f"Invalid Password! {attempts_left} attempt(s) remaining.", "error")
         else:
+            audit_queue.record('LOGIN', 'Failed', f'Unknown email {email_fingerprint(email)}', ip=get_client_ip())
             flash("User not found!", "error")
-        conn.close()
     return render_template('login.html')
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
@@ -98,46 +110,33 @@ def register():
         
         # SECURITY: Create a unique Salt and Hash
         new_salt = generate_salt()
-        new_hash = hash_password(password, new_salt)
+        try:
+            new_hash = password_hasher.hash(password, new_salt)
+        except PasswordBusy:
+            flash("Too many sign-ups right now, please try again in a moment.", "error")
+            return render_template('register.html'), 503
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        try:
+            try:
 
-            # use procedure, create user account, with bank account
-            cursor.execute("""
-                EXEC dbo.sp_CreateAccount
-                    @UserName = ?,
-                    @Email = ?,
-                    @PasswordHash = ?,
-                    @Salt = ?,
-                    @RoleID = 2
-            """, (name, email, new_hash, new_salt))
-
-            conn.commit()
-            flash("Registration Successful! Please Login.", "success")
-            return redirect(url_for('auth.login'))
-        
-        except Exception as e:
-            flash(str(e), "error") # show message returned by the procedure
+                # use procedure, create user account, with bank account
+                procedures.execute(cursor, 'sp_CreateAccount',
+                                   UserName=name, Email=email, PasswordHash=new_hash, Salt=new_salt, RoleID=2)
 
-        finally:
-            conn.close()
+                conn.commit()
+                flash("Registration Successful! Please Login.", "success")
+                return redirect(url_for('auth.login'))
+        
+            except Exception as e:
+                flash(str(e), "error") # show message returned by the procedure
 
     return render_template('register.html')
 
 @auth_bp.route('/logout')
 def logout():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    try:
-        clear_rls_session_context(cursor)
-        conn.commit() 
-    finally:
-        cursor.close()
-        conn.close()
-    
+    # the pool clears the RLS session context whenever a connection is returned,
+    # so there is nothing left to reset on the database side
     session.clear()
     return redirect(url_for('auth.login'))
\ No newline at end of file
@@ -1,61 +1,115 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from database import get_db_connection
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, jsonify
+from database import fetch_transaction_page, fetch_listing_page, read_target
+from utils.dashboard import load_panel
+from utils import procedures
+from extensions import role_required, dashboard_cache
 
 main_bp = Blueprint('main', __name__)
 
+def _listing_args(prefix):
+    """page/search/sort for one of the dashboard listings, e.g. ?users_page=2&users_q=Na"""
+    try:
+        page = max(1, int(request.args.get(f'{prefix}_page', 1)))
+    except ValueError:
+        page = 1
+    return {
+        'page': page,
+        'search': request.args.get(f'{prefix}_q', '').strip()[:100],
+        'sort_by': request.args.get(f'{prefix}_sort', 'UserID'),
+        'sort_dir': request.args.get(f'{prefix}_dir', 'ASC'),
+    }
+
+def _listing(rows, total, page, page_size, args):
+    return dict(args, rows=rows, total=total, page=page, pages=max(1, -(-total // page_size)))
+
+# each panel is one independent read, see utils/dashboard.py
+
+def _accounts_panel(user_id):
+    return lambda cursor: procedures.fetch(cursor, 'sp_GetAccountsByUser', UserID=user_id)
+
+def _transactions_panel(user_id, page_size):
+    # only the latest rows, older history is paged through /transactions
+    return lambda cursor: fetch_transaction_page(cursor, user_id, page_size)
+
+def _audit_panel(top):
+    return lambda cursor: procedures.fetch(cursor, 'sp_GetAuditLogs', Top=top)
+
+def _listing_panel(procedure, prefix, page_size):
+    args = _listing_args(prefix)
+
+    def load(cursor):
+        rows, total, page = fetch_listing_page(cursor, procedure, page_size=page_size, **args)
+        return _listing(rows, total, page, page_size, args)
+    return load
+
 @main_bp.route('/dashboard')
 def dashboard():
+    """
+    The shell: greeting and balances only. Every other panel is fetched by the page
+    from /api/dashboard/<panel> once it scrolls into view, so its query only runs for
+    panels someone actually looks at.
+    """
     if 'user_id' not in session : return redirect(url_for('auth.login'))
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+
     role_id = session['role_id']
     user_id = session['user_id']
-    
-    # CUSTOMER DATA (Everyone gets this)
-    cursor.execute("EXEC dbo.sp_GetAccountsByUser @UserID = ?", (user_id,))
-    my_accounts = [dict(zip([column[0] for column in cursor.description], row)) for row in cursor.fetchall()]
-    if my_accounts:
-        user_name = my_accounts[0]['User_Name']
-    
-    user_id = session['user_id']
-    cursor.execute("EXEC dbo.sp_GetTransactionsByUser @UserID = ?", (user_id,))
-    rows = cursor.fetchall()
-    columns = [column[0] for column in cursor.description]
-    my_transactions = [dict(zip(columns, row)) for row in rows]
-
-    # MANAGER DATA (Role 3)
-    all_customer_accounts = []
-    if role_id == 3: 
-        cursor.execute("EXEC dbo.sp_GetAllCustomerAccounts")
-        rows = cursor.fetchall()
-        columns = [column[0] for column in cursor.description]
-        all_customer_accounts = [dict(zip(columns, row)) for row in rows]
-
-    # ADMIN DATA (Role 1)
-    security_logs = []
-    admin_user_list = []
-    if role_id == 1:
-        # Get recent audit logs
-        cursor.execute("EXEC dbo.sp_GetAuditLogs @Top = ?", (50,))
-        rows = cursor.fetchall()
-        columns = [column[0] for column in cursor.description]
-        security_logs = [dict(zip(columns, row)) for row in rows]
-
-        # Get all users for management
-        cursor.execute("EXEC dbo.sp_GetAllUsers")
-        rows = cursor.fetchall()
-        columns = [column[0] for column in cursor.description]
-        admin_user_list = [dict(zip(columns, row)) for row in rows]
-
-    conn.close()
-    
-    return render_template('dashboard.html', 
-                           user_name=user_name, 
+
+    accounts, unavailable = [], []
+    if role_id == 2:
+        accounts, unavailable = _cached_panel('accounts', _accounts_panel(user_id), user_id, role_id)
+    user_name = accounts[0]['User_Name'] if accounts else session.get('user_name')
+
+    return render_template('dashboard.html',
+                           user_name=user_name,
                            role_id=role_id,
-                           accounts=my_accounts, 
-                           transactions=my_transactions,
-                           all_customers=all_customer_accounts,
-                           audit_logs=security_logs,
-                           admin_users=admin_user_list)  # Pass the list to HTML
\ No newline at end of file
+                           accounts=accounts or [],
+                           unavailable=unavailable)  # Pass the list to HTML
+
+def _cached_panel(name, loader, user_id, role_id):
+    """(value, unavailable) of a customer panel, from the cache unless money moved since it was read"""
+    cached, cache_token = dashboard_cache.lookup(user_id, role_id, name)
+    if cached is not None:
+        return cached, []
+    value, unavailable = load_panel(name, loader)
+    if not unavailable:
+        # the account numbers are known once the shell has read the accounts
+        accounts = [a['Acc_Number'] for a in value] if name == 'accounts' else (cache_token or {}).get('accounts')
+        if accounts is not None:
+            # a replica may trail a counterparty's transfer by its lag, don't keep that view for the full TTL
+            ttl = current_app.config['DB_READ_CACHE_TTL'] if read_target() == 'replica' else None
+            dashboard_cache.store(user_id, role_id, name, value, accounts, cache_token, ttl)
+    return value, unavailable
+
+def _panel_response(template, unavailable, **context):
+    """One lazily loaded panel: its HTML fragment, or 503 so the page shows it as unavailable"""
+    if unavailable:
+        return jsonify(error='unavailable'), 503
+    return jsonify(html=render_template(template, **context))
+
+@main_bp.route('/api/dashboard/transactions')
+@role_required(2)
+def panel_transactions():
+    user_id, role_id = session['user_id'], session['role_id']
+    page, unavailable = _cached_panel('transactions', _transactions_panel(user_id, current_app.config['DASHBOARD_TRANSACTIONS']), user_id, role_id)
+    transactions, next_cursor = page or ([], None)
+    return _panel_response('_panel_transactions.html', unavailable, transactions=transactions, next_cursor=next_cursor)
+
+@main_bp.route('/api/dashboard/audit')
+@role_required(1)
+def panel_audit():
+    audit_logs, unavailable = load_panel('audit_logs', _audit_panel(50))
+    return _panel_response('_panel_audit.html', unavailable, audit_logs=audit_logs or [])
+
+@main_bp.route('/api/dashboard/users')
+@role_required(1)
+def panel_users():
+    loader = _listing_panel('sp_GetAllUsers', 'users', current_app.config['ADMIN_LIST_PAGE_SIZE'])
+    users, unavailable = load_panel('users', loader)
+    return _panel_response('_panel_users.html', unavailable, users_listing=users)
+
+@main_bp.route('/api/dashboard/customers')
+@role_required(3)
+def panel_customers():
+    loader = _listing_panel('sp_GetAllCustomerAccounts', 'customers', current_app.config['ADMIN_LIST_PAGE_SIZE'])
+    customers, unavailable = load_panel('customers', loader)
+    return _panel_response('_panel_customers.html', unavailable, customers_listing=customers)
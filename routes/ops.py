@@ -0,0 +1,67 @@
+from flask import Blueprint, Response, request, current_app, abort, jsonify
+from utils.instrumentation import metrics
+from extensions import dashboard_cache, audit_queue, password_hasher
+from database import get_pool
+import threading
+import hmac
+import time
+
+ops_bp = Blueprint('ops', __name__)
+
+# last readiness result, shared by the threads of this worker
+_ready = {'checked_at': 0.0, 'ok': False, 'error': None}
+_ready_lock = threading.Lock()
+
+@ops_bp.route('/healthz')
+def liveness():
+    # the process is up and serving, no DB call (a DB outage shouldn't get workers restarted)
+    return jsonify(status='ok')
+
+@ops_bp.route('/readyz')
+def readiness():
+    """DB reachable? Checked at most every HEALTH_CHECK_TTL seconds, over a pooled connection"""
+    ttl = current_app.config['HEALTH_CHECK_TTL']
+    with _ready_lock:
+        if time.monotonic() - _ready['checked_at'] >= ttl:
+            try:
+                # acquire() health-checks idle connections itself, SELECT 1 covers fresh ones
+                with get_pool().acquire(timeout=2) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                _ready.update(ok=True, error=None)
+            except Exception as e:
+                _ready.update(ok=False, error=type(e).__name__)
+            _ready['checked_at'] = time.monotonic()
+        ok, error = _ready['ok'], _ready['error']
+
+    if not ok:
+        return jsonify(status='unavailable', error=error), 503
+    return jsonify(status='ok')
+
+@ops_bp.route('/metrics')
+def prometheus_metrics():
+    # SECURITY: procedure names and timings are internal, lock them behind a token when one is set;
+    # production never serves them without one (METRICS_REQUIRE_TOKEN)
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token and current_app.config.get('METRICS_REQUIRE_TOKEN'):
+        abort(404)
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {token}'):
+            abort(401)
+
+    gauges = {}
+    pool = current_app.extensions.get('db_pool')
+    if pool is not None:
+        for name, value in pool.metrics().items():
+            gauges[f'ironvault_db_pool_{name}'] = value
+    read_pool = current_app.extensions.get('db_read_pool')
+    if read_pool is not None:
+        for name, value in read_pool.metrics().items():
+            gauges[f'ironvault_db_read_pool_{name}'] = value
+    gauges['ironvault_dashboard_cache_hit_ratio'] = dashboard_cache.stats()['hit_ratio']
+    gauges['ironvault_audit_events_pending'] = audit_queue.pending()
+    gauges['ironvault_password_queue_depth'] = password_hasher.depth()
+
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
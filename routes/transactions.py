@@ -1,7 +1,14 @@
-from flask import Blueprint, request, redirect, url_for, session, flash
-from database import get_db_connection, get_user_role_name
-from utils.security import get_client_ip
-from extensions import role_required
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import Blueprint, request, redirect, url_for, session, flash, render_template, jsonify, current_app, Response, stream_with_context
+from database import get_db_connection, get_read_connection, read_stream_connection, record_write, fetch_transaction_page, run_with_retry, execute_statement
+from utils.pagination import decode_cursor, clamp_page_size
+from utils.serialization import json_safe
+from utils.batch import parse_transfer_batch, BatchTooLarge
+from utils.actor import get_actor
+from utils.export import stream_statement
+from utils import procedures
+from extensions import role_required, dashboard_cache
 
 transaction_bp = Blueprint('transactions', __name__)
 
@@ -26,22 +33,23 @@ def transfer():
         flash("Invalid amount format!", "error")
         return redirect(url_for('main.dashboard'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            "EXEC dbo.sp_TransferFunds @SenderUserID = ?, @ReceiverAccNumber = ?, @Amount = ?, @ActorIP = ?",
-            (sender_id, receiver_acc_num, amount, get_client_ip())
-        )
-        conn.commit()
-        flash(f"Successfully transferred RM {amount:.2f} to account {receiver_acc_num}!", "success")
+    actor = get_actor()
+
+    with get_db_connection() as conn:
+        try:
+            # name and role come from the actor context, the procedure skips its own lookup;
+            # a deadlock victim is retried, the user only sees the final outcome
+            run_with_retry(conn, lambda cursor: procedures.execute(
+                cursor, 'sp_TransferFunds', SenderUserID=sender_id, ReceiverAccNumber=receiver_acc_num, Amount=amount,
+                ActorIP=actor.ip, ActorUserName=actor.user_name, ActorRoleName=actor.role_name
+            ))
+            # both dashboards changed
+            dashboard_cache.bump(user_ids=[sender_id], accounts=[receiver_acc_num])
+            record_write()
+            flash(f"Successfully transferred RM {amount:.2f} to account {receiver_acc_num}!", "success")
         
-    except Exception as e:
-        conn.rollback()
-        flash(f"Transfer failed: {str(e)}", "error")
-    finally:
-        conn.close()
+        except Exception as e:
+            flash(f"Transfer failed: {str(e)}", "error")
         
     return redirect(url_for('main.dashboard'))
 
@@ -61,35 +69,157 @@ def deposit():
         flash("Invalid amount format!", "error")
         return redirect(url_for('main.dashboard'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            "EXEC dbo.sp_Deposit @UserID = ?, @Amount = ?, @ActorIP = ?",
-            (session['user_id'], amount, get_client_ip())
-        )
-        conn.commit()
-        flash(f"Successfully deposited RM {amount:.2f}!", "success")
+    actor = get_actor()
+
+    with get_db_connection() as conn:
+        try:
+            run_with_retry(conn, lambda cursor: procedures.execute(
+                cursor, 'sp_Deposit', UserID=actor.user_id, Amount=amount,
+                ActorIP=actor.ip, ActorUserName=actor.user_name, ActorRoleName=actor.role_name
+            ))
+            dashboard_cache.bump(user_ids=[actor.user_id])
+            record_write()
+            flash(f"Successfully deposited RM {amount:.2f}!", "success")
         
-    except Exception as e:
-        conn.rollback()
-        flash(f"Deposit failed: {str(e)}", "error")
-    finally:
-        conn.close()
+        except Exception as e:
+            flash(f"Deposit failed: {str(e)}", "error")
         
     return redirect(url_for('main.dashboard'))
 
+@transaction_bp.route('/transfer/batch', methods=['POST'])
+@role_required(2)
+def transfer_batch():
+    """
+    Payroll style batch: CSV upload (field 'file' or a text/csv body, receiver_acc,amount
+    per line) or a JSON array of {receiver_acc, amount}. All valid rows are applied by
+    sp_TransferFundsBatch in one transaction, the response has a result per row.
+    """
+    max_rows = current_app.config['TRANSFER_BATCH_MAX_ROWS']
+    try:
+        if request.is_json:
+            valid, rejected = parse_transfer_batch(payload=request.get_json(silent=True), max_rows=max_rows)
+        elif 'file' in request.files:
+            valid, rejected = parse_transfer_batch(stream=request.files['file'].stream, max_rows=max_rows)
+        elif request.mimetype == 'text/csv':
+            valid, rejected = parse_transfer_batch(stream=request.stream, max_rows=max_rows)
+        else:
+            return jsonify(error="Upload a CSV file or a JSON array of transfers."), 400
+    except (BatchTooLarge, ValueError, UnicodeDecodeError) as e:
+        return jsonify(error=str(e)), 400
+
+    results = rejected
+    if valid:
+        actor = get_actor()
+        with get_db_connection() as conn:
+            try:
+                # the whole batch is one table-valued parameter (dbo.TransferBatchType)
+                rows = run_with_retry(conn, lambda cursor: procedures.fetch(
+                    cursor, 'sp_TransferFundsBatch', SenderUserID=actor.user_id, Transfers=valid,
+                    ActorIP=actor.ip, ActorUserName=actor.user_name, ActorRoleName=actor.role_name
+                ))
+            except Exception as e:
+                return jsonify(error=f"Batch transfer failed: {str(e)}"), 400
+
+        results = results + [{
+            'row': row.RowNo,
+            'receiver_acc': row.ReceiverAccNumber,
+            'amount': str(row.Amount),
+            'status': row.Status,
+            'message': row.Message,
+        } for row in rows]
+        results.sort(key=lambda r: r['row'])
+        dashboard_cache.bump(
+            user_ids=[actor.user_id],
+            accounts={r['receiver_acc'] for r in results if r['status'] == 'Success'}
+        )
+        record_write()
+
+    succeeded = [r for r in results if r['status'] == 'Success']
+    return jsonify(
+        submitted=len(results),
+        succeeded=len(succeeded),
+        rejected=len(results) - len(succeeded),
+        total_transferred=str(sum((Decimal(r['amount']) for r in succeeded), Decimal('0.00'))),
+        results=results,
+    )
+
+@transaction_bp.route('/transactions')
+@role_required(2)
+def history():
+    try:
+        cursor_date, cursor_id = decode_cursor(request.args.get('before'))
+    except ValueError:
+        flash("Invalid page link!", "error")
+        return redirect(url_for('transactions.history'))
+
+    page_size = clamp_page_size(
+        request.args.get('limit'),
+        current_app.config['TRANSACTIONS_PAGE_SIZE'],
+        current_app.config['TRANSACTIONS_MAX_PAGE_SIZE']
+    )
+
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        transactions, next_cursor = fetch_transaction_page(cursor, session['user_id'], page_size, cursor_date, cursor_id)
+
+    if request.args.get('format') == 'json':
+        payload = {'transactions': [json_safe(t) for t in transactions], 'next_cursor': next_cursor}
+        if request.args.get('partial'):
+            # rendered rows for the "Load more" button
+            payload['html'] = render_template('_transaction_rows.html', transactions=transactions)
+        return jsonify(payload)
+
+    return render_template('transactions.html', transactions=transactions, next_cursor=next_cursor)
+
+def _statement_range():
+    """[from, to) of the statement request; 'to' is inclusive in the form. Raises ValueError."""
+    date_to = request.args.get('to', '').strip()
+    date_to = datetime.strptime(date_to, '%Y-%m-%d') if date_to else datetime.combine(date.today(), datetime.min.time())
+    date_from = request.args.get('from', '').strip()
+    date_from = (datetime.strptime(date_from, '%Y-%m-%d') if date_from
+                 else date_to - timedelta(days=current_app.config['STATEMENT_DEFAULT_DAYS'] - 1))
+    if date_from > date_to:
+        raise ValueError("Statement starts after it ends")
+    return date_from, date_to + timedelta(days=1)
+
+@transaction_bp.route('/statement')
+@role_required(2, 3)
+def statement():
+    """Own account statement for a date range, streamed as CSV with a running balance"""
+    try:
+        date_from, date_to = _statement_range()
+    except ValueError:
+        flash("Invalid statement dates!", "error")
+        return redirect(url_for('main.dashboard'))
+
+    actor = get_actor()
+    # its own connection under the caller's RLS context for the whole download
+    conn = read_stream_connection(actor.user_id, actor.role_id)
+    batch_size = current_app.config['STATEMENT_BATCH']
+
+    def generate():
+        # rows are fetched batch by batch as the client reads them
+        with conn:
+            cursor = conn.cursor()
+            _, opening_balance = execute_statement(cursor, actor.user_id, date_from, date_to)
+            yield from stream_statement(cursor, opening_balance, batch_size)
+
+    filename = f"statement_{date_from:%Y%m%d}_{date_to - timedelta(days=1):%Y%m%d}.csv"
+    response = Response(stream_with_context(generate()), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+    # also when the body is never read, closing twice is a no-op
+    response.call_on_close(conn.close)
+    return response
 
 @transaction_bp.route('/debug-balance-check')
 def debug_balance_check():
     from flask import jsonify
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
         # Query 2: Check what SESSION_CONTEXT sees
         cursor.execute("""
             SELECT 
@@ -97,15 +227,12 @@ def debug_balance_check():
                 CAST(SESSION_CONTEXT(N'role_id') AS INT) AS ContextRoleID
         """)
         context = cursor.fetchone()
-        
+        cursor.close()
+
         return jsonify({
             "flask_session_user_id": session.get('user_id'),
             "flask_session_role_id": session.get('role_id'),
             "db_context_user_id": context[0] if context else None,
             "db_context_role_id": context[1] if context else None,
             "rls_working": context[0] == session.get('user_id')
-        })
-        
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        })
\ No newline at end of file
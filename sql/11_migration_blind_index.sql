@@ -0,0 +1,122 @@
+-- =============================================
+-- Step 11: Blind Index for Account Numbers
+-- Acc_Number_Hash hashes the ciphertext, which is randomised,
+-- so it cannot be used to look an account up by its number.
+-- Add a keyed HMAC-SHA256 of the plaintext instead, so transfers
+-- can seek the receiver without decrypting every account.
+-- Safe to run more than once
+-- =============================================
+
+USE IronVaultDB;
+GO
+
+-- 1. Blind index key, a random 32 byte secret kept encrypted by the symmetric key
+IF OBJECT_ID('dbo.Blind_Index_Key', 'U') IS NULL
+BEGIN
+    CREATE TABLE Blind_Index_Key (
+        KeyID INT PRIMARY KEY,
+        Key_Encrypted VARBINARY(MAX) NOT NULL,
+        Created_Date DATETIME DEFAULT GETDATE()
+    );
+    PRINT 'Blind_Index_Key table created.';
+END
+GO
+
+OPEN SYMMETRIC KEY IronVaultSymKey
+DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+
+IF NOT EXISTS (SELECT 1 FROM Blind_Index_Key WHERE KeyID = 1)
+BEGIN
+    INSERT INTO Blind_Index_Key (KeyID, Key_Encrypted)
+    VALUES (1, EncryptByKey(Key_GUID('IronVaultSymKey'), CRYPT_GEN_RANDOM(32)));
+    PRINT 'Blind index key generated.';
+END
+
+CLOSE SYMMETRIC KEY IronVaultSymKey;
+GO
+
+-- 2. HMAC-SHA256, T-SQL has no built-in
+-- HMAC(K, m) = SHA256((K xor opad) + SHA256((K xor ipad) + m)), keys up to 64 bytes
+CREATE OR ALTER FUNCTION dbo.fn_HmacSha256(@Key VARBINARY(64), @Message VARBINARY(MAX))
+RETURNS VARBINARY(32)
+WITH SCHEMABINDING
+AS
+BEGIN
+    -- zero pad the key to the 64 byte block size
+    DECLARE @PaddedKey BINARY(64) = CAST(@Key AS BINARY(64));
+    DECLARE @InnerKey VARBINARY(64) = 0x;
+    DECLARE @OuterKey VARBINARY(64) = 0x;
+    DECLARE @i INT = 1;
+
+    -- xor 8 bytes at a time
+    WHILE @i <= 64
+    BEGIN
+        SET @InnerKey = @InnerKey + CAST(CAST(SUBSTRING(@PaddedKey, @i, 8) AS BIGINT) ^ CAST(0x3636363636363636 AS BIGINT) AS BINARY(8));
+        SET @OuterKey = @OuterKey + CAST(CAST(SUBSTRING(@PaddedKey, @i, 8) AS BIGINT) ^ CAST(0x5C5C5C5C5C5C5C5C AS BIGINT) AS BINARY(8));
+        SET @i = @i + 8;
+    END
+
+    RETURN HASHBYTES('SHA2_256', @OuterKey + HASHBYTES('SHA2_256', @InnerKey + @Message));
+END;
+GO
+
+-- blind index of an account number, every writer and reader must go through this
+-- so the bytes hashed are always the same (VARCHAR, as stored by sp_CreateAccount)
+CREATE OR ALTER FUNCTION dbo.fn_AccNumberBlindIndex(@BlindKey VARBINARY(64), @AccNumber VARCHAR(50))
+RETURNS VARBINARY(32)
+WITH SCHEMABINDING
+AS
+BEGIN
+    RETURN dbo.fn_HmacSha256(@BlindKey, CONVERT(VARBINARY(50), LTRIM(RTRIM(@AccNumber))));
+END;
+GO
+
+-- 3. Blind index column
+IF COL_LENGTH('dbo.Account', 'Acc_Number_Index') IS NULL
+BEGIN
+    ALTER TABLE Account ADD Acc_Number_Index VARBINARY(32) NULL;
+    PRINT 'Acc_Number_Index column added.';
+END
+GO
+
+-- 4. Backfill existing accounts
+OPEN SYMMETRIC KEY IronVaultSymKey
+DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+
+DECLARE @BlindKey VARBINARY(64) = (
+    SELECT CONVERT(VARBINARY(64), DECRYPTBYKEY(Key_Encrypted)) FROM Blind_Index_Key WHERE KeyID = 1
+);
+
+UPDATE Account
+SET Acc_Number_Index = dbo.fn_AccNumberBlindIndex(@BlindKey, CONVERT(VARCHAR(50), DECRYPTBYKEY(Acc_Number_Encrypted)))
+WHERE Acc_Number_Index IS NULL;
+
+PRINT CONCAT('Backfilled ', @@ROWCOUNT, ' account(s).');
+
+CLOSE SYMMETRIC KEY IronVaultSymKey;
+GO
+
+-- 5. Unique index for the seek, filtered so rows created by older code paths don't collide
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_Account_AccNumberIndex' AND object_id = OBJECT_ID('dbo.Account'))
+BEGIN
+    CREATE UNIQUE NONCLUSTERED INDEX UX_Account_AccNumberIndex
+    ON Account (Acc_Number_Index)
+    INCLUDE (UserID)
+    WHERE Acc_Number_Index IS NOT NULL;
+    PRINT 'UX_Account_AccNumberIndex created.';
+END
+GO
+
+-- grant to the service that runs the transfer procedures
+GRANT EXECUTE ON dbo.fn_AccNumberBlindIndex TO transaction_service;
+GRANT SELECT ON dbo.Blind_Index_Key TO transaction_service;
+
+-- re-run the updated procedures afterwards:
+-- Procedures/procedure_CreateAccount.sql, Procedures/procedure_TransferFunds.sql
+
+-- Verify: every account is indexed
+SELECT
+    COUNT(*) AS Accounts,
+    SUM(CASE WHEN Acc_Number_Index IS NULL THEN 1 ELSE 0 END) AS Missing_Index
+FROM Account;
+GO
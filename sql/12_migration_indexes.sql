@@ -0,0 +1,75 @@
+-- =============================================
+-- Step 12: Supporting Indexes for the Hot Queries
+-- Step 1 only created primary keys and unique constraints.
+-- These back the transaction history (per account, newest first),
+-- the audit log feed (newest first) and the RLS predicates.
+-- Safe to run more than once
+-- =============================================
+
+USE IronVaultDB;
+GO
+
+-- 1. Transaction history: one seek per side of the transfer
+-- key order matches ORDER BY Transaction_Date DESC, TransactionID DESC,
+-- INCLUDE covers the columns the procedures read, so no key lookups
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Transaction_Sender_Date' AND object_id = OBJECT_ID('dbo.[Transaction]'))
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_Transaction_Sender_Date
+    ON [Transaction] (SenderAccountID, Transaction_Date DESC, TransactionID DESC)
+    INCLUDE (ReceiverAccountID, Amount, Transaction_Type, Description);
+    PRINT 'IX_Transaction_Sender_Date created.';
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Transaction_Receiver_Date' AND object_id = OBJECT_ID('dbo.[Transaction]'))
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_Transaction_Receiver_Date
+    ON [Transaction] (ReceiverAccountID, Transaction_Date DESC, TransactionID DESC)
+    INCLUDE (SenderAccountID, Amount, Transaction_Type, Description);
+    PRINT 'IX_Transaction_Receiver_Date created.';
+END
+GO
+
+-- 2. Audit log feed: sp_GetAuditLogs is TOP (@Top) ... ORDER BY Action_Date DESC
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_AuditLog_ActionDate' AND object_id = OBJECT_ID('dbo.Application_Audit_Log'))
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_AuditLog_ActionDate
+    ON Application_Audit_Log (Action_Date DESC, LogID DESC)
+    INCLUDE (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address);
+    PRINT 'IX_AuditLog_ActionDate created.';
+END
+GO
+
+-- 3. Audit log by user: RLS predicate for customers and sp_DeleteUser
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_AuditLog_UserID' AND object_id = OBJECT_ID('dbo.Application_Audit_Log'))
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_AuditLog_UserID
+    ON Application_Audit_Log (UserID);
+    PRINT 'IX_AuditLog_UserID created.';
+END
+GO
+
+-- 4. Users by role: sp_GetAllCustomerAccounts filters on the Customer role
+-- (Account.UserID is already covered by UQ_UserID, used by the RLS predicates)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_User_RoleID' AND object_id = OBJECT_ID('dbo.[User]'))
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_User_RoleID
+    ON [User] (RoleID)
+    INCLUDE (User_Name, Status);
+    PRINT 'IX_User_RoleID created.';
+END
+GO
+
+-- re-run the rewritten procedures afterwards, the OR over both account columns
+-- is now a UNION ALL of two seeks on the indexes above:
+-- Procedures/procedure_GetTransactionsByUser.sql, Procedures/procedure_GetTransactionsByUserPage.sql
+
+-- Verify
+SELECT
+    OBJECT_NAME(i.object_id) AS TableName,
+    i.name AS IndexName,
+    i.type_desc
+FROM sys.indexes i
+WHERE i.name IN ('IX_Transaction_Sender_Date', 'IX_Transaction_Receiver_Date',
+                 'IX_AuditLog_ActionDate', 'IX_AuditLog_UserID', 'IX_User_RoleID');
+GO
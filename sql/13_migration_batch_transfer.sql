@@ -0,0 +1,30 @@
+-- =============================================
+-- Step 13: Table Type for Batch Transfers
+-- Payroll style uploads are sent to sp_TransferFundsBatch as one
+-- table-valued parameter instead of one sp_TransferFunds call per row.
+-- Run before Procedures/procedure_TransferFundsBatch.sql
+-- Safe to run more than once
+-- =============================================
+
+USE IronVaultDB;
+GO
+
+-- 1. One row per requested transfer, RowNo is the line number in the upload
+IF TYPE_ID('dbo.TransferBatchType') IS NULL
+BEGIN
+    CREATE TYPE dbo.TransferBatchType AS TABLE (
+        RowNo INT NOT NULL PRIMARY KEY,
+        ReceiverAccNumber NVARCHAR(50) NOT NULL,
+        Amount DECIMAL(18, 2) NOT NULL
+    );
+    PRINT 'dbo.TransferBatchType created.';
+END
+GO
+
+-- 2. The app needs EXECUTE on the type to pass it as a parameter
+GRANT EXECUTE ON TYPE::dbo.TransferBatchType TO db_app_service;
+GO
+
+-- Verify
+SELECT name, is_table_type FROM sys.types WHERE name = 'TransferBatchType';
+GO
@@ -0,0 +1,134 @@
+-- =============================================
+-- Step 14: Monthly Partitioning of Application_Audit_Log
+-- The audit log only grows. It is moved onto a monthly partition scheme on
+-- Action_Date, so old months can be switched out to Application_Audit_Log_Archive
+-- (a metadata operation) instead of being DELETEd row by row, see
+-- Procedures/procedure_MaintainAuditPartitions.sql.
+-- Also creates the table type for the app-side audit events (utils/audit.py).
+-- Run after Step 12, before Procedures/procedure_WriteAuditEvents.sql
+-- Safe to run more than once
+-- =============================================
+
+USE IronVaultDB;
+GO
+
+-- 1. Partition function: one partition per month, RANGE RIGHT so each boundary
+-- is the first instant of its month. Boundaries from the oldest row's month to
+-- 3 months ahead; sp_MaintainAuditPartitions keeps adding future months.
+IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'pf_AuditMonthly')
+BEGIN
+    DECLARE @Month DATETIME = DATEFROMPARTS(YEAR(ISNULL((SELECT MIN(Action_Date) FROM Application_Audit_Log), GETDATE())),
+                                            MONTH(ISNULL((SELECT MIN(Action_Date) FROM Application_Audit_Log), GETDATE())), 1);
+    DECLARE @Last DATETIME = DATEADD(MONTH, 3, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1));
+
+    CREATE PARTITION FUNCTION pf_AuditMonthly (DATETIME) AS RANGE RIGHT FOR VALUES (@Month);
+    CREATE PARTITION SCHEME ps_AuditMonthly AS PARTITION pf_AuditMonthly ALL TO ([PRIMARY]);
+
+    WHILE @Month < @Last
+    BEGIN
+        SET @Month = DATEADD(MONTH, 1, @Month);
+        ALTER PARTITION SCHEME ps_AuditMonthly NEXT USED [PRIMARY];
+        ALTER PARTITION FUNCTION pf_AuditMonthly() SPLIT RANGE (@Month);
+    END
+    PRINT 'pf_AuditMonthly / ps_AuditMonthly created.';
+END
+GO
+
+-- 2. Rebuild the table on the scheme: clustered on (Action_Date, LogID), which is
+-- also the order of the audit feed, so IX_AuditLog_ActionDate is no longer needed.
+-- Every index must be aligned (on the same scheme) for SWITCH to work.
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes i
+    JOIN sys.partition_schemes ps ON i.data_space_id = ps.data_space_id
+    WHERE i.object_id = OBJECT_ID('dbo.Application_Audit_Log') AND i.index_id = 1 AND ps.name = 'ps_AuditMonthly'
+)
+BEGIN
+    DECLARE @PK SYSNAME = (
+        SELECT name FROM sys.key_constraints
+        WHERE parent_object_id = OBJECT_ID('dbo.Application_Audit_Log') AND type = 'PK'
+    );
+    IF @PK IS NOT NULL
+        EXEC ('ALTER TABLE dbo.Application_Audit_Log DROP CONSTRAINT ' + @PK);
+
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_AuditLog_ActionDate' AND object_id = OBJECT_ID('dbo.Application_Audit_Log'))
+        DROP INDEX IX_AuditLog_ActionDate ON Application_Audit_Log;
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_AuditLog_UserID' AND object_id = OBJECT_ID('dbo.Application_Audit_Log'))
+        DROP INDEX IX_AuditLog_UserID ON Application_Audit_Log;
+
+    -- the partitioning column must be NOT NULL to be part of the clustered key
+    UPDATE Application_Audit_Log SET Action_Date = GETDATE() WHERE Action_Date IS NULL;
+    ALTER TABLE Application_Audit_Log ALTER COLUMN Action_Date DATETIME NOT NULL;
+
+    ALTER TABLE Application_Audit_Log
+    ADD CONSTRAINT PK_Application_Audit_Log PRIMARY KEY CLUSTERED (Action_Date, LogID)
+    ON ps_AuditMonthly (Action_Date);
+
+    -- RLS predicate for customers and sp_DeleteUser, aligned
+    CREATE NONCLUSTERED INDEX IX_AuditLog_UserID
+    ON Application_Audit_Log (UserID)
+    ON ps_AuditMonthly (Action_Date);
+
+    PRINT 'Application_Audit_Log partitioned by month.';
+END
+GO
+
+-- 3. Archive: same columns, keys and scheme, so a month switches straight into the
+-- matching partition. No FK to [User] (archived rows outlive deleted users) and no
+-- grants to the app; auditors read it directly.
+IF OBJECT_ID('dbo.Application_Audit_Log_Archive') IS NULL
+BEGIN
+    CREATE TABLE Application_Audit_Log_Archive (
+        LogID INT IDENTITY(1,1) NOT NULL,  -- only filled by SWITCH, kept identical to the source
+        UserID INT NULL,
+        User_Name VARCHAR(255),
+        Role_Name VARCHAR(100),
+        Action_Type VARCHAR(255),
+        Action_Date DATETIME NOT NULL,
+        IP_Address VARCHAR(50),
+        Status VARCHAR(100),
+        Message VARCHAR(255),
+        CONSTRAINT PK_Application_Audit_Log_Archive PRIMARY KEY CLUSTERED (Action_Date, LogID)
+    ) ON ps_AuditMonthly (Action_Date);
+
+    CREATE NONCLUSTERED INDEX IX_AuditLogArchive_UserID
+    ON Application_Audit_Log_Archive (UserID)
+    ON ps_AuditMonthly (Action_Date);
+
+    PRINT 'Application_Audit_Log_Archive created.';
+END
+GO
+
+GRANT SELECT ON dbo.Application_Audit_Log_Archive TO db_auditor;
+GO
+
+-- 4. App-side events (failed logins, lockouts) are queued in the app and written
+-- in batches by sp_WriteAuditEvents, one table-valued parameter per flush
+IF TYPE_ID('dbo.AuditEventType') IS NULL
+BEGIN
+    CREATE TYPE dbo.AuditEventType AS TABLE (
+        UserID INT NULL,
+        User_Name VARCHAR(255) NULL,
+        Role_Name VARCHAR(100) NULL,
+        Action_Type VARCHAR(255) NOT NULL,
+        Action_Date DATETIME NOT NULL,
+        IP_Address VARCHAR(50) NULL,
+        Status VARCHAR(100) NOT NULL,
+        Message VARCHAR(255) NULL
+    );
+    PRINT 'dbo.AuditEventType created.';
+END
+GO
+
+GRANT EXECUTE ON TYPE::dbo.AuditEventType TO db_app_service;
+GO
+
+-- Verify: rows per month
+SELECT p.partition_number, prv.value AS Month_Start, p.rows
+FROM sys.partitions p
+JOIN sys.indexes i ON p.object_id = i.object_id AND p.index_id = i.index_id
+LEFT JOIN sys.partition_range_values prv
+    ON prv.function_id = (SELECT function_id FROM sys.partition_functions WHERE name = 'pf_AuditMonthly')
+   AND prv.boundary_id = p.partition_number - 1
+WHERE p.object_id = OBJECT_ID('dbo.Application_Audit_Log') AND i.index_id = 1
+ORDER BY p.partition_number;
+GO
@@ -0,0 +1,65 @@
+-- =============================================
+-- Step 15: Daily Activity per Account
+-- One row per account and day with its deposit / transfer counts and amounts.
+-- sp_Deposit, sp_TransferFunds and sp_TransferFundsBatch add to it in the same
+-- transaction as the balance, so the manager analytics (sp_GetAccountActivitySummary)
+-- read days x active accounts rows instead of scanning [Transaction].
+-- Not an indexed view: a transfer counts for two accounts (out for the sender,
+-- in for the receiver), which needs a UNION, and indexed views can't have one.
+-- Run after Step 12, then the Procedures, then backfill once with
+-- EXEC dbo.sp_RebuildAccountActivity (see the end of this file)
+-- Safe to run more than once
+-- =============================================
+
+USE IronVaultDB;
+GO
+
+-- 1. The aggregate, clustered on the day: the analytics read a range of days
+IF OBJECT_ID('dbo.Account_Daily_Activity', 'U') IS NULL
+BEGIN
+    CREATE TABLE Account_Daily_Activity (
+        Activity_Date DATE NOT NULL,
+        AccountID INT NOT NULL,
+        Deposit_Count INT NOT NULL DEFAULT 0,
+        Deposit_Amount DECIMAL(18, 2) NOT NULL DEFAULT 0.00,
+        Transfer_In_Count INT NOT NULL DEFAULT 0,
+        Transfer_In_Amount DECIMAL(18, 2) NOT NULL DEFAULT 0.00,
+        Transfer_Out_Count INT NOT NULL DEFAULT 0,
+        Transfer_Out_Amount DECIMAL(18, 2) NOT NULL DEFAULT 0.00,
+        CONSTRAINT PK_Account_Daily_Activity PRIMARY KEY CLUSTERED (Activity_Date, AccountID)
+    );
+    PRINT 'Account_Daily_Activity created.';
+END
+GO
+
+-- 2. Last activity of an account (dormant accounts): one seek per account
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_AccountActivity_Account_Date' AND object_id = OBJECT_ID('dbo.Account_Daily_Activity'))
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_AccountActivity_Account_Date
+    ON Account_Daily_Activity (AccountID, Activity_Date DESC);
+    PRINT 'IX_AccountActivity_Account_Date created.';
+END
+GO
+
+-- 3. Transactions by date, for the rebuild: a range seek per chunk of days instead
+-- of a scan of the whole table. The key only grows, inserts append to the last page.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Transaction_Date' AND object_id = OBJECT_ID('dbo.[Transaction]'))
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_Transaction_Date
+    ON [Transaction] (Transaction_Date)
+    INCLUDE (SenderAccountID, ReceiverAccountID, Amount, Transaction_Type);
+    PRINT 'IX_Transaction_Date created.';
+END
+GO
+
+-- 4. No SELECT for the app: it reads through sp_GetAccountActivitySummary,
+-- which joins Account so the RLS predicate still applies
+DENY SELECT, INSERT, UPDATE, DELETE ON dbo.Account_Daily_Activity TO db_app_service;
+GO
+
+-- Verify
+SELECT name, type_desc FROM sys.indexes WHERE object_id = OBJECT_ID('dbo.Account_Daily_Activity');
+GO
+
+-- Backfill, once the procedures are in place (a month per transaction, see the procedure)
+-- EXEC dbo.sp_RebuildAccountActivity;
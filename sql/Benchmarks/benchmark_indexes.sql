@@ -0,0 +1,226 @@
+-- ====================================================
+-- Benchmark: Step 12 indexes, before vs after
+-- Generates a large transaction/audit dataset, then runs the hot
+-- queries with the Step 12 indexes disabled and enabled, recording
+-- logical reads, CPU and elapsed time plus the actual plans.
+-- NEVER run this on production: restore a copy first, e.g.
+--   RESTORE DATABASE IronVaultBench FROM DISK = 'C:\SQLBackups\IronVaultDB_full_sec.bak'
+--   WITH MOVE ... (and point the USE below at it)
+-- ====================================================
+
+USE IronVaultDB;
+GO
+
+SET NOCOUNT ON;
+
+-- ----------------------------------------------------
+-- 1. Dataset: @Transactions rows spread over the existing accounts,
+--    with a few "heavy" accounts to mimic corporate customers
+-- ----------------------------------------------------
+DECLARE @Transactions INT = 3000000;
+DECLARE @AuditRows INT = 2000000;
+
+DECLARE @Accounts TABLE (RowNo INT IDENTITY(1,1) PRIMARY KEY, AccountID INT);
+INSERT INTO @Accounts (AccountID) SELECT AccountID FROM Account;
+DECLARE @AccountCount INT = (SELECT COUNT(*) FROM @Accounts);
+
+IF @AccountCount < 2
+    THROW 50100, 'Need at least two accounts, register some users first.', 1;
+
+-- numbers table on the fly, no loops
+;WITH n AS (
+    SELECT TOP (@Transactions) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS i
+    FROM sys.all_objects a CROSS JOIN sys.all_objects b CROSS JOIN sys.all_objects c
+)
+INSERT INTO [Transaction] (SenderAccountID, ReceiverAccountID, Amount, Transaction_Type, Description, Transaction_Date)
+SELECT
+    CASE WHEN n.i % 5 = 0 THEN NULL ELSE s.AccountID END,
+    r.AccountID,
+    CAST((n.i % 500) + 1 AS DECIMAL(18, 2)),
+    CASE WHEN n.i % 5 = 0 THEN 'DEPOSIT' ELSE 'TRANSFER' END,
+    CASE WHEN n.i % 5 = 0 THEN 'ATM Cash Deposit' ELSE 'Online Transfer' END,
+    DATEADD(SECOND, -n.i * 7, GETDATE())
+FROM n
+-- 20% of the traffic hits the first 10 accounts
+JOIN @Accounts s ON s.RowNo = CASE WHEN n.i % 5 = 1 THEN (n.i % 10) + 1 ELSE (n.i % @AccountCount) + 1 END
+JOIN @Accounts r ON r.RowNo = ((n.i * 7 + 3) % @AccountCount) + 1
+WHERE s.AccountID <> r.AccountID;
+
+;WITH n AS (
+    SELECT TOP (@AuditRows) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS i
+    FROM sys.all_objects a CROSS JOIN sys.all_objects b CROSS JOIN sys.all_objects c
+)
+INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Action_Date, IP_Address, Status, Message)
+SELECT a.UserID, 'Bench User', 'Customer',
+       CASE n.i % 3 WHEN 0 THEN 'LOGIN' WHEN 1 THEN 'TRANSFER' ELSE 'DEPOSIT' END,
+       DATEADD(SECOND, -n.i * 11, GETDATE()),
+       CONCAT('10.0.', n.i % 250, '.', n.i % 200),
+       'Success', 'Generated by benchmark_indexes.sql'
+FROM n
+JOIN @Accounts x ON x.RowNo = (n.i % @AccountCount) + 1
+JOIN Account a ON a.AccountID = x.AccountID;
+
+UPDATE STATISTICS [Transaction] WITH FULLSCAN;
+UPDATE STATISTICS Application_Audit_Log WITH FULLSCAN;
+GO
+
+-- ----------------------------------------------------
+-- 2. Harness: run each query in its own batch and diff the session counters
+--    (sys.dm_exec_sessions is updated when a batch completes)
+-- ----------------------------------------------------
+IF OBJECT_ID('tempdb..#Bench') IS NOT NULL DROP TABLE #Bench;
+CREATE TABLE #Bench (
+    Phase VARCHAR(20),
+    QueryName VARCHAR(100),
+    Marker VARCHAR(10),
+    Logical_Reads BIGINT,
+    Cpu_Ms BIGINT,
+    Elapsed_Ms BIGINT,
+    Taken_At DATETIME2 DEFAULT SYSDATETIME()
+);
+GO
+
+-- heavy account (most rows) and an admin context so RLS lets everything through
+DECLARE @HeavyUser INT = (
+    SELECT TOP 1 a.UserID
+    FROM [Transaction] t JOIN Account a ON a.AccountID = t.SenderAccountID
+    GROUP BY a.UserID ORDER BY COUNT(*) DESC
+);
+EXEC sp_set_session_context @key = N'bench_user', @value = @HeavyUser;
+EXEC sp_set_session_context @key = N'user_id', @value = 1;
+EXEC sp_set_session_context @key = N'role_id', @value = 1;
+GO
+
+-- ================= BEFORE: Step 12 indexes disabled =================
+ALTER INDEX IX_Transaction_Sender_Date ON [Transaction] DISABLE;
+ALTER INDEX IX_Transaction_Receiver_Date ON [Transaction] DISABLE;
+ALTER INDEX IX_AuditLog_ActionDate ON Application_Audit_Log DISABLE;
+ALTER INDEX IX_AuditLog_UserID ON Application_Audit_Log DISABLE;
+DBCC FREEPROCCACHE;
+GO
+
+SET STATISTICS XML ON;
+GO
+
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'sp_GetTransactionsByUser', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @u INT = CAST(SESSION_CONTEXT(N'bench_user') AS INT);
+EXEC dbo.sp_GetTransactionsByUser @UserID = @u;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'sp_GetTransactionsByUser', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'sp_GetTransactionsByUserPage', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @u INT = CAST(SESSION_CONTEXT(N'bench_user') AS INT);
+EXEC dbo.sp_GetTransactionsByUserPage @UserID = @u, @PageSize = 21;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'sp_GetTransactionsByUserPage', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'sp_GetAuditLogs', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+EXEC dbo.sp_GetAuditLogs @Top = 50;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'sp_GetAuditLogs', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+-- customer context: RLS predicate evaluated per row
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'RLS customer audit scan', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @u INT = CAST(SESSION_CONTEXT(N'bench_user') AS INT);
+EXEC sp_set_session_context @key = N'user_id', @value = @u;
+EXEC sp_set_session_context @key = N'role_id', @value = 2;
+SELECT COUNT(*) FROM Application_Audit_Log;
+EXEC sp_set_session_context @key = N'user_id', @value = 1;
+EXEC sp_set_session_context @key = N'role_id', @value = 1;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'before', 'RLS customer audit scan', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+SET STATISTICS XML OFF;
+GO
+
+-- ================= AFTER: Step 12 indexes rebuilt =================
+ALTER INDEX IX_Transaction_Sender_Date ON [Transaction] REBUILD;
+ALTER INDEX IX_Transaction_Receiver_Date ON [Transaction] REBUILD;
+ALTER INDEX IX_AuditLog_ActionDate ON Application_Audit_Log REBUILD;
+ALTER INDEX IX_AuditLog_UserID ON Application_Audit_Log REBUILD;
+DBCC FREEPROCCACHE;
+GO
+
+SET STATISTICS XML ON;
+GO
+
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'sp_GetTransactionsByUser', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @u INT = CAST(SESSION_CONTEXT(N'bench_user') AS INT);
+EXEC dbo.sp_GetTransactionsByUser @UserID = @u;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'sp_GetTransactionsByUser', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'sp_GetTransactionsByUserPage', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @u INT = CAST(SESSION_CONTEXT(N'bench_user') AS INT);
+EXEC dbo.sp_GetTransactionsByUserPage @UserID = @u, @PageSize = 21;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'sp_GetTransactionsByUserPage', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'sp_GetAuditLogs', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+EXEC dbo.sp_GetAuditLogs @Top = 50;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'sp_GetAuditLogs', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'RLS customer audit scan', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @u INT = CAST(SESSION_CONTEXT(N'bench_user') AS INT);
+EXEC sp_set_session_context @key = N'user_id', @value = @u;
+EXEC sp_set_session_context @key = N'role_id', @value = 2;
+SELECT COUNT(*) FROM Application_Audit_Log;
+EXEC sp_set_session_context @key = N'user_id', @value = 1;
+EXEC sp_set_session_context @key = N'role_id', @value = 1;
+GO
+INSERT #Bench (Phase, QueryName, Marker, Logical_Reads, Cpu_Ms, Elapsed_Ms)
+SELECT 'after', 'RLS customer audit scan', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+SET STATISTICS XML OFF;
+GO
+
+-- ----------------------------------------------------
+-- 3. Report: deltas per query, before vs after
+--    (the actual plans are in the XML result sets above)
+-- ----------------------------------------------------
+SELECT
+    e.QueryName,
+    e.Phase,
+    e.Logical_Reads - s.Logical_Reads AS Logical_Reads,
+    e.Cpu_Ms - s.Cpu_Ms AS Cpu_Ms,
+    e.Elapsed_Ms - s.Elapsed_Ms AS Elapsed_Ms
+FROM #Bench s
+JOIN #Bench e ON e.QueryName = s.QueryName AND e.Phase = s.Phase AND e.Marker = 'end'
+WHERE s.Marker = 'start'
+ORDER BY e.QueryName, CASE e.Phase WHEN 'before' THEN 0 ELSE 1 END;
+
+EXEC sp_set_session_context @key = N'user_id', @value = NULL;
+EXEC sp_set_session_context @key = N'role_id', @value = NULL;
+GO
@@ -0,0 +1,200 @@
+-- ====================================================
+-- Benchmark: admin/manager listings, decrypt-once + paging
+-- Tops the database up to @Users customers, then compares the CPU of
+-- the old sp_GetAllUsers / sp_GetAllCustomerAccounts bodies (email
+-- decrypted up to 7 times per row, every row returned) with the
+-- rewritten procedures, both reading every row and reading one page.
+-- Results are reported as CPU ms per 10k users.
+-- NEVER run this on production: restore a copy first (see benchmark_indexes.sql)
+-- ====================================================
+
+USE IronVaultDB;
+GO
+
+SET NOCOUNT ON;
+
+-- ----------------------------------------------------
+-- 1. Dataset: bench customers with encrypted email/account number, like sp_CreateAccount
+-- ----------------------------------------------------
+DECLARE @Users INT = 10000;
+DECLARE @Missing INT = @Users - (SELECT COUNT(*) FROM [User]);
+DECLARE @CustomerRole INT = (SELECT RoleID FROM [Role] WHERE Role_Name = 'Customer');
+DECLARE @FirstNew INT = ISNULL(IDENT_CURRENT('dbo.[User]'), 0) + 1;
+
+IF @Missing > 0
+BEGIN
+    OPEN SYMMETRIC KEY IronVaultSymKey
+    DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+
+    ;WITH n AS (
+        SELECT TOP (@Missing) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS i
+        FROM sys.all_objects a CROSS JOIN sys.all_objects b
+    )
+    INSERT INTO [User] (User_Name, User_Email_Encrypted, User_Email_Hash, User_PasswordHash, User_Salt, RoleID)
+    SELECT
+        CONCAT('Bench User ', @FirstNew + n.i),
+        EncryptByKey(Key_GUID('IronVaultSymKey'), CONCAT('listing', @FirstNew + n.i, '@ironvault.test')),
+        HASHBYTES('SHA2_256', CONCAT('listing', @FirstNew + n.i, '@ironvault.test')),
+        'not-a-real-hash', 'bench', @CustomerRole
+    FROM n;
+
+    DECLARE @BlindKey VARBINARY(64) = (
+        SELECT CONVERT(VARBINARY(64), DECRYPTBYKEY(Key_Encrypted)) FROM Blind_Index_Key WHERE KeyID = 1
+    );
+
+    INSERT INTO Account (UserID, Acc_Number_Encrypted, Acc_Number_Index, Acc_Balance)
+    SELECT
+        u.UserID,
+        EncryptByKey(Key_GUID('IronVaultSymKey'), CONVERT(VARCHAR(50), CONCAT('100-', u.UserID))),
+        dbo.fn_AccNumberBlindIndex(@BlindKey, CONCAT('100-', u.UserID)),
+        (u.UserID % 5000) + 0.50
+    FROM [User] u
+    WHERE NOT EXISTS (SELECT 1 FROM Account a WHERE a.UserID = u.UserID);
+
+    CLOSE SYMMETRIC KEY IronVaultSymKey;
+END
+GO
+
+-- ----------------------------------------------------
+-- 2. Harness: results go into sinks so the client transfer isn't measured,
+--    counters are diffed per batch like benchmark_indexes.sql
+-- ----------------------------------------------------
+IF OBJECT_ID('tempdb..#Bench') IS NOT NULL DROP TABLE #Bench;
+CREATE TABLE #Bench (
+    QueryName VARCHAR(100),
+    Marker VARCHAR(10),
+    Logical_Reads BIGINT,
+    Cpu_Ms BIGINT,
+    Elapsed_Ms BIGINT
+);
+
+IF OBJECT_ID('tempdb..#UserSink') IS NOT NULL DROP TABLE #UserSink;
+CREATE TABLE #UserSink (UserID INT, User_Name NVARCHAR(255), User_Email VARCHAR(255), Role_Name VARCHAR(100), RoleID INT, Status VARCHAR(100), TotalCount INT NULL);
+
+IF OBJECT_ID('tempdb..#CustomerSink') IS NOT NULL DROP TABLE #CustomerSink;
+CREATE TABLE #CustomerSink (UserID INT, User_Name NVARCHAR(255), User_Email VARCHAR(255), Acc_Number VARCHAR(20), Acc_Balance DECIMAL(18, 2), TotalCount INT NULL);
+
+EXEC sp_set_session_context @key = N'user_id', @value = 1;
+EXEC sp_set_session_context @key = N'role_id', @value = 1;
+GO
+
+-- ================= BEFORE: old bodies, every row =================
+INSERT #Bench SELECT 'old sp_GetAllUsers (all rows)', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+OPEN SYMMETRIC KEY IronVaultSymKey DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+INSERT INTO #UserSink (UserID, User_Name, User_Email, Role_Name, RoleID, Status)
+SELECT
+    u.UserID,
+    CASE WHEN LEN(u.User_Name) <= 2 THEN u.User_Name ELSE LEFT(u.User_Name, 2) + REPLICATE('*', LEN(u.User_Name) - 2) END,
+    CASE
+        WHEN CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)) IS NOT NULL
+            AND CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) > 0
+        THEN
+            LEFT(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)), 1) +
+            REPLICATE('*', CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) - 2) +
+            SUBSTRING(
+                CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)),
+                CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))),
+                LEN(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)))
+            )
+        ELSE '[PROTECTED]'
+    END,
+    r.Role_Name, u.RoleID, ISNULL(u.Status, 'Active')
+FROM [User] u
+JOIN [Role] r ON u.RoleID = r.RoleID;
+CLOSE SYMMETRIC KEY IronVaultSymKey;
+GO
+INSERT #Bench SELECT 'old sp_GetAllUsers (all rows)', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench SELECT 'old sp_GetAllCustomerAccounts (all rows)', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+OPEN SYMMETRIC KEY IronVaultSymKey DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+INSERT INTO #CustomerSink (UserID, User_Name, User_Email, Acc_Number, Acc_Balance)
+SELECT
+    u.UserID,
+    CASE WHEN LEN(u.User_Name) <= 2 THEN u.User_Name ELSE LEFT(u.User_Name, 2) + REPLICATE('*', LEN(u.User_Name) - 2) END,
+    CASE
+        WHEN CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)) IS NOT NULL
+            AND CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) > 0
+        THEN
+            LEFT(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)), 1) +
+            REPLICATE('*', CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) - 2) +
+            SUBSTRING(
+                CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)),
+                CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))),
+                LEN(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)))
+            )
+        ELSE '[PROTECTED]'
+    END,
+    CONVERT(VARCHAR(20), DecryptByKey(a.Acc_Number_Encrypted)),
+    a.Acc_Balance
+FROM Account a
+JOIN [User] u ON a.UserID = u.UserID
+JOIN [Role] r ON u.RoleID = r.RoleID
+WHERE r.Role_Name = 'Customer';
+CLOSE SYMMETRIC KEY IronVaultSymKey;
+GO
+INSERT #Bench SELECT 'old sp_GetAllCustomerAccounts (all rows)', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+-- ================= AFTER: rewritten procedures =================
+-- every row, 500 per page, so the decrypt cost is comparable with the old body
+INSERT #Bench SELECT 'new sp_GetAllUsers (all rows)', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @p INT = 1, @pages INT = (SELECT (COUNT(*) + 499) / 500 FROM [User]);
+WHILE @p <= @pages
+BEGIN
+    INSERT INTO #UserSink EXEC dbo.sp_GetAllUsers @PageNumber = @p, @PageSize = 500;
+    SET @p += 1;
+END
+GO
+INSERT #Bench SELECT 'new sp_GetAllUsers (all rows)', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench SELECT 'new sp_GetAllCustomerAccounts (all rows)', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+DECLARE @p INT = 1, @pages INT = (SELECT (COUNT(*) + 499) / 500 FROM Account);
+WHILE @p <= @pages
+BEGIN
+    INSERT INTO #CustomerSink EXEC dbo.sp_GetAllCustomerAccounts @PageNumber = @p, @PageSize = 500;
+    SET @p += 1;
+END
+GO
+INSERT #Bench SELECT 'new sp_GetAllCustomerAccounts (all rows)', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+-- what the dashboard actually asks for now: one page of 50
+INSERT #Bench SELECT 'new sp_GetAllUsers (one page)', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+INSERT INTO #UserSink EXEC dbo.sp_GetAllUsers @PageNumber = 1, @PageSize = 50;
+GO
+INSERT #Bench SELECT 'new sp_GetAllUsers (one page)', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+INSERT #Bench SELECT 'new sp_GetAllCustomerAccounts (one page)', 'start', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+INSERT INTO #CustomerSink EXEC dbo.sp_GetAllCustomerAccounts @PageNumber = 1, @PageSize = 50, @SortBy = 'Acc_Balance', @SortDir = 'DESC';
+GO
+INSERT #Bench SELECT 'new sp_GetAllCustomerAccounts (one page)', 'end', logical_reads, cpu_time, total_elapsed_time FROM sys.dm_exec_sessions WHERE session_id = @@SPID;
+GO
+
+-- ----------------------------------------------------
+-- 3. Report: deltas, and CPU scaled to 10k users
+-- ----------------------------------------------------
+DECLARE @UserCount INT = (SELECT COUNT(*) FROM [User]);
+
+SELECT
+    e.QueryName,
+    e.Logical_Reads - s.Logical_Reads AS Logical_Reads,
+    e.Cpu_Ms - s.Cpu_Ms AS Cpu_Ms,
+    e.Elapsed_Ms - s.Elapsed_Ms AS Elapsed_Ms,
+    CAST((e.Cpu_Ms - s.Cpu_Ms) * 10000.0 / NULLIF(@UserCount, 0) AS DECIMAL(18, 1)) AS Cpu_Ms_Per_10k_Users
+FROM #Bench s
+JOIN #Bench e ON e.QueryName = s.QueryName AND e.Marker = 'end'
+WHERE s.Marker = 'start'
+ORDER BY e.QueryName;
+
+EXEC sp_set_session_context @key = N'user_id', @value = NULL;
+EXEC sp_set_session_context @key = N'role_id', @value = NULL;
+GO
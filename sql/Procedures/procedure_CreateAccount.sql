@@ -43,18 +43,25 @@ BEGIN
         
         DECLARE @NewUserID INT = SCOPE_IDENTITY();
         
-        -- Create account
+        -- Create account, with the blind index used to look it up by number
+        DECLARE @AccNumber VARCHAR(50) = '100-' + CAST(@NewUserID AS VARCHAR);
+        DECLARE @BlindKey VARBINARY(64) = (
+            SELECT CONVERT(VARBINARY(64), DecryptByKey(Key_Encrypted)) FROM Blind_Index_Key WHERE KeyID = 1
+        );
+
         INSERT INTO Account (
             UserID,
             Acc_Number_Encrypted,
+            Acc_Number_Index,
             Acc_Balance
         )
         VALUES (
             @NewUserID,
             EncryptByKey(
                 Key_GUID('IronVaultSymKey'),
-                '100-' + CAST(@NewUserID AS VARCHAR)
+                @AccNumber
             ),
+            dbo.fn_AccNumberBlindIndex(@BlindKey, @AccNumber),
             0.00
         );
         
@@ -13,6 +13,33 @@ AS
 BEGIN
     SET NOCOUNT ON;
 
+    -- Take the user's transfers out of the counterparties' daily activity (Step 15)
+    -- before the transactions go, so it still matches a rebuild
+    UPDATE d
+    SET Transfer_In_Count = d.Transfer_In_Count - x.In_Count,
+        Transfer_In_Amount = d.Transfer_In_Amount - x.In_Amount,
+        Transfer_Out_Count = d.Transfer_Out_Count - x.Out_Count,
+        Transfer_Out_Amount = d.Transfer_Out_Amount - x.Out_Amount
+    FROM Account_Daily_Activity d
+    JOIN (
+        SELECT CAST(t.Transaction_Date AS DATE) AS Activity_Date,
+               CASE WHEN s.UserID = @UserID THEN t.ReceiverAccountID ELSE t.SenderAccountID END AS AccountID,
+               SUM(CASE WHEN s.UserID = @UserID THEN 1 ELSE 0 END) AS In_Count,
+               SUM(CASE WHEN s.UserID = @UserID THEN t.Amount ELSE 0 END) AS In_Amount,
+               SUM(CASE WHEN s.UserID = @UserID THEN 0 ELSE 1 END) AS Out_Count,
+               SUM(CASE WHEN s.UserID = @UserID THEN 0 ELSE t.Amount END) AS Out_Amount
+        FROM [Transaction] t
+        LEFT JOIN Account s ON s.AccountID = t.SenderAccountID
+        LEFT JOIN Account r ON r.AccountID = t.ReceiverAccountID
+        WHERE t.Transaction_Type = 'TRANSFER'
+          AND (s.UserID = @UserID OR r.UserID = @UserID)
+        GROUP BY CAST(t.Transaction_Date AS DATE),
+                 CASE WHEN s.UserID = @UserID THEN t.ReceiverAccountID ELSE t.SenderAccountID END
+    ) x ON d.Activity_Date = x.Activity_Date AND d.AccountID = x.AccountID;
+
+    DELETE FROM Account_Daily_Activity
+    WHERE AccountID IN (SELECT AccountID FROM Account WHERE UserID = @UserID);
+
     -- Delete related transactions
     DELETE FROM [Transaction]
     WHERE SenderAccountID IN (SELECT AccountID FROM Account WHERE UserID = @UserID)
@@ -4,14 +4,17 @@ Go
 CREATE OR ALTER PROCEDURE dbo.sp_Deposit
     @UserID INT,
     @Amount DECIMAL(18,2),
-    @ActorIP NVARCHAR(50)
+    @ActorIP NVARCHAR(50),
+    @ActorUserName NVARCHAR(255) = NULL,  -- passed by the app (utils/actor.py), saves the [User] JOIN [Role] lookup
+    @ActorRoleName NVARCHAR(100) = NULL
 AS
 BEGIN
     SET NOCOUNT ON;
 
     DECLARE @AccountID INT;
-    DECLARE @UserName NVARCHAR(255);
-    DECLARE @RoleName NVARCHAR(100);
+    DECLARE @UserName NVARCHAR(255) = @ActorUserName;
+    DECLARE @RoleName NVARCHAR(100) = @ActorRoleName;
+    DECLARE @Now DATETIME = GETDATE();  -- one clock read, the transaction row and its day must agree
 
     -- Get the user's account directly from the real table
     SELECT TOP 1 @AccountID = AccountID
@@ -24,11 +27,12 @@ BEGIN
 
     PRINT 'Debug: AccountID = ' + CAST(@AccountID AS NVARCHAR(10));
 
-    -- Get user name and role
-    SELECT @UserName = User_Name, @RoleName = r.Role_Name
-    FROM [User] u
-    JOIN [Role] r ON u.RoleID = r.RoleID
-    WHERE u.UserID = @UserID;
+    -- Get user name and role, unless the caller already passed them
+    IF @UserName IS NULL OR @RoleName IS NULL
+        SELECT @UserName = User_Name, @RoleName = r.Role_Name
+        FROM [User] u
+        JOIN [Role] r ON u.RoleID = r.RoleID
+        WHERE u.UserID = @UserID;
 
     BEGIN TRANSACTION;
 
@@ -44,9 +48,21 @@ BEGIN
             THROW 50002, 'Deposit failed: account not found or permission denied.', 1;
         END
 
+        -- Daily activity (Step 15), before the transaction row: sp_RebuildAccountActivity
+        -- relies on that order. The account row is locked by the UPDATE above, so no
+        -- other deposit or transfer can insert the same day's row in between.
+        UPDATE Account_Daily_Activity
+        SET Deposit_Count = Deposit_Count + 1,
+            Deposit_Amount = Deposit_Amount + @Amount
+        WHERE Activity_Date = CAST(@Now AS DATE) AND AccountID = @AccountID;
+
+        IF @@ROWCOUNT = 0
+            INSERT INTO Account_Daily_Activity (Activity_Date, AccountID, Deposit_Count, Deposit_Amount)
+            VALUES (CAST(@Now AS DATE), @AccountID, 1, @Amount);
+
         -- Record transaction
-        INSERT INTO [Transaction] (ReceiverAccountID, Amount, Transaction_Type, Description)
-        VALUES (@AccountID, @Amount, 'DEPOSIT', 'ATM Cash Deposit');
+        INSERT INTO [Transaction] (ReceiverAccountID, Amount, Transaction_Type, Description, Transaction_Date)
+        VALUES (@AccountID, @Amount, 'DEPOSIT', 'ATM Cash Deposit', @Now);
 
         -- Audit log
         INSERT INTO Application_Audit_Log 
@@ -58,15 +74,20 @@ BEGIN
         COMMIT TRANSACTION;
     END TRY
     BEGIN CATCH
-        ROLLBACK TRANSACTION;
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
 
-        DECLARE @ErrorMsg NVARCHAR(4000) = ERROR_MESSAGE();
+        -- deadlock victims and lock timeouts are retried by the app, only log the final outcome
+        IF ERROR_NUMBER() NOT IN (1205, 1222)
+        BEGIN
+            DECLARE @ErrorMsg NVARCHAR(4000) = ERROR_MESSAGE();
 
-        -- Log failed deposit
-        INSERT INTO Application_Audit_Log 
-            (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
-        VALUES 
-            (@UserID, @UserName, @RoleName, 'DEPOSIT', 'Failed', @ErrorMsg, @ActorIP);
+            -- Log failed deposit
+            INSERT INTO Application_Audit_Log 
+                (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
+            VALUES 
+                (@UserID, @UserName, @RoleName, 'DEPOSIT', 'Failed', @ErrorMsg, @ActorIP);
+        END
 
         THROW;
     END CATCH
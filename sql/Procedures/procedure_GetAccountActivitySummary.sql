@@ -0,0 +1,90 @@
+USE IronVaultDB
+GO
+
+-- manager analytics over the last @Days days (today included), from Account_Daily_Activity
+-- (Step 15): the cost follows days x active accounts, not the size of [Transaction].
+-- Joins Account for every row, so the RLS predicate decides what a caller sees.
+-- Three result sets:
+--   1. totals: accounts, balances, active / dormant accounts, deposits and transfers in the window
+--   2. one row per day with activity, oldest first
+--   3. the @Top accounts by volume (deposits + transfers in + transfers out)
+CREATE OR ALTER PROCEDURE dbo.sp_GetAccountActivitySummary
+    @Days INT = 30,
+    @Top INT = 10
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF @Days NOT BETWEEN 1 AND 366 SET @Days = 30;
+    IF @Top NOT BETWEEN 1 AND 100 SET @Top = 10;
+
+    DECLARE @Since DATE = DATEADD(DAY, 1 - @Days, CAST(GETDATE() AS DATE));
+
+    -- the window once, per account: a range seek on the clustered key
+    DECLARE @Window TABLE (
+        AccountID INT PRIMARY KEY,
+        Deposit_Count INT,
+        Deposit_Amount DECIMAL(18, 2),
+        Transfer_In_Count INT,
+        Transfer_In_Amount DECIMAL(18, 2),
+        Transfer_Out_Count INT,
+        Transfer_Out_Amount DECIMAL(18, 2)
+    );
+
+    INSERT INTO @Window
+    SELECT d.AccountID,
+           SUM(d.Deposit_Count), SUM(d.Deposit_Amount),
+           SUM(d.Transfer_In_Count), SUM(d.Transfer_In_Amount),
+           SUM(d.Transfer_Out_Count), SUM(d.Transfer_Out_Amount)
+    FROM Account_Daily_Activity d
+    JOIN Account a ON a.AccountID = d.AccountID
+    WHERE d.Activity_Date >= @Since
+    GROUP BY d.AccountID;
+
+    -- 1. totals; a transfer is counted once, on its sending side
+    SELECT
+        COUNT(*) AS Accounts,
+        ISNULL(SUM(a.Acc_Balance), 0) AS Total_Balance,
+        COUNT(w.AccountID) AS Active_Accounts,
+        COUNT(*) - COUNT(w.AccountID) AS Dormant_Accounts,
+        ISNULL(SUM(w.Deposit_Count), 0) AS Deposit_Count,
+        ISNULL(SUM(w.Deposit_Amount), 0) AS Deposit_Amount,
+        ISNULL(SUM(w.Transfer_Out_Count), 0) AS Transfer_Count,
+        ISNULL(SUM(w.Transfer_Out_Amount), 0) AS Transfer_Amount,
+        @Since AS Since
+    FROM Account a
+    LEFT JOIN @Window w ON w.AccountID = a.AccountID;
+
+    -- 2. per day
+    SELECT d.Activity_Date,
+           SUM(d.Deposit_Count) AS Deposit_Count,
+           SUM(d.Deposit_Amount) AS Deposit_Amount,
+           SUM(d.Transfer_Out_Count) AS Transfer_Count,
+           SUM(d.Transfer_Out_Amount) AS Transfer_Amount,
+           COUNT(*) AS Active_Accounts
+    FROM Account_Daily_Activity d
+    JOIN Account a ON a.AccountID = d.AccountID
+    WHERE d.Activity_Date >= @Since
+    GROUP BY d.Activity_Date
+    ORDER BY d.Activity_Date;
+
+    -- 3. top accounts
+    SELECT TOP (@Top)
+        u.UserID,
+        u.User_Name,
+        a.Acc_Balance,
+        w.Deposit_Count + w.Transfer_In_Count + w.Transfer_Out_Count AS Transaction_Count,
+        w.Deposit_Amount + w.Transfer_In_Amount + w.Transfer_Out_Amount AS Volume
+    FROM @Window w
+    JOIN Account a ON a.AccountID = w.AccountID
+    JOIN [User] u ON u.UserID = a.UserID
+    ORDER BY Volume DESC, u.UserID;
+END
+GO
+
+GRANT EXECUTE ON dbo.sp_GetAccountActivitySummary TO db_app_service;
+
+-- to execute (as a manager)
+EXEC sp_set_session_context @key = N'user_id', @value = 3;
+EXEC sp_set_session_context @key = N'role_id', @value = 3;
+EXEC dbo.sp_GetAccountActivitySummary @Days = 30, @Top = 10;
@@ -1,42 +1,110 @@
 USE IronVaultDB
 GO
 
-ALTER PROCEDURE dbo.sp_GetAllCustomerAccounts
+-- one page of customer accounts for the manager view, with search, sort and the total for the pager
+-- @Search matches the start of the name, an exact UserID, or an exact account number (blind index, Step 11)
+-- @SortBy: UserID | User_Name | Acc_Balance, @SortDir: ASC | DESC
+-- email and account number are decrypted once per row, and only for the rows on the page
+CREATE OR ALTER PROCEDURE dbo.sp_GetAllCustomerAccounts
+    @PageNumber INT = 1,
+    @PageSize INT = 50,
+    @Search NVARCHAR(100) = NULL,
+    @SortBy VARCHAR(20) = 'UserID',
+    @SortDir VARCHAR(4) = 'ASC'
 AS
 BEGIN
     SET NOCOUNT ON;
-    
+
+    IF @PageNumber < 1 SET @PageNumber = 1;
+    IF @PageSize NOT BETWEEN 1 AND 500 SET @PageSize = 50;
+    SET @Search = NULLIF(LTRIM(RTRIM(@Search)), '');
+
+    DECLARE @Page TABLE (
+        RowNo INT PRIMARY KEY,
+        UserID INT,
+        User_Name NVARCHAR(255),
+        Email VARCHAR(255),
+        Acc_Number VARCHAR(20),
+        Acc_Balance DECIMAL(18, 2),
+        TotalCount INT
+    );
+
     OPEN SYMMETRIC KEY IronVaultSymKey
     DECRYPTION BY PASSWORD = 'Pa$$w0rd';
 
-    SELECT 
-        u.UserID, 
-        CASE 
-            WHEN LEN(u.User_Name) <= 2 THEN u.User_Name
-            ELSE LEFT(u.User_Name, 2) + REPLICATE('*', LEN(u.User_Name) - 2)
+    DECLARE @SearchIndex VARBINARY(32) = NULL;
+    IF @Search IS NOT NULL
+    BEGIN
+        DECLARE @BlindKey VARBINARY(64) = (
+            SELECT CONVERT(VARBINARY(64), DECRYPTBYKEY(Key_Encrypted)) FROM Blind_Index_Key WHERE KeyID = 1
+        );
+        SET @SearchIndex = dbo.fn_AccNumberBlindIndex(@BlindKey, @Search);
+    END
+
+    -- number and page the rows first (no decryption), then decrypt only the page into @Page
+    ;WITH filtered AS (
+        SELECT
+            a.AccountID,
+            u.UserID,
+            u.User_Name,
+            a.Acc_Balance,
+            ROW_NUMBER() OVER (ORDER BY
+                CASE WHEN @SortDir = 'ASC' AND @SortBy = 'User_Name' THEN u.User_Name END ASC,
+                CASE WHEN @SortDir = 'DESC' AND @SortBy = 'User_Name' THEN u.User_Name END DESC,
+                CASE WHEN @SortDir = 'ASC' AND @SortBy = 'Acc_Balance' THEN a.Acc_Balance END ASC,
+                CASE WHEN @SortDir = 'DESC' AND @SortBy = 'Acc_Balance' THEN a.Acc_Balance END DESC,
+                CASE WHEN @SortDir = 'DESC' THEN u.UserID END DESC,
+                u.UserID ASC
+            ) AS RowNo,
+            COUNT(*) OVER () AS TotalCount
+        FROM Account a
+        JOIN [User] u ON a.UserID = u.UserID
+        JOIN [Role] r ON u.RoleID = r.RoleID
+        WHERE r.Role_Name = 'Customer'
+          AND (@Search IS NULL
+               OR u.User_Name LIKE REPLACE(REPLACE(REPLACE(@Search, '[', '[[]'), '%', '[%]'), '_', '[_]') + '%'
+               OR CAST(u.UserID AS NVARCHAR(20)) = @Search
+               OR a.Acc_Number_Index = @SearchIndex)
+    )
+    INSERT INTO @Page (RowNo, UserID, User_Name, Email, Acc_Number, Acc_Balance, TotalCount)
+    SELECT
+        f.RowNo,
+        f.UserID,
+        f.User_Name,
+        CONVERT(VARCHAR(255), DECRYPTBYKEY(u.User_Email_Encrypted)),
+        CONVERT(VARCHAR(20), DECRYPTBYKEY(a.Acc_Number_Encrypted)),
+        f.Acc_Balance,
+        f.TotalCount
+    FROM filtered f
+    JOIN [User] u ON u.UserID = f.UserID
+    JOIN Account a ON a.AccountID = f.AccountID
+    WHERE f.RowNo > (@PageNumber - 1) * @PageSize
+      AND f.RowNo <= @PageNumber * @PageSize
+    OPTION (RECOMPILE);
+
+    CLOSE SYMMETRIC KEY IronVaultSymKey;
+
+    SELECT
+        p.UserID,
+        CASE
+            WHEN LEN(p.User_Name) <= 2 THEN p.User_Name
+            ELSE LEFT(p.User_Name, 2) + REPLICATE('*', LEN(p.User_Name) - 2)
         END AS User_Name,
-        CASE 
-            WHEN CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)) IS NOT NULL 
-                AND CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) > 0 
-            THEN 
-                LEFT(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)), 1) + 
-                REPLICATE('*', CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) - 2) + 
-                SUBSTRING(
-                    CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)), 
-                    CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))), 
-                    LEN(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)))
-                )
-            ELSE 
-                '[PROTECTED]'
+        CASE
+            WHEN e.AtPos > 1 THEN LEFT(p.Email, 1) + REPLICATE('*', e.AtPos - 2) + SUBSTRING(p.Email, e.AtPos, LEN(p.Email))
+            ELSE '[PROTECTED]'
         END AS User_Email,
-        CONVERT(VARCHAR(20), DecryptByKey(a.Acc_Number_Encrypted)) AS Acc_Number, 
-        a.Acc_Balance
-    FROM Account a
-    JOIN [User] u ON a.UserID = u.UserID
-    JOIN [Role] r ON u.RoleID = r.RoleID
-    WHERE r.Role_Name = 'Customer';
-    CLOSE SYMMETRIC KEY IronVaultSymKey;
+        p.Acc_Number,
+        p.Acc_Balance,
+        p.TotalCount
+    FROM @Page p
+    CROSS APPLY (SELECT CHARINDEX('@', p.Email) AS AtPos) e
+    ORDER BY p.RowNo;
 END;
 GO
 
-GRANT EXECUTE ON dbo.sp_GetAllCustomerAccounts TO db_app_service;
\ No newline at end of file
+GRANT EXECUTE ON dbo.sp_GetAllCustomerAccounts TO db_app_service;
+
+-- to execute: richest customers first, then a lookup by account number
+EXEC dbo.sp_GetAllCustomerAccounts @PageNumber = 1, @PageSize = 50, @SortBy = 'Acc_Balance', @SortDir = 'DESC';
+EXEC dbo.sp_GetAllCustomerAccounts @Search = N'100-7';
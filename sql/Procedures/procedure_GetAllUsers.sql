@@ -1,46 +1,115 @@
 USE IronVaultDB
 GO
 
-ALTER PROCEDURE dbo.sp_GetAllUsers
+-- one page of users for the admin view, with search, sort and the total for the pager
+-- @Search matches the start of the name or an exact UserID
+-- @SortBy: UserID | User_Name | Role_Name | Status, @SortDir: ASC | DESC
+-- the email is decrypted once per row, and only for the rows on the page
+CREATE OR ALTER PROCEDURE dbo.sp_GetAllUsers
+    @PageNumber INT = 1,
+    @PageSize INT = 50,
+    @Search NVARCHAR(100) = NULL,
+    @SortBy VARCHAR(20) = 'UserID',
+    @SortDir VARCHAR(4) = 'ASC'
 AS
 BEGIN
     SET NOCOUNT ON;
-    
+
+    IF @PageNumber < 1 SET @PageNumber = 1;
+    IF @PageSize NOT BETWEEN 1 AND 500 SET @PageSize = 50;
+    SET @Search = NULLIF(LTRIM(RTRIM(@Search)), '');
+
+    DECLARE @Page TABLE (
+        RowNo INT PRIMARY KEY,
+        UserID INT,
+        User_Name NVARCHAR(255),
+        Email VARCHAR(255),
+        Role_Name VARCHAR(100),
+        RoleID INT,
+        Status VARCHAR(100),
+        TotalCount INT
+    );
+
     -- Open the symmetric key for decryption
     OPEN SYMMETRIC KEY IronVaultSymKey
     DECRYPTION BY PASSWORD = 'Pa$$w0rd';
-    
-    SELECT 
-        u.UserID,
+
+    -- number and page the rows first (no decryption), then decrypt only the page into @Page
+    ;WITH filtered AS (
+        SELECT
+            u.UserID,
+            u.User_Name,
+            r.Role_Name,
+            u.RoleID,
+            ISNULL(u.Status, 'Active') AS Status,
+            ROW_NUMBER() OVER (ORDER BY
+                CASE WHEN @SortDir = 'ASC' THEN
+                    CASE @SortBy
+                        WHEN 'User_Name' THEN u.User_Name
+                        WHEN 'Role_Name' THEN r.Role_Name
+                        WHEN 'Status' THEN ISNULL(u.Status, 'Active')
+                    END
+                END ASC,
+                CASE WHEN @SortDir = 'DESC' THEN
+                    CASE @SortBy
+                        WHEN 'User_Name' THEN u.User_Name
+                        WHEN 'Role_Name' THEN r.Role_Name
+                        WHEN 'Status' THEN ISNULL(u.Status, 'Active')
+                    END
+                END DESC,
+                CASE WHEN @SortDir = 'DESC' THEN u.UserID END DESC,
+                u.UserID ASC
+            ) AS RowNo,
+            COUNT(*) OVER () AS TotalCount
+        FROM [User] u
+        JOIN [Role] r ON u.RoleID = r.RoleID
+        WHERE @Search IS NULL
+           OR u.User_Name LIKE REPLACE(REPLACE(REPLACE(@Search, '[', '[[]'), '%', '[%]'), '_', '[_]') + '%'
+           OR CAST(u.UserID AS NVARCHAR(20)) = @Search
+    )
+    INSERT INTO @Page (RowNo, UserID, User_Name, Email, Role_Name, RoleID, Status, TotalCount)
+    SELECT
+        f.RowNo,
+        f.UserID,
+        f.User_Name,
+        CONVERT(VARCHAR(255), DECRYPTBYKEY(u.User_Email_Encrypted)),
+        f.Role_Name,
+        f.RoleID,
+        f.Status,
+        f.TotalCount
+    FROM filtered f
+    JOIN [User] u ON u.UserID = f.UserID
+    WHERE f.RowNo > (@PageNumber - 1) * @PageSize
+      AND f.RowNo <= @PageNumber * @PageSize
+    OPTION (RECOMPILE);
+
+    -- Close the symmetric key
+    CLOSE SYMMETRIC KEY IronVaultSymKey;
+
+    SELECT
+        p.UserID,
         -- Mask name: Show first 2 chars, rest as asterisks (e.g., "Natasha" -> "Na*****")
-        CASE 
-            WHEN LEN(u.User_Name) <= 2 THEN u.User_Name
-            ELSE LEFT(u.User_Name, 2) + REPLICATE('*', LEN(u.User_Name) - 2)
+        CASE
+            WHEN LEN(p.User_Name) <= 2 THEN p.User_Name
+            ELSE LEFT(p.User_Name, 2) + REPLICATE('*', LEN(p.User_Name) - 2)
         END AS User_Name,
         -- Mask email: Show first char and domain, hide the rest (e.g., "test@example.com" -> "t***@example.com")
-        CASE 
-            WHEN CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)) IS NOT NULL 
-                AND CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) > 0 
-            THEN 
-                LEFT(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)), 1) + 
-                REPLICATE('*', CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))) - 2) + 
-                SUBSTRING(
-                    CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)), 
-                    CHARINDEX('@', CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted))), 
-                    LEN(CONVERT(VARCHAR(255), DECRYPTBYKEY(User_Email_Encrypted)))
-                )
-            ELSE 
-                '[PROTECTED]'
+        CASE
+            WHEN e.AtPos > 1 THEN LEFT(p.Email, 1) + REPLICATE('*', e.AtPos - 2) + SUBSTRING(p.Email, e.AtPos, LEN(p.Email))
+            ELSE '[PROTECTED]'
         END AS User_Email,
-        r.Role_Name, 
-        u.RoleID,
-        ISNULL(u.Status, 'Active') AS Status
-    FROM [User] u
-    JOIN [Role] r ON u.RoleID = r.RoleID;
-    
-    -- Close the symmetric key
-    CLOSE SYMMETRIC KEY IronVaultSymKey;
+        p.Role_Name,
+        p.RoleID,
+        p.Status,
+        p.TotalCount
+    FROM @Page p
+    CROSS APPLY (SELECT CHARINDEX('@', p.Email) AS AtPos) e
+    ORDER BY p.RowNo;
 END;
 GO
 
-GRANT EXECUTE ON dbo.sp_GetAllUsers TO db_app_service;
\ No newline at end of file
+GRANT EXECUTE ON dbo.sp_GetAllUsers TO db_app_service;
+
+-- to execute: second page of 50, names starting with "Na", newest users first
+EXEC dbo.sp_GetAllUsers @PageNumber = 2, @PageSize = 50;
+EXEC dbo.sp_GetAllUsers @Search = N'Na', @SortBy = 'UserID', @SortDir = 'DESC';
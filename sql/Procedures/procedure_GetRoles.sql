@@ -0,0 +1,20 @@
+USE IronVaultDB
+GO
+
+-- the role catalog (Step 1 seeds Admin, Customer, Manager), read by the app once per
+-- ROLE_CATALOG_TTL: db_app_service has no SELECT on [Role]
+CREATE OR ALTER PROCEDURE dbo.sp_GetRoles
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    SELECT RoleID, Role_Name
+    FROM [Role]
+    ORDER BY RoleID;
+END;
+GO
+
+GRANT EXECUTE ON dbo.sp_GetRoles TO db_app_service;
+
+-- to execute
+EXEC dbo.sp_GetRoles;
@@ -0,0 +1,83 @@
+Use IronVaultDB
+GO
+
+-- account statement for /statement, range-bounded variant of sp_GetTransactionsByUser
+-- @From inclusive, @To exclusive
+-- two result sets:
+--   1. one row: the account number and the balance at @From
+--   2. the transactions in the range, oldest first (the app adds the running balance
+--      while streaming, so the server doesn't have to sort for a window function)
+-- Transaction and Account are filtered by the RLS session context like every other read
+CREATE OR ALTER PROCEDURE dbo.sp_GetStatementByUser
+    @UserID INT,
+    @From DATETIME,
+    @To DATETIME
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @MyAccounts TABLE (AccountID INT PRIMARY KEY);
+    INSERT INTO @MyAccounts (AccountID)
+    SELECT AccountID FROM Account WHERE UserID = @UserID;
+
+    OPEN SYMMETRIC KEY IronVaultSymKey
+    DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+
+    -- opening balance: today's balance minus everything that moved since @From,
+    -- two range seeks on the date indexes instead of summing the whole history
+    SELECT
+        (SELECT TOP 1 CONVERT(VARCHAR(20), DECRYPTBYKEY(a.Acc_Number_Encrypted))
+         FROM Account a JOIN @MyAccounts m ON a.AccountID = m.AccountID
+         ORDER BY a.AccountID) AS Acc_Number,
+        ISNULL((SELECT SUM(a.Acc_Balance) FROM Account a JOIN @MyAccounts m ON a.AccountID = m.AccountID), 0)
+        + ISNULL((SELECT SUM(s.Amount) FROM [Transaction] s
+                  JOIN @MyAccounts m ON s.SenderAccountID = m.AccountID
+                  WHERE s.Transaction_Date >= @From
+                    AND (s.ReceiverAccountID IS NULL OR s.ReceiverAccountID NOT IN (SELECT AccountID FROM @MyAccounts))), 0)
+        - ISNULL((SELECT SUM(r.Amount) FROM [Transaction] r
+                  JOIN @MyAccounts m ON r.ReceiverAccountID = m.AccountID
+                  WHERE r.Transaction_Date >= @From
+                    AND (r.SenderAccountID IS NULL OR r.SenderAccountID NOT IN (SELECT AccountID FROM @MyAccounts))), 0)
+        AS Opening_Balance;
+
+    -- UNION ALL of two range seeks (IX_Transaction_Sender_Date, IX_Transaction_Receiver_Date);
+    -- only the counterparty's account number is decrypted
+    SELECT
+        t.TransactionID,
+        t.Transaction_Date,
+        t.Transaction_Type,
+        t.Description,
+        t.Transaction_Direction,
+        CONVERT(VARCHAR(20), DECRYPTBYKEY(ca.Acc_Number_Encrypted)) AS Counterparty_Account,
+        cu.User_Name AS Counterparty_Name,
+        t.Amount
+    FROM (
+        SELECT s.TransactionID, s.Transaction_Date, s.Transaction_Type, s.Amount, s.Description,
+               s.ReceiverAccountID AS CounterpartyAccountID, 'Debit' AS Transaction_Direction
+        FROM [Transaction] s
+        JOIN @MyAccounts m ON s.SenderAccountID = m.AccountID
+        WHERE s.Transaction_Date >= @From AND s.Transaction_Date < @To
+
+        UNION ALL
+
+        -- credits, skipping transfers between the user's own accounts (already listed above)
+        SELECT r.TransactionID, r.Transaction_Date, r.Transaction_Type, r.Amount, r.Description,
+               r.SenderAccountID, 'Credit'
+        FROM [Transaction] r
+        JOIN @MyAccounts m ON r.ReceiverAccountID = m.AccountID
+        WHERE r.Transaction_Date >= @From AND r.Transaction_Date < @To
+          AND (r.SenderAccountID IS NULL
+               OR r.SenderAccountID NOT IN (SELECT AccountID FROM @MyAccounts))
+    ) t
+    LEFT JOIN Account ca ON t.CounterpartyAccountID = ca.AccountID
+    LEFT JOIN [User] cu ON ca.UserID = cu.UserID
+    ORDER BY t.Transaction_Date, t.TransactionID;
+
+    CLOSE SYMMETRIC KEY IronVaultSymKey;
+END;
+GO
+
+GRANT EXECUTE ON dbo.sp_GetStatementByUser TO db_app_service;
+
+-- to execute: January 2025
+EXEC dbo.sp_GetStatementByUser @UserID = 6, @From = '2025-01-01', @To = '2025-02-01';
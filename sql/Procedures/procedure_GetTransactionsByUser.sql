@@ -7,9 +7,15 @@ AS
 BEGIN
     SET NOCOUNT ON;
     
+    DECLARE @MyAccounts TABLE (AccountID INT PRIMARY KEY);
+    INSERT INTO @MyAccounts (AccountID)
+    SELECT AccountID FROM Account WHERE UserID = @UserID;
+
     OPEN SYMMETRIC KEY IronVaultSymKey
     DECRYPTION BY PASSWORD = 'Pa$$w0rd';
     
+    -- UNION ALL of two seeks (IX_Transaction_Sender_Date, IX_Transaction_Receiver_Date)
+    -- instead of an OR over both columns, which scans the whole table
     SELECT 
         t.TransactionID,
         t.Transaction_Date,
@@ -22,18 +28,28 @@ BEGIN
         CONVERT(VARCHAR(20), DECRYPTBYKEY(ra.Acc_Number_Encrypted)) AS ReceiverAccount,
         su.User_Name AS SenderName,
         ru.User_Name AS ReceiverName,
-        CASE 
-            WHEN t.SenderAccountID IN (SELECT AccountID FROM Account WHERE UserID = @UserID) THEN 'Debit'
-            ELSE 'Credit'
-        END AS Transaction_Direction
-    FROM [Transaction] t
+        t.Transaction_Direction
+    FROM (
+        SELECT s.TransactionID, s.Transaction_Date, s.Transaction_Type, s.Amount, s.Description,
+               s.SenderAccountID, s.ReceiverAccountID, 'Debit' AS Transaction_Direction
+        FROM [Transaction] s
+        JOIN @MyAccounts m ON s.SenderAccountID = m.AccountID
+
+        UNION ALL
+
+        -- credits, skipping transfers between the user's own accounts (already listed above)
+        SELECT r.TransactionID, r.Transaction_Date, r.Transaction_Type, r.Amount, r.Description,
+               r.SenderAccountID, r.ReceiverAccountID, 'Credit'
+        FROM [Transaction] r
+        JOIN @MyAccounts m ON r.ReceiverAccountID = m.AccountID
+        WHERE r.SenderAccountID IS NULL
+           OR r.SenderAccountID NOT IN (SELECT AccountID FROM @MyAccounts)
+    ) t
     LEFT JOIN Account sa ON t.SenderAccountID = sa.AccountID
     LEFT JOIN Account ra ON t.ReceiverAccountID = ra.AccountID
     LEFT JOIN [User] su ON sa.UserID = su.UserID
     LEFT JOIN [User] ru ON ra.UserID = ru.UserID
-    WHERE t.SenderAccountID IN (SELECT AccountID FROM Account WHERE UserID = @UserID)
-       OR t.ReceiverAccountID IN (SELECT AccountID FROM Account WHERE UserID = @UserID)
-    ORDER BY t.Transaction_Date DESC;
+    ORDER BY t.Transaction_Date DESC, t.TransactionID DESC;
     
     CLOSE SYMMETRIC KEY IronVaultSymKey;
 END;
@@ -0,0 +1,108 @@
+Use IronVaultDB
+GO
+
+-- keyset pagination over the transaction history, newest first
+-- pass the (Transaction_Date, TransactionID) of the last row seen to get the next page
+-- @CursorDate is DATETIME on purpose, so the value read back by the app compares exactly
+CREATE OR ALTER PROCEDURE dbo.sp_GetTransactionsByUserPage
+    @UserID INT,
+    @PageSize INT = 20,
+    @CursorDate DATETIME = NULL,
+    @CursorID INT = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @MyAccounts TABLE (AccountID INT PRIMARY KEY);
+    INSERT INTO @MyAccounts (AccountID)
+    SELECT AccountID FROM Account WHERE UserID = @UserID;
+
+    -- pick the page first, only decrypt the rows that are actually returned
+    DECLARE @Page TABLE (
+        TransactionID INT PRIMARY KEY,
+        Transaction_Date DATETIME,
+        Transaction_Type VARCHAR(50),
+        Amount DECIMAL(18, 2),
+        Description VARCHAR(255),
+        SenderAccountID INT,
+        ReceiverAccountID INT
+    );
+
+    -- UNION ALL of two top-N seeks (IX_Transaction_Sender_Date, IX_Transaction_Receiver_Date)
+    -- instead of an OR over both columns, which scans the whole table
+    INSERT INTO @Page
+    SELECT TOP (@PageSize)
+        x.TransactionID,
+        x.Transaction_Date,
+        x.Transaction_Type,
+        x.Amount,
+        x.Description,
+        x.SenderAccountID,
+        x.ReceiverAccountID
+    FROM (
+        SELECT * FROM (
+            SELECT TOP (@PageSize)
+                t.TransactionID, t.Transaction_Date, t.Transaction_Type, t.Amount, t.Description,
+                t.SenderAccountID, t.ReceiverAccountID
+            FROM [Transaction] t
+            JOIN @MyAccounts m ON t.SenderAccountID = m.AccountID
+            WHERE @CursorDate IS NULL
+               OR t.Transaction_Date < @CursorDate
+               OR (t.Transaction_Date = @CursorDate AND t.TransactionID < @CursorID)
+            ORDER BY t.Transaction_Date DESC, t.TransactionID DESC
+        ) debits
+
+        UNION ALL
+
+        -- credits, skipping transfers between the user's own accounts (already listed above)
+        SELECT * FROM (
+            SELECT TOP (@PageSize)
+                t.TransactionID, t.Transaction_Date, t.Transaction_Type, t.Amount, t.Description,
+                t.SenderAccountID, t.ReceiverAccountID
+            FROM [Transaction] t
+            JOIN @MyAccounts m ON t.ReceiverAccountID = m.AccountID
+            WHERE (t.SenderAccountID IS NULL
+                   OR t.SenderAccountID NOT IN (SELECT AccountID FROM @MyAccounts))
+              AND (@CursorDate IS NULL
+                   OR t.Transaction_Date < @CursorDate
+                   OR (t.Transaction_Date = @CursorDate AND t.TransactionID < @CursorID))
+            ORDER BY t.Transaction_Date DESC, t.TransactionID DESC
+        ) credits
+    ) x
+    ORDER BY x.Transaction_Date DESC, x.TransactionID DESC;
+
+    OPEN SYMMETRIC KEY IronVaultSymKey
+    DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+
+    SELECT
+        p.TransactionID,
+        p.Transaction_Date,
+        p.Transaction_Type,
+        p.Amount,
+        p.Description,
+        p.SenderAccountID,
+        p.ReceiverAccountID,
+        CONVERT(VARCHAR(20), DECRYPTBYKEY(sa.Acc_Number_Encrypted)) AS SenderAccount,
+        CONVERT(VARCHAR(20), DECRYPTBYKEY(ra.Acc_Number_Encrypted)) AS ReceiverAccount,
+        su.User_Name AS SenderName,
+        ru.User_Name AS ReceiverName,
+        CASE
+            WHEN p.SenderAccountID IN (SELECT AccountID FROM @MyAccounts) THEN 'Debit'
+            ELSE 'Credit'
+        END AS Transaction_Direction
+    FROM @Page p
+    LEFT JOIN Account sa ON p.SenderAccountID = sa.AccountID
+    LEFT JOIN Account ra ON p.ReceiverAccountID = ra.AccountID
+    LEFT JOIN [User] su ON sa.UserID = su.UserID
+    LEFT JOIN [User] ru ON ra.UserID = ru.UserID
+    ORDER BY p.Transaction_Date DESC, p.TransactionID DESC;
+
+    CLOSE SYMMETRIC KEY IronVaultSymKey;
+END;
+GO
+
+GRANT EXECUTE ON dbo.sp_GetTransactionsByUserPage TO db_app_service;
+
+-- to execute: first page, then the next one after TransactionID 42
+EXEC dbo.sp_GetTransactionsByUserPage @UserID = 6, @PageSize = 20;
+EXEC dbo.sp_GetTransactionsByUserPage @UserID = 6, @PageSize = 20, @CursorDate = '2025-01-31 10:15:00.000', @CursorID = 42;
@@ -0,0 +1,110 @@
+USE IronVaultDB;
+GO
+
+-- monthly retention job for Application_Audit_Log (partitioned in Step 14), run by
+-- a SQL Agent job on the 1st of every month as the DBA, never by the app:
+--   1. adds month boundaries so there are always @MonthsAhead empty months ahead
+--      (splitting an empty partition is instant)
+--   2. switches every month older than @RetainMonths into the same partition of
+--      Application_Audit_Log_Archive: a metadata change, no rows are copied or logged
+--   3. optionally truncates archive months older than @PurgeArchiveMonths
+CREATE OR ALTER PROCEDURE dbo.sp_MaintainAuditPartitions
+    @RetainMonths INT = 12,
+    @MonthsAhead INT = 3,
+    @PurgeArchiveMonths INT = NULL  -- NULL keeps the archive forever
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    DECLARE @ThisMonth DATETIME = DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1);
+    DECLARE @FunctionID INT = (SELECT function_id FROM sys.partition_functions WHERE name = 'pf_AuditMonthly');
+    DECLARE @Boundary DATETIME, @Partition INT, @Sql NVARCHAR(400);
+
+    IF @FunctionID IS NULL
+        THROW 50020, 'pf_AuditMonthly not found, run Step 14 first.', 1;
+
+    -- 1. future months
+    SELECT @Boundary = MAX(CONVERT(DATETIME, value)) FROM sys.partition_range_values WHERE function_id = @FunctionID;
+    WHILE @Boundary < DATEADD(MONTH, @MonthsAhead, @ThisMonth)
+    BEGIN
+        SET @Boundary = DATEADD(MONTH, 1, @Boundary);
+        ALTER PARTITION SCHEME ps_AuditMonthly NEXT USED [PRIMARY];
+        ALTER PARTITION FUNCTION pf_AuditMonthly() SPLIT RANGE (@Boundary);
+        PRINT CONCAT('Added month ', CONVERT(CHAR(7), @Boundary, 120));
+    END
+
+    -- 2. switch out expired months: partition N holds [boundary N-1, boundary N),
+    -- so it is expired when its upper boundary is on or before the cutoff
+    DECLARE @Cutoff DATETIME = DATEADD(MONTH, -@RetainMonths, @ThisMonth);
+
+    DECLARE expired CURSOR LOCAL FAST_FORWARD FOR
+        SELECT p.partition_number
+        FROM sys.partitions p
+        JOIN sys.partition_range_values prv
+            ON prv.function_id = @FunctionID AND prv.boundary_id = p.partition_number
+        WHERE p.object_id = OBJECT_ID('dbo.Application_Audit_Log')
+          AND p.index_id = 1
+          AND p.rows > 0
+          AND CONVERT(DATETIME, prv.value) <= @Cutoff
+        ORDER BY p.partition_number;
+
+    OPEN expired;
+    FETCH NEXT FROM expired INTO @Partition;
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        -- the archive partition is empty unless a month was switched before, then the
+        -- rows that arrived late for that month are appended (a small INSERT)
+        IF EXISTS (SELECT 1 FROM sys.partitions WHERE object_id = OBJECT_ID('dbo.Application_Audit_Log_Archive')
+                                                  AND index_id = 1 AND partition_number = @Partition AND rows > 0)
+        BEGIN
+            BEGIN TRANSACTION;
+            SET IDENTITY_INSERT Application_Audit_Log_Archive ON;
+            INSERT INTO Application_Audit_Log_Archive (LogID, UserID, User_Name, Role_Name, Action_Type, Action_Date, IP_Address, Status, Message)
+            SELECT LogID, UserID, User_Name, Role_Name, Action_Type, Action_Date, IP_Address, Status, Message
+            FROM Application_Audit_Log
+            WHERE $PARTITION.pf_AuditMonthly(Action_Date) = @Partition;
+            SET IDENTITY_INSERT Application_Audit_Log_Archive OFF;
+            SET @Sql = CONCAT(N'TRUNCATE TABLE dbo.Application_Audit_Log WITH (PARTITIONS (', @Partition, N'));');
+            EXEC sp_executesql @Sql;
+            COMMIT TRANSACTION;
+        END
+        ELSE
+        BEGIN
+            SET @Sql = CONCAT(N'ALTER TABLE dbo.Application_Audit_Log SWITCH PARTITION ', @Partition,
+                              N' TO dbo.Application_Audit_Log_Archive PARTITION ', @Partition, N';');
+            EXEC sp_executesql @Sql;
+        END
+        PRINT CONCAT('Archived partition ', @Partition);
+        FETCH NEXT FROM expired INTO @Partition;
+    END
+    CLOSE expired;
+    DEALLOCATE expired;
+
+    -- 3. purge the archive itself
+    IF @PurgeArchiveMonths IS NOT NULL
+    BEGIN
+        DECLARE @PurgeBefore DATETIME = DATEADD(MONTH, -@PurgeArchiveMonths, @ThisMonth);
+        DECLARE @Partitions NVARCHAR(MAX) = (
+            SELECT STRING_AGG(CAST(p.partition_number AS NVARCHAR(10)), N',')
+            FROM sys.partitions p
+            JOIN sys.partition_range_values prv
+                ON prv.function_id = @FunctionID AND prv.boundary_id = p.partition_number
+            WHERE p.object_id = OBJECT_ID('dbo.Application_Audit_Log_Archive')
+              AND p.index_id = 1
+              AND p.rows > 0
+              AND CONVERT(DATETIME, prv.value) <= @PurgeBefore
+        );
+        IF @Partitions IS NOT NULL
+        BEGIN
+            SET @Sql = CONCAT(N'TRUNCATE TABLE dbo.Application_Audit_Log_Archive WITH (PARTITIONS (', @Partitions, N'));');
+            EXEC sp_executesql @Sql;
+            PRINT CONCAT('Purged archive partitions ', @Partitions);
+        END
+    END
+END;
+GO
+-- DBA only: no grant to db_app_service
+
+-- to execute (keep a year online, seven in the archive)
+EXEC dbo.sp_MaintainAuditPartitions @RetainMonths = 12, @MonthsAhead = 3, @PurgeArchiveMonths = 84;
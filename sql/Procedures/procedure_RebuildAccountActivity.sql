@@ -0,0 +1,95 @@
+USE IronVaultDB;
+GO
+
+-- recomputes Account_Daily_Activity (Step 15) from [Transaction] for [@From, @To),
+-- by default everything up to and including today: the backfill after the migration,
+-- or a repair if the aggregate was ever written around the procedures.
+-- Works in chunks of @ChunkDays, one transaction each. A chunk holds an exclusive
+-- lock on the aggregate while it runs, deposits and transfers wait for it, so keep
+-- chunks short on a busy server.
+-- Safe while the app is running: the write procedures touch the aggregate before
+-- they insert their [Transaction] row, so a transaction this chunk can't see yet
+-- has not touched the aggregate either, and adds itself once the chunk commits.
+-- Run by a DBA, not granted to the app.
+CREATE OR ALTER PROCEDURE dbo.sp_RebuildAccountActivity
+    @From DATE = NULL,
+    @To DATE = NULL,
+    @ChunkDays INT = 31
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    IF @From IS NULL
+        SELECT @From = CAST(MIN(Transaction_Date) AS DATE) FROM [Transaction];
+    IF @To IS NULL
+        SET @To = DATEADD(DAY, 1, CAST(GETDATE() AS DATE));
+    IF @ChunkDays < 1
+        SET @ChunkDays = 1;
+
+    DECLARE @Day DATE = @From, @ChunkEnd DATE, @Rows INT, @TotalRows INT = 0;
+
+    WHILE @Day IS NOT NULL AND @Day < @To
+    BEGIN
+        SET @ChunkEnd = DATEADD(DAY, @ChunkDays, @Day);
+        IF @ChunkEnd > @To SET @ChunkEnd = @To;
+
+        BEGIN TRANSACTION;
+
+        -- writers queue behind this, see the header
+        SELECT TOP 0 AccountID FROM Account_Daily_Activity WITH (TABLOCKX, HOLDLOCK);
+
+        DELETE FROM Account_Daily_Activity
+        WHERE Activity_Date >= @Day AND Activity_Date < @ChunkEnd;
+
+        -- one range seek on IX_Transaction_Date, each transaction counted for both sides
+        INSERT INTO Account_Daily_Activity
+            (Activity_Date, AccountID, Deposit_Count, Deposit_Amount,
+             Transfer_In_Count, Transfer_In_Amount, Transfer_Out_Count, Transfer_Out_Amount)
+        SELECT x.Activity_Date, x.AccountID,
+               SUM(x.Deposit_Count), SUM(x.Deposit_Amount),
+               SUM(x.Transfer_In_Count), SUM(x.Transfer_In_Amount),
+               SUM(x.Transfer_Out_Count), SUM(x.Transfer_Out_Amount)
+        FROM (
+            SELECT CAST(t.Transaction_Date AS DATE) AS Activity_Date,
+                   side.AccountID,
+                   CASE WHEN side.Is_Receiver = 1 AND t.Transaction_Type = 'DEPOSIT' THEN 1 ELSE 0 END AS Deposit_Count,
+                   CASE WHEN side.Is_Receiver = 1 AND t.Transaction_Type = 'DEPOSIT' THEN t.Amount ELSE 0 END AS Deposit_Amount,
+                   CASE WHEN side.Is_Receiver = 1 AND t.Transaction_Type <> 'DEPOSIT' THEN 1 ELSE 0 END AS Transfer_In_Count,
+                   CASE WHEN side.Is_Receiver = 1 AND t.Transaction_Type <> 'DEPOSIT' THEN t.Amount ELSE 0 END AS Transfer_In_Amount,
+                   CASE WHEN side.Is_Receiver = 0 THEN 1 ELSE 0 END AS Transfer_Out_Count,
+                   CASE WHEN side.Is_Receiver = 0 THEN t.Amount ELSE 0 END AS Transfer_Out_Amount
+            FROM [Transaction] t
+            CROSS APPLY (
+                SELECT t.ReceiverAccountID, 1
+                UNION ALL
+                SELECT t.SenderAccountID, 0
+            ) side (AccountID, Is_Receiver)
+            WHERE t.Transaction_Date >= @Day
+              AND t.Transaction_Date < @ChunkEnd
+              AND side.AccountID IS NOT NULL
+        ) x
+        GROUP BY x.Activity_Date, x.AccountID;
+
+        SET @Rows = @@ROWCOUNT;
+        COMMIT TRANSACTION;
+
+        SET @TotalRows = @TotalRows + @Rows;
+        PRINT CONCAT('Account_Daily_Activity ', CONVERT(VARCHAR(10), @Day, 120), ' .. ',
+                     CONVERT(VARCHAR(10), DATEADD(DAY, -1, @ChunkEnd), 120), ': ', @Rows, ' row(s)');
+        SET @Day = @ChunkEnd;
+    END
+
+    SELECT @From AS From_Date, @To AS To_Date, @TotalRows AS Rows_Written;
+END
+GO
+
+-- to execute: backfill everything, or repair a range
+EXEC dbo.sp_RebuildAccountActivity;
+EXEC dbo.sp_RebuildAccountActivity @From = '2025-01-01', @To = '2025-02-01', @ChunkDays = 7;
+
+-- check: the aggregate against a direct count for one day
+DECLARE @Check DATE = CAST(GETDATE() AS DATE);
+SELECT
+    (SELECT SUM(Deposit_Amount + Transfer_In_Amount) FROM Account_Daily_Activity WHERE Activity_Date = @Check) AS Aggregate_In,
+    (SELECT SUM(Amount) FROM [Transaction] WHERE Transaction_Date >= @Check AND Transaction_Date < DATEADD(DAY, 1, @Check)) AS Transactions_In;
@@ -0,0 +1,57 @@
+USE IronVaultDB
+GO
+
+-- audit log explorer (/admin/audit) and its CSV export
+-- every filter is optional; @From inclusive, @To exclusive
+-- keyset pagination newest first: pass the (Action_Date, LogID) of the last row seen,
+-- a seek on the clustered key (Action_Date, LogID) from Step 14, and only the
+-- partitions between @From and @To are read
+-- @PageSize NULL returns every matching row (the export reads them with fetchmany)
+CREATE OR ALTER PROCEDURE dbo.sp_SearchAuditLogs
+    @From DATETIME = NULL,
+    @To DATETIME = NULL,
+    @ActionType VARCHAR(255) = NULL,
+    @Status VARCHAR(100) = NULL,
+    @UserID INT = NULL,
+    @PageSize INT = 50,
+    @CursorDate DATETIME = NULL,
+    @CursorID INT = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    SELECT TOP (ISNULL(@PageSize, 2147483647))
+        LogID,
+        UserID,
+        User_Name,
+        Role_Name,
+        Action_Type,
+        Status,
+        Message,
+        Action_Date,
+        -- same masking as sp_GetAuditLogs: 192.168.1.100 becomes 192.168.1.xxx
+        CASE 
+            WHEN IP_Address IS NOT NULL AND IP_Address LIKE '%.%.%.%' THEN
+                SUBSTRING(IP_Address, 1, LEN(IP_Address) - CHARINDEX('.', REVERSE(IP_Address))) + '.xxx'
+            ELSE 
+                IP_Address
+        END AS IP_Address
+    FROM Application_Audit_Log
+    WHERE (@From IS NULL OR Action_Date >= @From)
+      AND (@To IS NULL OR Action_Date < @To)
+      AND (@ActionType IS NULL OR Action_Type = @ActionType)
+      AND (@Status IS NULL OR Status = @Status)
+      AND (@UserID IS NULL OR UserID = @UserID)
+      AND (@CursorDate IS NULL
+           OR Action_Date < @CursorDate
+           OR (Action_Date = @CursorDate AND LogID < @CursorID))
+    ORDER BY Action_Date DESC, LogID DESC
+    -- optional filters: plan for the ones actually passed, not a generic scan
+    OPTION (RECOMPILE);
+END;
+GO
+GRANT EXECUTE ON dbo.sp_SearchAuditLogs TO db_app_service;
+
+-- to execute: failed logins of the last week, then the next page
+EXEC dbo.sp_SearchAuditLogs @From = '2025-01-24', @To = '2025-02-01', @ActionType = 'LOGIN', @Status = 'Failed';
+EXEC dbo.sp_SearchAuditLogs @ActionType = 'LOGIN', @Status = 'Failed', @CursorDate = '2025-01-31 10:15:00.000', @CursorID = 420;
@@ -5,44 +5,49 @@ ALTER PROCEDURE dbo.sp_TransferFunds
     @SenderUserID INT,
     @ReceiverAccNumber NVARCHAR(50),
     @Amount DECIMAL(18,2),
-    @ActorIP NVARCHAR(50)
+    @ActorIP NVARCHAR(50),
+    @VerifyReceiver BIT = 1,  -- also decrypt the matched row and compare, guards against a stale index
+    @ActorUserName NVARCHAR(255) = NULL,  -- passed by the app (utils/actor.py), saves the [User] JOIN [Role] lookup
+    @ActorRoleName NVARCHAR(100) = NULL
 AS
 BEGIN
     SET NOCOUNT ON;
-    DECLARE @SenderAccountID INT, @SenderBalance DECIMAL(18,2);
+    -- a hot account waits at most 5s for its lock (error 1222), the app retries deadlocks (1205) and lock timeouts
+    SET LOCK_TIMEOUT 5000;
+    DECLARE @SenderAccountID INT;
     DECLARE @ReceiverAccountID INT, @ReceiverUserID INT;
-    DECLARE @SenderName NVARCHAR(255);
-    DECLARE @RoleName NVARCHAR(100);
+    DECLARE @FirstAccountID INT, @SecondAccountID INT, @Locked INT;
+    DECLARE @SenderName NVARCHAR(255) = @ActorUserName;
+    DECLARE @RoleName NVARCHAR(100) = @ActorRoleName;
+    DECLARE @Now DATETIME = GETDATE();
+    DECLARE @Today DATE = CAST(@Now AS DATE);
     
     BEGIN TRY
-        OPEN SYMMETRIC KEY IronVaultSymKey
-        DECRYPTION BY PASSWORD = 'Pa$$w0rd';
-        
-        -- Get sender account and balance
-        SELECT TOP 1 
-            @SenderAccountID = AccountID, 
-            @SenderBalance = Acc_Balance
-        FROM vw_Account
+        -- Get sender account; the balance is checked by the debit itself, not read here
+        SELECT TOP 1 @SenderAccountID = AccountID
+        FROM Account
         WHERE UserID = @SenderUserID;
         
         IF @SenderAccountID IS NULL
-        BEGIN
-            CLOSE SYMMETRIC KEY IronVaultSymKey;
             THROW 50001, 'Sender account not found.', 1;
-        END
         
-        IF @SenderBalance < @Amount
-        BEGIN
-            CLOSE SYMMETRIC KEY IronVaultSymKey;
-            THROW 50002, 'Insufficient funds.', 1;
-        END
-        
-        -- Get receiver account - using VARCHAR for decryption (CRITICAL FIX)
+        OPEN SYMMETRIC KEY IronVaultSymKey
+        DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+
+        -- Get receiver account through the blind index, a seek on UX_Account_AccNumberIndex
+        -- instead of decrypting every account row
+        DECLARE @BlindKey VARBINARY(64) = (
+            SELECT CONVERT(VARBINARY(64), DECRYPTBYKEY(Key_Encrypted)) FROM Blind_Index_Key WHERE KeyID = 1
+        );
+        DECLARE @ReceiverIndex VARBINARY(32) = dbo.fn_AccNumberBlindIndex(@BlindKey, @ReceiverAccNumber);
+
         SELECT TOP 1 
             @ReceiverAccountID = AccountID, 
             @ReceiverUserID = UserID
         FROM Account
-        WHERE CONVERT(NVARCHAR(50), DECRYPTBYKEY(Acc_Number_Encrypted)) = @ReceiverAccNumber;
+        WHERE Acc_Number_Index = @ReceiverIndex
+          AND (@VerifyReceiver = 0
+               OR CONVERT(VARCHAR(50), DECRYPTBYKEY(Acc_Number_Encrypted)) = CONVERT(VARCHAR(50), LTRIM(RTRIM(@ReceiverAccNumber))));
         
         CLOSE SYMMETRIC KEY IronVaultSymKey;
         
@@ -52,24 +57,58 @@ BEGIN
         IF @SenderAccountID = @ReceiverAccountID
             THROW 50004, 'Cannot transfer to the same account.', 1;
         
-        -- Get sender name and role
-        SELECT @SenderName = User_Name, @RoleName = r.Role_Name
-        FROM [User] u
-        JOIN [Role] r ON u.RoleID = r.RoleID
-        WHERE u.UserID = @SenderUserID;
-        
+        -- Get sender name and role, unless the caller already passed them
+        IF @SenderName IS NULL OR @RoleName IS NULL
+            SELECT @SenderName = User_Name, @RoleName = r.Role_Name
+            FROM [User] u
+            JOIN [Role] r ON u.RoleID = r.RoleID
+            WHERE u.UserID = @SenderUserID;
+        
+        -- every transfer locks its two rows lowest AccountID first, so A->B and B->A
+        -- running at the same time queue behind each other instead of deadlocking
+        SET @FirstAccountID = CASE WHEN @SenderAccountID < @ReceiverAccountID THEN @SenderAccountID ELSE @ReceiverAccountID END;
+        SET @SecondAccountID = CASE WHEN @SenderAccountID < @ReceiverAccountID THEN @ReceiverAccountID ELSE @SenderAccountID END;
+
         BEGIN TRANSACTION;
+
+        SELECT @Locked = AccountID FROM Account WITH (UPDLOCK, ROWLOCK) WHERE AccountID = @FirstAccountID;
+        SELECT @Locked = AccountID FROM Account WITH (UPDLOCK, ROWLOCK) WHERE AccountID = @SecondAccountID;
         
+        -- check and debit in one statement, two concurrent debits can't both pass the check
         UPDATE Account
         SET Acc_Balance = Acc_Balance - @Amount
-        WHERE AccountID = @SenderAccountID;
+        WHERE AccountID = @SenderAccountID
+          AND Acc_Balance >= @Amount;
+
+        IF @@ROWCOUNT = 0
+            THROW 50002, 'Insufficient funds.', 1;
         
         UPDATE Account
         SET Acc_Balance = Acc_Balance + @Amount
         WHERE AccountID = @ReceiverAccountID;
         
-        INSERT INTO [Transaction] (SenderAccountID, ReceiverAccountID, Amount, Transaction_Type, Description)
-        VALUES (@SenderAccountID, @ReceiverAccountID, @Amount, 'TRANSFER', 'Online Transfer');
+        -- daily activity (Step 15), before the transaction row (see sp_RebuildAccountActivity);
+        -- both account rows are locked, nobody else inserts their row for today in between
+        UPDATE Account_Daily_Activity
+        SET Transfer_Out_Count = Transfer_Out_Count + 1,
+            Transfer_Out_Amount = Transfer_Out_Amount + @Amount
+        WHERE Activity_Date = @Today AND AccountID = @SenderAccountID;
+
+        IF @@ROWCOUNT = 0
+            INSERT INTO Account_Daily_Activity (Activity_Date, AccountID, Transfer_Out_Count, Transfer_Out_Amount)
+            VALUES (@Today, @SenderAccountID, 1, @Amount);
+
+        UPDATE Account_Daily_Activity
+        SET Transfer_In_Count = Transfer_In_Count + 1,
+            Transfer_In_Amount = Transfer_In_Amount + @Amount
+        WHERE Activity_Date = @Today AND AccountID = @ReceiverAccountID;
+
+        IF @@ROWCOUNT = 0
+            INSERT INTO Account_Daily_Activity (Activity_Date, AccountID, Transfer_In_Count, Transfer_In_Amount)
+            VALUES (@Today, @ReceiverAccountID, 1, @Amount);
+
+        INSERT INTO [Transaction] (SenderAccountID, ReceiverAccountID, Amount, Transaction_Type, Description, Transaction_Date)
+        VALUES (@SenderAccountID, @ReceiverAccountID, @Amount, 'TRANSFER', 'Online Transfer', @Now);
         
         INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
         VALUES (@SenderUserID, @SenderName, @RoleName, 'TRANSFER', 'Success', 
@@ -85,10 +124,14 @@ BEGIN
         IF (SELECT COUNT(*) FROM sys.openkeys WHERE key_name = 'IronVaultSymKey') > 0
             CLOSE SYMMETRIC KEY IronVaultSymKey;
             
-        DECLARE @ErrorMsg NVARCHAR(4000) = ERROR_MESSAGE();
-        INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
-        VALUES (@SenderUserID, ISNULL(@SenderName, 'Unknown'), ISNULL(@RoleName, 'Unknown'), 
-                'TRANSFER', 'Failed', @ErrorMsg, @ActorIP);
+        -- deadlock victims and lock timeouts are retried by the app, only log the final outcome
+        IF ERROR_NUMBER() NOT IN (1205, 1222)
+        BEGIN
+            DECLARE @ErrorMsg NVARCHAR(4000) = ERROR_MESSAGE();
+            INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
+            VALUES (@SenderUserID, ISNULL(@SenderName, 'Unknown'), ISNULL(@RoleName, 'Unknown'), 
+                    'TRANSFER', 'Failed', @ErrorMsg, @ActorIP);
+        END
         
         THROW;
     END CATCH
@@ -0,0 +1,247 @@
+USE IronVaultDB;
+GO
+
+-- batch transfer (payroll), set based: one key open, one receiver lookup per distinct
+-- account number, one balance check for the whole batch, one transaction
+-- rows that can't be applied (unknown receiver, own account, bad amount) are rejected
+-- individually, the rest go through together or not at all (insufficient funds)
+-- needs sql/13_migration_batch_transfer.sql for dbo.TransferBatchType
+CREATE OR ALTER PROCEDURE dbo.sp_TransferFundsBatch
+    @SenderUserID INT,
+    @Transfers dbo.TransferBatchType READONLY,
+    @ActorIP NVARCHAR(50),
+    @ActorUserName NVARCHAR(255) = NULL,
+    @ActorRoleName NVARCHAR(100) = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    DECLARE @SenderAccountID INT, @SenderBalance DECIMAL(18,2);
+    DECLARE @Total DECIMAL(18,2), @Count INT;
+    DECLARE @SenderName NVARCHAR(255) = @ActorUserName;
+    DECLARE @RoleName NVARCHAR(100) = @ActorRoleName;
+    DECLARE @Now DATETIME = GETDATE();
+    DECLARE @Today DATE = CAST(@Now AS DATE);
+
+    DECLARE @Result TABLE (
+        RowNo INT PRIMARY KEY,
+        ReceiverAccNumber NVARCHAR(50),
+        Amount DECIMAL(18,2),
+        ReceiverAccountID INT,
+        Status VARCHAR(20),
+        Message NVARCHAR(255)
+    );
+
+    DECLARE @Receivers TABLE (
+        ReceiverAccNumber NVARCHAR(50) PRIMARY KEY,
+        ReceiverAccountID INT
+    );
+
+    BEGIN TRY
+        IF @SenderName IS NULL OR @RoleName IS NULL
+            SELECT @SenderName = User_Name, @RoleName = r.Role_Name
+            FROM [User] u
+            JOIN [Role] r ON u.RoleID = r.RoleID
+            WHERE u.UserID = @SenderUserID;
+
+        SELECT TOP 1 @SenderAccountID = AccountID
+        FROM Account
+        WHERE UserID = @SenderUserID
+        ORDER BY AccountID;
+
+        IF @SenderAccountID IS NULL
+            THROW 50001, 'Sender account not found.', 1;
+
+        -- resolve each distinct receiver once, through the blind index (Step 11)
+        INSERT INTO @Receivers (ReceiverAccNumber)
+        SELECT DISTINCT LTRIM(RTRIM(ReceiverAccNumber)) FROM @Transfers;
+
+        OPEN SYMMETRIC KEY IronVaultSymKey
+        DECRYPTION BY PASSWORD = 'Pa$$w0rd';
+
+        DECLARE @BlindKey VARBINARY(64) = (
+            SELECT CONVERT(VARBINARY(64), DECRYPTBYKEY(Key_Encrypted)) FROM Blind_Index_Key WHERE KeyID = 1
+        );
+
+        UPDATE rc
+        SET ReceiverAccountID = a.AccountID
+        FROM @Receivers rc
+        JOIN Account a
+          ON a.Acc_Number_Index = dbo.fn_AccNumberBlindIndex(@BlindKey, rc.ReceiverAccNumber)
+         AND CONVERT(VARCHAR(50), DECRYPTBYKEY(a.Acc_Number_Encrypted)) = CONVERT(VARCHAR(50), rc.ReceiverAccNumber);
+
+        CLOSE SYMMETRIC KEY IronVaultSymKey;
+
+        INSERT INTO @Result (RowNo, ReceiverAccNumber, Amount, ReceiverAccountID, Status, Message)
+        SELECT
+            t.RowNo,
+            t.ReceiverAccNumber,
+            t.Amount,
+            rc.ReceiverAccountID,
+            CASE
+                WHEN t.Amount <= 0 THEN 'Rejected'
+                WHEN rc.ReceiverAccountID IS NULL THEN 'Rejected'
+                WHEN rc.ReceiverAccountID = @SenderAccountID THEN 'Rejected'
+                ELSE 'Pending'
+            END,
+            CASE
+                WHEN t.Amount <= 0 THEN 'Amount must be greater than 0.'
+                WHEN rc.ReceiverAccountID IS NULL THEN 'Receiver account not found.'
+                WHEN rc.ReceiverAccountID = @SenderAccountID THEN 'Cannot transfer to the same account.'
+            END
+        FROM @Transfers t
+        LEFT JOIN @Receivers rc ON rc.ReceiverAccNumber = LTRIM(RTRIM(t.ReceiverAccNumber));
+
+        SELECT @Total = ISNULL(SUM(Amount), 0), @Count = COUNT(*)
+        FROM @Result
+        WHERE Status = 'Pending';
+
+        IF @Count > 0
+        BEGIN
+            -- every account of the batch is locked lowest AccountID first, the order
+            -- sp_TransferFunds uses, so a batch and single transfers over the same accounts
+            -- queue behind each other instead of deadlocking
+            DECLARE @LockOrder TABLE (AccountID INT PRIMARY KEY);
+            DECLARE @LockID INT = 0, @Locked INT;
+
+            INSERT INTO @LockOrder (AccountID)
+            SELECT @SenderAccountID
+            UNION
+            SELECT ReceiverAccountID FROM @Result WHERE Status = 'Pending';
+
+            BEGIN TRANSACTION;
+
+            -- one row at a time: a set-based UPDLOCK doesn't promise the order it locks in
+            WHILE 1 = 1
+            BEGIN
+                SELECT TOP 1 @LockID = AccountID FROM @LockOrder WHERE AccountID > @LockID ORDER BY AccountID;
+                IF @@ROWCOUNT = 0 BREAK;
+
+                SELECT @Locked = AccountID FROM Account WITH (UPDLOCK, ROWLOCK) WHERE AccountID = @LockID;
+            END
+
+            -- the batch total is checked once, against the locked sender row
+            SELECT @SenderBalance = Acc_Balance
+            FROM Account
+            WHERE AccountID = @SenderAccountID;
+
+            IF @SenderBalance < @Total
+            BEGIN
+                ROLLBACK TRANSACTION;
+
+                UPDATE @Result
+                SET Status = 'Rejected',
+                    Message = CONCAT('Insufficient funds for the batch total of RM ', CONVERT(VARCHAR(30), CAST(@Total AS MONEY), 1), '.')
+                WHERE Status = 'Pending';
+
+                INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
+                VALUES (@SenderUserID, ISNULL(@SenderName, 'Unknown'), ISNULL(@RoleName, 'Unknown'), 'TRANSFER_BATCH', 'Failed',
+                        CONCAT('Insufficient funds for ', @Count, ' transfer(s) totalling RM ', CONVERT(VARCHAR(30), CAST(@Total AS MONEY), 1)), @ActorIP);
+            END
+            ELSE
+            BEGIN
+                UPDATE Account
+                SET Acc_Balance = Acc_Balance - @Total
+                WHERE AccountID = @SenderAccountID;
+
+                -- one UPDATE per receiver even when it appears on several rows
+                UPDATE a
+                SET Acc_Balance = a.Acc_Balance + r.Total
+                FROM Account a
+                JOIN (
+                    SELECT ReceiverAccountID, SUM(Amount) AS Total
+                    FROM @Result
+                    WHERE Status = 'Pending'
+                    GROUP BY ReceiverAccountID
+                ) r ON a.AccountID = r.ReceiverAccountID;
+
+                -- daily activity (Step 15), before the transaction rows (see sp_RebuildAccountActivity);
+                -- every account involved is locked above
+                UPDATE Account_Daily_Activity
+                SET Transfer_Out_Count = Transfer_Out_Count + @Count,
+                    Transfer_Out_Amount = Transfer_Out_Amount + @Total
+                WHERE Activity_Date = @Today AND AccountID = @SenderAccountID;
+
+                IF @@ROWCOUNT = 0
+                    INSERT INTO Account_Daily_Activity (Activity_Date, AccountID, Transfer_Out_Count, Transfer_Out_Amount)
+                    VALUES (@Today, @SenderAccountID, @Count, @Total);
+
+                DECLARE @Received TABLE (AccountID INT PRIMARY KEY, Cnt INT, Total DECIMAL(18,2));
+                INSERT INTO @Received (AccountID, Cnt, Total)
+                SELECT ReceiverAccountID, COUNT(*), SUM(Amount)
+                FROM @Result
+                WHERE Status = 'Pending'
+                GROUP BY ReceiverAccountID;
+
+                UPDATE d
+                SET Transfer_In_Count = d.Transfer_In_Count + r.Cnt,
+                    Transfer_In_Amount = d.Transfer_In_Amount + r.Total
+                FROM Account_Daily_Activity d
+                JOIN @Received r ON d.AccountID = r.AccountID
+                WHERE d.Activity_Date = @Today;
+
+                INSERT INTO Account_Daily_Activity (Activity_Date, AccountID, Transfer_In_Count, Transfer_In_Amount)
+                SELECT @Today, r.AccountID, r.Cnt, r.Total
+                FROM @Received r
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM Account_Daily_Activity d
+                    WHERE d.Activity_Date = @Today AND d.AccountID = r.AccountID
+                );
+
+                INSERT INTO [Transaction] (SenderAccountID, ReceiverAccountID, Amount, Transaction_Type, Description, Transaction_Date)
+                SELECT @SenderAccountID, ReceiverAccountID, Amount, 'TRANSFER', 'Batch Transfer', @Now
+                FROM @Result
+                WHERE Status = 'Pending'
+                ORDER BY RowNo;
+
+                -- same audit row per transfer as sp_TransferFunds
+                -- (CONVERT ... MONEY, 1 gives the N2 format without FORMAT's per-row CLR cost)
+                INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
+                SELECT @SenderUserID, @SenderName, @RoleName, 'TRANSFER', 'Success',
+                       CONCAT('Transferred RM ', CONVERT(VARCHAR(30), CAST(Amount AS MONEY), 1), ' to account ', ReceiverAccNumber), @ActorIP
+                FROM @Result
+                WHERE Status = 'Pending'
+                ORDER BY RowNo;
+
+                INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
+                VALUES (@SenderUserID, @SenderName, @RoleName, 'TRANSFER_BATCH', 'Success',
+                        CONCAT('Batch of ', @Count, ' transfer(s) totalling RM ', CONVERT(VARCHAR(30), CAST(@Total AS MONEY), 1)), @ActorIP);
+
+                COMMIT TRANSACTION;
+
+                UPDATE @Result SET Status = 'Success' WHERE Status = 'Pending';
+            END
+        END
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+
+        IF (SELECT COUNT(*) FROM sys.openkeys WHERE key_name = 'IronVaultSymKey') > 0
+            CLOSE SYMMETRIC KEY IronVaultSymKey;
+
+        -- deadlock victims and lock timeouts are retried by the app, only log the final outcome
+        IF ERROR_NUMBER() NOT IN (1205, 1222)
+        BEGIN
+            DECLARE @ErrorMsg NVARCHAR(4000) = ERROR_MESSAGE();
+            INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Status, Message, IP_Address)
+            VALUES (@SenderUserID, ISNULL(@SenderName, 'Unknown'), ISNULL(@RoleName, 'Unknown'),
+                    'TRANSFER_BATCH', 'Failed', @ErrorMsg, @ActorIP);
+        END
+
+        THROW;
+    END CATCH
+
+    SELECT RowNo, ReceiverAccNumber, Amount, Status, Message
+    FROM @Result
+    ORDER BY RowNo;
+END
+GO
+
+GRANT EXECUTE ON dbo.sp_TransferFundsBatch TO db_app_service;
+
+-- to execute:
+DECLARE @Batch dbo.TransferBatchType;
+INSERT INTO @Batch (RowNo, ReceiverAccNumber, Amount) VALUES (1, '100-7', 150.00), (2, '100-8', 99.90);
+EXEC dbo.sp_TransferFundsBatch @SenderUserID = 6, @Transfers = @Batch, @ActorIP = '127.0.0.1';
@@ -0,0 +1,34 @@
+Use IronVaultDB;
+GO
+
+-- rewrites a password hash in the current format (scrypt, see utils/passwords.py),
+-- called on login when the stored hash is legacy SHA-256 or has an outdated cost.
+-- The salt stays, both formats use User_Salt.
+CREATE OR ALTER PROCEDURE dbo.sp_UpdatePasswordHash
+    @UserID INT,
+    @PasswordHash VARCHAR(500)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF @PasswordHash NOT LIKE '$scrypt$%'
+    BEGIN
+        RAISERROR('Only scrypt hashes may be written.', 16, 1);
+        RETURN;
+    END
+
+    UPDATE [User]
+    SET User_PasswordHash = @PasswordHash
+    WHERE UserID = @UserID;
+END;
+GO
+
+GRANT EXECUTE ON dbo.sp_UpdatePasswordHash TO db_app_service;
+GO
+
+-- to execute (the app calls it after a login on an outdated hash; run by hand it replaces
+-- that user's password, so it stays commented out here)
+-- EXEC dbo.sp_UpdatePasswordHash @UserID = <UserID>, @PasswordHash = '<hash from utils/passwords.py>';
+
+-- hashes left on the legacy format
+SELECT COUNT(*) AS Legacy_Hashes FROM [User] WHERE User_PasswordHash NOT LIKE '$scrypt$%';
@@ -0,0 +1,26 @@
+USE IronVaultDB;
+GO
+
+-- batch insert of app-side audit events (failed logins, lockouts), called by the
+-- write-behind queue in utils/audit.py with one dbo.AuditEventType TVP per flush.
+-- Action_Date is when the event happened in the app, not when the batch landed.
+CREATE OR ALTER PROCEDURE dbo.sp_WriteAuditEvents
+    @Events dbo.AuditEventType READONLY
+WITH EXECUTE AS OWNER  -- the flush has no session context, RLS would hide every [User] row
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- a user deleted between the event and the flush keeps the row, without the FK
+    INSERT INTO Application_Audit_Log (UserID, User_Name, Role_Name, Action_Type, Action_Date, IP_Address, Status, Message)
+    SELECT u.UserID, e.User_Name, e.Role_Name, e.Action_Type, e.Action_Date, e.IP_Address, e.Status, e.Message
+    FROM @Events e
+    LEFT JOIN [User] u ON u.UserID = e.UserID;
+END;
+GO
+GRANT EXECUTE ON dbo.sp_WriteAuditEvents TO db_app_service;
+
+-- to execute
+DECLARE @Events dbo.AuditEventType;
+INSERT INTO @Events VALUES (NULL, NULL, NULL, 'LOGIN', GETDATE(), '10.0.0.1', 'Failed', 'Unknown email');
+EXEC dbo.sp_WriteAuditEvents @Events = @Events;
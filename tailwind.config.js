@@ -0,0 +1,8 @@
+/** Classes are taken from the templates (inline scripts included), everything else is purged */
+module.exports = {
+  content: ['./templates/**/*.html'],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
@@ -0,0 +1,87 @@
+"""
+Who is acting: the role catalog and the per-request actor context.
+
+The [Role] table is tiny and fixed (Step 1 seeds Admin, Customer, Manager), so it is
+read once per process and refreshed after ROLE_CATALOG_TTL seconds instead of being
+joined on every admin action. The actor (id, name, role name, IP) is built once per
+request from the session and handed to the procedures that write the audit log.
+"""
+import threading
+import time
+from flask import g, session
+from database import get_pool
+from utils import procedures
+from utils.security import get_client_ip
+
+# the seed rows of Step 1, used until the first load succeeds
+DEFAULT_ROLES = {1: 'Admin', 2: 'Customer', 3: 'Manager'}
+
+class RoleCatalog:
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._roles = dict(DEFAULT_ROLES)
+        self._loaded_at = None
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+        self.ttl = app.config.get('ROLE_CATALOG_TTL', self.ttl)
+
+    def _load(self):
+        with get_pool(self._app).acquire() as conn:
+            return {row.RoleID: row.Role_Name for row in procedures.fetch(conn.cursor(), 'sp_GetRoles')}
+
+    def _fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def names(self):
+        if not self._fresh():
+            with self._lock:
+                if not self._fresh():
+                    try:
+                        self._roles = self._load()
+                    except Exception as e:
+                        # keep serving the last known roles, try again after the TTL
+                        print(f"Role catalog not refreshed: {e}")
+                    self._loaded_at = time.monotonic()
+        return self._roles
+
+    def name(self, role_id):
+        return self.names().get(role_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+class ActorContext:
+    """The logged in user performing the current action"""
+    __slots__ = ('user_id', 'user_name', 'role_id', 'role_name', 'ip')
+
+    def __init__(self, user_id, user_name, role_id, role_name, ip):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.role_id = role_id
+        self.role_name = role_name
+        self.ip = ip
+
+roles = RoleCatalog()
+
+def get_actor():
+    """Actor for this request, built on first use and cached in g"""
+    actor = g.get('actor')
+    if actor is None:
+        role_id = session.get('role_id')
+        actor = g.actor = ActorContext(
+            session.get('user_id'),
+            session.get('user_name'),
+            role_id,
+            roles.name(role_id),
+            get_client_ip(),
+        )
+    return actor
+
+def update_actor_role(role_id):
+    """The actor's own role changed (sp_UpdateUserRoleAndStatus on themselves)"""
+    session['role_id'] = role_id
+    g.pop('actor', None)
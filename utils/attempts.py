@@ -0,0 +1,146 @@
+"""
+Failed-login tracking for the brute-force lockout.
+
+A counter per email lives for LOCKOUT_MINUTES from the first failure; the failure
+that reaches MAX_LOGIN_ATTEMPTS restarts the window, so the account stays locked
+for the full LOCKOUT_MINUTES after the last allowed attempt.
+
+Backends:
+  MemoryAttemptStore  per process, TTL + LRU bounded (development, single worker)
+  RedisAttemptStore   shared by every worker/container, one round trip per call
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+class MemoryAttemptStore:
+    def __init__(self, max_entries=10000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock  # benchmarks/attempts_check.py moves time forward without sleeping
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> [count, expires_at]
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._entries[key]
+            entry = None
+        return entry
+
+    def status(self, key):
+        """(failures, seconds until the counter expires)"""
+        now = self.clock()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                return 0, 0
+            return entry[0], math.ceil(entry[1] - now)
+
+    def incr(self, key, ttl, reset_ttl_at):
+        now = self.clock()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                entry = self._entries[key] = [0, now + ttl]
+            entry[0] += 1
+            if entry[0] == reset_ttl_at:
+                entry[1] = now + ttl
+            self._entries.move_to_end(key)
+
+            # bounded: drop the least recently attempted emails first
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry[0], math.ceil(entry[1] - now)
+
+    def clear(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+# INCR, (re)arm the expiry on the first failure and on the one that locks,
+# and read the TTL back, all server side so it is atomic and one round trip
+_INCR_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 or count == tonumber(ARGV[2]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return {count, redis.call('TTL', KEYS[1])}
+"""
+
+_STATUS_SCRIPT = """
+local count = redis.call('GET', KEYS[1])
+if not count then return {0, 0} end
+return {tonumber(count), redis.call('TTL', KEYS[1])}
+"""
+
+class RedisAttemptStore:
+    """Works with any redis-py compatible client (redis.Redis, fakeredis.FakeRedis)"""
+
+    def __init__(self, client, prefix='ironvault:login_attempts:'):
+        self.client = client
+        self.prefix = prefix
+        self._incr = client.register_script(_INCR_SCRIPT)
+        self._status = client.register_script(_STATUS_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url):
+        import redis  # only needed when a redis:// storage URL is configured
+        return cls(redis.Redis.from_url(url, socket_timeout=1))
+
+    def status(self, key):
+        count, ttl = self._status(keys=[self.prefix + key])
+        return int(count), max(int(ttl), 0)
+
+    def incr(self, key, ttl, reset_ttl_at):
+        count, remaining = self._incr(keys=[self.prefix + key], args=[int(ttl), reset_ttl_at])
+        return int(count), max(int(remaining), 0)
+
+    def clear(self, key):
+        self.client.delete(self.prefix + key)
+
+class AttemptTracker:
+    """Lockout policy on top of a store, configured from MAX_LOGIN_ATTEMPTS / LOCKOUT_MINUTES"""
+
+    def __init__(self, store=None, max_attempts=5, lockout_minutes=5):
+        self.store = store or MemoryAttemptStore()
+        self.max_attempts = max_attempts
+        self.lockout_seconds = lockout_minutes * 60
+
+    def init_app(self, app):
+        self.max_attempts = app.config['MAX_LOGIN_ATTEMPTS']
+        self.lockout_seconds = app.config['LOCKOUT_MINUTES'] * 60
+        url = app.config.get('LOGIN_ATTEMPTS_STORAGE_URL', 'memory://')
+        if url.startswith('redis'):
+            self.store = RedisAttemptStore.from_url(url)
+        else:
+            self.store = MemoryAttemptStore(app.config.get('LOGIN_ATTEMPTS_MAX_ENTRIES', 10000))
+
+    @staticmethod
+    def _key(email):
+        return email.strip().lower()
+
+    def locked_for(self, email):
+        """Seconds left on the lockout, 0 when the account may try again"""
+        try:
+            count, ttl = self.store.status(self._key(email))
+        except Exception as e:
+            # the login rate limit still applies, don't lock everyone out because the store is down
+            print(f"Attempt store unavailable, lockout not checked: {e}")
+            return 0
+        return ttl if count >= self.max_attempts else 0
+
+    def record_failure(self, email):
+        """Count a failed password, returns (attempts_left, locked_for_seconds)"""
+        try:
+            count, ttl = self.store.incr(self._key(email), self.lockout_seconds, self.max_attempts)
+        except Exception as e:
+            print(f"Attempt store unavailable, failure not recorded: {e}")
+            return self.max_attempts, 0
+        attempts_left = self.max_attempts - count
+        return attempts_left, (ttl if attempts_left <= 0 else 0)
+
+    def reset(self, email):
+        try:
+            self.store.clear(self._key(email))
+        except Exception as e:
+            print(f"Attempt store unavailable, counter not cleared: {e}")
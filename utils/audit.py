@@ -0,0 +1,139 @@
+"""
+Write-behind queue for app-side audit events (failed logins, lockouts).
+
+record() only appends to an in-memory buffer; a background thread flushes it every
+AUDIT_FLUSH_INTERVAL seconds (or as soon as AUDIT_BATCH_SIZE events are waiting)
+through sp_WriteAuditEvents, one table-valued parameter per batch. The buffer is
+bounded by AUDIT_QUEUE_MAX: when the database is down long enough to fill it, new
+events are dropped and counted instead of growing memory. Whatever is left is
+flushed at shutdown (atexit and gunicorn's worker_exit).
+
+Audit rows of money movements stay inside their procedures' transactions: they must
+commit or roll back with the transfer itself, so they don't go through this queue.
+"""
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from database import get_pool
+from utils import procedures
+from utils.instrumentation import metrics
+
+class AuditQueue:
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=1.0):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = True
+        self._app = None
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self._failing = False
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = app.config.get('AUDIT_QUEUE_ENABLED', True)
+        self.max_size = app.config.get('AUDIT_QUEUE_MAX', self.max_size)
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', self.flush_interval)
+        atexit.register(self.close)
+
+    def record(self, action, status, message, user_id=None, user_name=None, role_name=None, ip=None):
+        """Queue one Application_Audit_Log row, never blocks the request"""
+        if not self.enabled:
+            return
+        event = (
+            user_id,
+            user_name[:255] if user_name else user_name,
+            role_name,
+            action,
+            datetime.now(),
+            ip[:50] if ip else ip,
+            status,
+            message[:255] if message else message,
+        )
+        with self._cond:
+            if len(self._events) >= self.max_size:
+                dropped = True
+            else:
+                dropped = False
+                self._events.append(event)
+                if len(self._events) >= self.batch_size:
+                    self._cond.notify()
+        if dropped:
+            metrics.inc('ironvault_audit_events_dropped_total', {})
+            print(f"Audit queue full, event dropped: {action} {status}")
+            return
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        # started on first use and again after a fork, threads don't survive fork()
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='audit-flush', daemon=True)
+                self._thread.start()
+
+    def _take(self):
+        with self._cond:
+            return [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+
+    def _write(self, batch):
+        with get_pool(self._app).acquire() as conn:
+            cursor = conn.cursor()
+            procedures.execute(cursor, 'sp_WriteAuditEvents', Events=batch)
+            conn.commit()
+
+    def flush(self):
+        """Write everything queued so far, returns the number of events written"""
+        written = 0
+        while True:
+            batch = self._take()
+            if not batch:
+                return written
+            try:
+                self._write(batch)
+            except Exception as e:
+                # put them back in order, the next flush tries again
+                with self._cond:
+                    room = self.max_size - len(self._events)
+                    self._events.extendleft(reversed(batch[:max(room, 0)]))
+                print(f"Audit flush failed, {len(batch)} event(s) kept for retry: {e}")
+                self._failing = True
+                return written
+            self._failing = False
+            written += len(batch)
+            metrics.inc('ironvault_audit_events_written_total', {}, len(batch))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # after a failed flush wait the full interval, don't hammer a database that is down
+                if not self._stopping and (self._failing or len(self._events) < self.batch_size):
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def close(self, timeout=5):
+        """Stop the flusher after one last flush (shutdown)"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread.join(timeout)
+        self._thread = None
+
+    def pending(self):
+        with self._cond:
+            return len(self._events)
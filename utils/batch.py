@@ -0,0 +1,66 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+class BatchTooLarge(Exception):
+    """More rows than TRANSFER_BATCH_MAX_ROWS"""
+
+def parse_amount(value):
+    """Decimal with at most 2 decimal places, None if it isn't a valid positive amount"""
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    if not amount.is_finite() or amount <= 0 or amount.as_tuple().exponent < -2:
+        return None
+    return amount
+
+def _csv_rows(stream):
+    # decode while reading, the upload is never held in memory as a whole
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        # optional header line
+        if reader.line_num == 1 and row[0].strip().lower() in ('receiver_acc', 'receiver', 'account'):
+            continue
+        yield reader.line_num, row[0].strip(), row[1] if len(row) > 1 else ''
+
+def _json_rows(payload):
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of {receiver_acc, amount} objects.")
+    for i, item in enumerate(payload, start=1):
+        if not isinstance(item, dict):
+            yield i, '', None
+            continue
+        yield i, str(item.get('receiver_acc', '')).strip(), item.get('amount')
+
+def parse_transfer_batch(stream=None, payload=None, max_rows=5000):
+    """
+    Rows of a batch upload, from a CSV stream (receiver_acc,amount per line) or a
+    decoded JSON array. Returns (valid, rejected):
+    valid    [(row_no, receiver_acc, Decimal amount), ...]  ready for the TVP
+    rejected [{'row', 'receiver_acc', 'amount', 'status', 'message'}, ...]
+    """
+    rows = _csv_rows(stream) if stream is not None else _json_rows(payload)
+    valid = []
+    rejected = []
+    for count, (row_no, receiver, raw_amount) in enumerate(rows, start=1):
+        if count > max_rows:
+            raise BatchTooLarge(f"A batch can have at most {max_rows} transfers.")
+        amount = parse_amount(raw_amount)
+        if not receiver or len(receiver) > 50:
+            message = "Receiver Account Number is required!" if not receiver else "Invalid account number."
+        elif amount is None:
+            message = "Invalid amount format!"
+        else:
+            valid.append((row_no, receiver, amount))
+            continue
+        rejected.append({
+            'row': row_no,
+            'receiver_acc': receiver,
+            'amount': None if raw_amount is None else str(raw_amount),
+            'status': 'Rejected',
+            'message': message,
+        })
+    return valid, rejected
@@ -0,0 +1,235 @@
+"""
+Read-through cache of the customer dashboard panels (own accounts, latest transactions).
+
+Entries are keyed by (user_id, role_id, panel), the RLS identity the panel was read
+with, so rows read for one identity are never served to another. Each panel is its
+own entry: the dashboard shell and /api/dashboard/transactions hit and miss independently. Freshness comes from
+version counters rather than a short TTL: one per user and one per account number.
+Money movements bump the sender's user version and the receiver's account version,
+admin actions bump the target user's. An entry keeps the versions it was read at
+and is only served while all of them are unchanged.
+
+The versions are read *before* the panels, so a bump racing with the read leaves the
+entry already outdated. That needs the user's account numbers up front: they never
+change after registration, so they are remembered from the first load, which is not
+cached itself.
+
+Tiers:
+  local   per process LRU with a TTL (DASHBOARD_CACHE_TTL, DASHBOARD_CACHE_MAX_ENTRIES)
+  shared  redis, opt-in with DASHBOARD_CACHE_SHARED (entries hold decrypted account
+          numbers). The version counters live in redis whenever DASHBOARD_CACHE_URL
+          is set, so a bump in one worker is seen by all of them.
+"""
+import hashlib
+import hmac
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from utils.instrumentation import metrics
+
+class _LocalEntries:
+    """LRU + TTL, same shape as MemoryAttemptStore"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+class LocalVersions:
+    """Version counters of a single process (development, one worker)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, keys):
+        with self._lock:
+            return [self._versions.get(key, 0) for key in keys]
+
+    def bump(self, keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+class RedisVersions:
+    def __init__(self, client, prefix='ironvault:dashboard:v:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, keys):
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [int(value or 0) for value in values]
+
+    def bump(self, keys):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(self.prefix + key)
+        pipe.execute()
+
+class RedisEntries:
+    """Shared tier; entries are signed with SECRET_KEY so a tampered value is never unpickled"""
+
+    def __init__(self, client, secret, prefix='ironvault:dashboard:e:'):
+        self.client = client
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.prefix = prefix
+
+    def _sign(self, blob):
+        return hmac.new(self.secret, blob, hashlib.sha256).digest()
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        if not data:
+            return None
+        signature, blob = data[:32], data[32:]
+        if not hmac.compare_digest(signature, self._sign(blob)):
+            return None
+        return pickle.loads(blob)
+
+    def set(self, key, value, ttl):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.client.set(self.prefix + key, self._sign(blob) + blob, ex=int(ttl))
+
+def _user_key(user_id):
+    return f'u:{user_id}'
+
+def _account_key(acc_number):
+    return f'a:{acc_number}'
+
+PANELS = ('accounts', 'transactions')
+
+class DashboardCache:
+    def __init__(self, ttl=300, max_entries=10000):
+        self.ttl = ttl
+        self.enabled = True
+        self.local = _LocalEntries(max_entries)
+        self.shared = None
+        self.versions = LocalVersions()
+        self._accounts = _LocalEntries(max_entries)  # user_id -> account numbers
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'errors': 0}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('DASHBOARD_CACHE_ENABLED', True)
+        self.ttl = app.config.get('DASHBOARD_CACHE_TTL', self.ttl)
+        max_entries = app.config.get('DASHBOARD_CACHE_MAX_ENTRIES', 10000)
+        self.local = _LocalEntries(max_entries)
+        self._accounts = _LocalEntries(max_entries)
+        url = app.config.get('DASHBOARD_CACHE_URL')
+        if url and url.startswith('redis'):
+            import redis  # only needed when a redis:// URL is configured
+            client = redis.Redis.from_url(url, socket_timeout=1)
+            self.versions = RedisVersions(client)
+            if app.config.get('DASHBOARD_CACHE_SHARED'):
+                self.shared = RedisEntries(client, app.config['SECRET_KEY'])
+        else:
+            self.versions = LocalVersions()
+
+    def _count(self, result):
+        with self._lock:
+            self._stats[result] += 1
+        metrics.inc('ironvault_dashboard_cache_total', {'result': result})
+
+    def lookup(self, user_id, role_id, panel):
+        """
+        (value, token). value is the cached panel or None on a miss;
+        on a miss, pass token back to store() with what was read from the DB.
+        """
+        if not self.enabled:
+            return None, None
+        key = f'{user_id}:{role_id}:{panel}'
+        try:
+            entry, tier = self.local.get(key), 'local_hits'
+            if entry is None and self.shared is not None:
+                entry, tier = self.shared.get(key), 'shared_hits'
+                if entry is not None:
+                    self.local.set(key, entry, entry.get('ttl', self.ttl))
+
+            accounts = entry['accounts'] if entry is not None else self._accounts.get(user_id)
+            if accounts is None:
+                # first load for this user, the account numbers aren't known yet
+                self._count('misses')
+                return None, None
+
+            keys = [_user_key(user_id)] + [_account_key(acc) for acc in accounts]
+            versions = dict(zip(keys, self.versions.get(keys)))
+        except Exception as e:
+            # a cache outage only costs the DB reads it would have saved
+            print(f"Dashboard cache unavailable: {e}")
+            self._count('errors')
+            return None, None
+
+        if entry is not None and entry['versions'] == versions:
+            self._count(tier)
+            return entry['value'], None
+        self._count('misses')
+        return None, {'accounts': accounts, 'versions': versions}
+
+    def store(self, user_id, role_id, panel, value, accounts, token, ttl=None):
+        """
+        Cache a panel read after lookup() returned token, accounts = the user's account numbers.
+        ttl shortens the entry's life below DASHBOARD_CACHE_TTL.
+        """
+        if not self.enabled:
+            return
+        accounts = tuple(sorted(accounts))
+        self._accounts.set(user_id, accounts, self.ttl)
+        if token is None or tuple(token['accounts']) != accounts:
+            # versions were taken for other accounts, can't vouch for this read
+            return
+
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        entry = {'value': value, 'accounts': accounts, 'versions': token['versions'], 'ttl': ttl}
+        key = f'{user_id}:{role_id}:{panel}'
+        self.local.set(key, entry, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry, ttl)
+            except Exception as e:
+                print(f"Dashboard cache unavailable, entry kept locally: {e}")
+
+    def bump(self, user_ids=(), accounts=()):
+        """Invalidate every cached dashboard showing these users or account numbers"""
+        keys = [_user_key(u) for u in user_ids if u is not None] + [_account_key(a) for a in accounts if a]
+        if not keys:
+            return
+        try:
+            self.versions.bump(keys)
+        except Exception as e:
+            # can't invalidate the shared view: drop what this process holds, the TTL covers the rest
+            print(f"Dashboard cache version not bumped: {e}")
+            for user_id in user_ids:
+                for role_id in (1, 2, 3):
+                    for panel in PANELS:
+                        self.local.delete(f'{user_id}:{role_id}:{panel}')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses'] + stats['errors']
+        stats['hit_ratio'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0.0
+        return stats
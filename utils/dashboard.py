@@ -0,0 +1,29 @@
+"""
+Loading of one lazily fetched dashboard panel.
+
+Every panel other than the balances is its own request (/api/dashboard/<panel>),
+so the browser overlaps them and each one runs on its request's read connection:
+the read replica when one is configured (see database.read_target), the primary
+otherwise, with the RLS session context of the caller as on any other read.
+
+The panel's query runs with DASHBOARD_QUERY_TIMEOUT as the driver's query timeout,
+so the server cancels a slow one instead of the request thread waiting behind it.
+A panel that raises or runs past the timeout is reported as unavailable.
+"""
+from flask import current_app
+from database import get_read_connection
+
+def load_panel(name, loader):
+    """(value, unavailable) of loader(cursor): unavailable is [name] and value None if it failed"""
+    try:
+        conn = get_read_connection()
+        previous = conn.timeout
+        conn.timeout = current_app.config['DASHBOARD_QUERY_TIMEOUT']
+        try:
+            return loader(conn.cursor()), []
+        finally:
+            # the connection serves the rest of the request and goes back to the pool
+            conn.timeout = previous
+    except Exception as e:
+        print(f"Dashboard panel '{name}' unavailable: {e}")
+        return None, [name]
@@ -0,0 +1,87 @@
+"""
+Streaming CSV exports.
+
+Rows are read from an executed cursor with fetchmany() and written out batch by
+batch, so memory stays flat however many rows there are, and the client gets the
+header as soon as the query starts returning.
+"""
+import csv
+from datetime import date, datetime
+from decimal import Decimal
+
+# a cell starting with one of these is run as a formula by spreadsheet apps
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def csv_safe(value):
+    """Cell value for an export: ISO dates, exact decimals, no formula injection"""
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+class _LineBuffer:
+    """File-like target for csv.writer, handed out and emptied once per batch"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, text):
+        self._parts.append(text)
+
+    def take(self):
+        text = ''.join(self._parts)
+        self._parts = []
+        return text
+
+def stream_csv(cursor, batch_size=1000, columns=None, row_values=None, first_rows=(), last_rows=None):
+    """
+    Generator of CSV text chunks: the header, then one chunk per fetchmany() batch.
+    columns defaults to the cursor's; row_values(row) may reshape each row first.
+    first_rows go right after the header, last_rows() is called once the cursor is done.
+    """
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(columns or [column[0] for column in cursor.description])
+    for row in first_rows:
+        writer.writerow([csv_safe(value) for value in row])
+    yield buffer.take()
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            writer.writerow([csv_safe(value) for value in (row_values(row) if row_values else row)])
+        yield buffer.take()
+
+    if last_rows is not None:
+        for row in last_rows():
+            writer.writerow([csv_safe(value) for value in row])
+        yield buffer.take()
+
+STATEMENT_COLUMNS = ('Date', 'Type', 'Description', 'Direction', 'Counterparty Account', 'Counterparty', 'Amount', 'Balance')
+
+def stream_statement(cursor, opening_balance, batch_size=1000):
+    """
+    Statement CSV from the transactions of sp_GetStatementByUser, with a running balance.
+    Opening and closing balance rows frame the transactions.
+    """
+    balance = Decimal(opening_balance) if opening_balance is not None else Decimal('0.00')
+
+    def row_values(row):
+        nonlocal balance
+        amount = row.Amount if row.Transaction_Direction == 'Credit' else -row.Amount
+        balance += amount
+        return (row.Transaction_Date, row.Transaction_Type, row.Description, row.Transaction_Direction,
+                row.Counterparty_Account, row.Counterparty_Name, amount, balance)
+
+    yield from stream_csv(
+        cursor, batch_size, STATEMENT_COLUMNS, row_values,
+        first_rows=[(None, None, 'Opening balance', None, None, None, None, balance)],
+        last_rows=lambda: [(None, None, 'Closing balance', None, None, None, None, balance)],
+    )
@@ -0,0 +1,233 @@
+"""
+Query instrumentation: per-request DB timings and process-wide histograms.
+
+Every cursor handed out by database.get_db_connection is an InstrumentedCursor.
+Each execute() appends a QueryRecord to g.db_queries (name, duration, rows, bytes);
+fetches add their time and sizes to the same record. middleware turns the records
+into a Server-Timing header, the slow-query log and the /metrics histograms.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from flask import g, has_app_context
+
+slow_query_log = logging.getLogger('ironvault.slow_queries')
+
+_STATEMENT_RE = re.compile(r'^\s*(?:EXEC(?:UTE)?\s+(?:\w+\.)?(\w+)|(\w+))', re.IGNORECASE)
+
+# seconds, SQL Server round trips are usually single digit ms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def statement_name(sql):
+    """'EXEC dbo.sp_GetAccountsByUser @UserID = ?' -> 'sp_GetAccountsByUser', plain SQL -> 'SELECT'"""
+    match = _STATEMENT_RE.match(sql)
+    if not match:
+        return 'unknown'
+    return match.group(1) or match.group(2).upper()
+
+def _row_bytes(row):
+    # rough wire size, good enough to spot a procedure returning far too much
+    size = 0
+    for value in row:
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value)
+        else:
+            size += 8
+    return size
+
+class QueryRecord:
+    __slots__ = ('name', 'duration', 'rows', 'bytes')
+
+    def __init__(self, name, duration):
+        self.name = name
+        self.duration = duration
+        self.rows = 0
+        self.bytes = 0
+
+    def as_dict(self):
+        return {'name': self.name, 'ms': round(self.duration * 1000, 2), 'rows': self.rows, 'bytes': self.bytes}
+
+def record_query(name, duration):
+    """Add a round trip to the current request, returns the record (None outside a request)"""
+    if not has_app_context():
+        return None
+    record = QueryRecord(name, duration)
+    queries = g.get('db_queries')
+    if queries is None:
+        queries = g.db_queries = []
+    queries.append(record)
+    return record
+
+class InstrumentedCursor:
+    """Thin wrapper over a DB-API cursor that times execute and the fetches after it"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._record = None
+
+    def execute(self, sql, *params):
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql, *params)
+        finally:
+            self._record = record_query(statement_name(sql), time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, seq_of_params)
+        finally:
+            self._record = record_query(statement_name(sql), time.perf_counter() - started)
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        result = fetch(*args)
+        record = self._record
+        if record is not None:
+            record.duration += time.perf_counter() - started
+            if isinstance(result, list):
+                record.rows += len(result)
+                record.bytes += sum(_row_bytes(row) for row in result)
+            elif result is not None:
+                record.rows += 1
+                record.bytes += _row_bytes(result)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed_fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed_fetch(self._cursor.fetchall)
+
+    def nextset(self):
+        started = time.perf_counter()
+        result = self._cursor.nextset()
+        if self._record is not None:
+            self._record.duration += time.perf_counter() - started
+        return result
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        # description, rowcount, close, fast_executemany, ...
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+class Histogram:
+    """Cumulative Prometheus-style histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+class MetricsRegistry:
+    """Per-process metrics; with several workers each one exposes its own"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (metric, label tuple) -> Histogram
+        self._counters = {}
+
+    def observe(self, metric, labels, value):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, metric, labels, amount=1):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self, gauges=None):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+            seen = set()
+            for (metric, labels), h in histograms:
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f'# TYPE {metric} histogram')
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f'{metric}_bucket{_labels(labels, le=repr(bound))} {count}')
+                lines.append(f'{metric}_bucket{_labels(labels, le="+Inf")} {h.count}')
+                lines.append(f'{metric}_sum{_labels(labels)} {h.sum:.6f}')
+                lines.append(f'{metric}_count{_labels(labels)} {h.count}')
+
+            for (metric, labels), value in counters:
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f'# TYPE {metric} counter')
+                lines.append(f'{metric}{_labels(labels)} {value}')
+
+        for metric, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+metrics = MetricsRegistry()
+
+def finish_request(route, status, duration, slow_query_ms):
+    """Feed the request's records into the histograms and the slow-query log, returns them"""
+    queries = g.pop('db_queries', None) or []
+
+    metrics.observe('ironvault_http_request_duration_seconds', {'route': route}, duration)
+    metrics.inc('ironvault_http_requests_total', {'route': route, 'status': str(status)})
+    for q in queries:
+        metrics.observe('ironvault_db_query_duration_seconds', {'procedure': q.name}, q.duration)
+        metrics.inc('ironvault_db_rows_fetched_total', {'procedure': q.name}, q.rows)
+        metrics.inc('ironvault_db_bytes_fetched_total', {'procedure': q.name}, q.bytes)
+        if slow_query_ms is not None and q.duration * 1000 >= slow_query_ms:
+            slow_query_log.warning(json.dumps(dict(q.as_dict(), at=datetime.now().isoformat(), route=route, threshold_ms=slow_query_ms)))
+    return queries
+
+def server_timing(queries, total):
+    """Server-Timing header value: app total, db total, then one entry per procedure"""
+    per_name = {}
+    for q in queries:
+        per_name[q.name] = per_name.get(q.name, 0.0) + q.duration
+    db_total = sum(per_name.values())
+    parts = [
+        f'app;dur={total * 1000:.1f}',
+        f'db;dur={db_total * 1000:.1f};desc="{len(queries)} round trips"',
+    ]
+    parts.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in per_name.items())
+    return ', '.join(parts)
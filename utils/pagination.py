@@ -0,0 +1,24 @@
+from datetime import datetime
+
+CURSOR_DATE_FORMAT = '%Y%m%dT%H%M%S.%f'
+
+def encode_cursor(row_date, row_id):
+    """Turn the (date, id) of the last row on a page into an opaque 'before' token"""
+    return f"{row_date.strftime(CURSOR_DATE_FORMAT)}_{row_id}"
+
+def decode_cursor(token):
+    """
+    Parse a 'before' token back into (date, id).
+    Returns (None, None) for an empty token, raises ValueError if it was tampered with.
+    """
+    if not token:
+        return None, None
+    date_part, _, id_part = token.partition('_')
+    return datetime.strptime(date_part, CURSOR_DATE_FORMAT), int(id_part)
+
+def clamp_page_size(value, default, maximum):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
@@ -0,0 +1,130 @@
+"""
+Password hashing: scrypt with its cost stored in the hash, run on a bounded worker pool.
+
+User_PasswordHash holds either format, User_Salt keeps the per-user salt for both:
+  <64 hex chars>                       legacy, SHA-256 over password + salt
+  $scrypt$ln=15,r=8,p=1$<64 hex chars>  scrypt, N = 2**ln, parameters of that hash
+
+A login against a legacy hash, or a scrypt hash with other parameters than the
+configured ones, rehashes the password (routes/auth.py), so the whole table moves to
+the current cost as people log in, and again whenever the cost is raised.
+
+scrypt is slow and memory-hard on purpose (ln=15, r=8 is 32 MiB and ~100 ms per
+hash), so it doesn't run on the request threads: PasswordHasher hands it to
+PASSWORD_WORKERS threads (hashlib releases the GIL while hashing) and refuses new
+work once PASSWORD_QUEUE_MAX hashes are queued or running. Each of those has a request
+thread waiting on it, so the bound is the request thread count less a reserve
+(PASSWORD_QUEUE_RESERVE): a login spike gets fast "try again" answers while the
+reserve still serves every other page, instead of every worker thread of the app
+stuck waiting on a hash. The login holds no database connection while it waits.
+Pick the cost with benchmarks/password_kdf.py on the deployment hardware.
+"""
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from utils.instrumentation import metrics
+
+_SCRYPT_RE = re.compile(r'^\$scrypt\$ln=(\d+),r=(\d+),p=(\d+)\$([0-9a-f]{64})$')
+
+class PasswordBusy(Exception):
+    """Too many hashes queued, the caller should answer 'try again' (503)"""
+
+def legacy_hash(password, salt):
+    """SHA-256 over password + salt, the format before scrypt. Only verified, never written"""
+    return hashlib.sha256((password + salt).encode()).hexdigest()
+
+def scrypt_hash(password, salt, ln, r, p):
+    n = 2 ** ln
+    # OpenSSL refuses anything above maxmem (32 MiB by default), allow what these parameters need
+    digest = hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                            maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=32)
+    return f'$scrypt$ln={ln},r={r},p={p}${digest.hex()}'
+
+def parse(stored):
+    """('scrypt', (ln, r, p)) or ('sha256', None)"""
+    match = _SCRYPT_RE.match(stored or '')
+    if match:
+        return 'scrypt', tuple(int(value) for value in match.groups()[:3])
+    return 'sha256', None
+
+def check(password, salt, stored):
+    """Does the password match the stored hash, whichever format it is in"""
+    scheme, params = parse(stored)
+    computed = scrypt_hash(password, salt, *params) if scheme == 'scrypt' else legacy_hash(password, salt)
+    # SECURITY: constant time, how much of the hash matched must not show in the response time
+    return hmac.compare_digest(computed.encode(), (stored or '').encode())
+
+class PasswordHasher:
+    def __init__(self, ln=15, r=8, p=1, workers=2, queue_max=2, timeout=10):
+        self.params = (ln, r, p)
+        self.workers = workers
+        self.queue_max = queue_max
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._executor = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.params = (app.config['PASSWORD_SCRYPT_LN'], app.config['PASSWORD_SCRYPT_R'], app.config['PASSWORD_SCRYPT_P'])
+        self.workers = app.config['PASSWORD_WORKERS']
+        self.queue_max = app.config['PASSWORD_QUEUE_MAX']
+        self.timeout = app.config['PASSWORD_TIMEOUT']
+
+    def _pool(self):
+        # created on first use and again after a fork, the workers' threads don't survive fork()
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._depth = 0
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password')
+        return self._executor
+
+    def _run(self, operation, fn, *args):
+        pool = self._pool()
+        with self._lock:
+            if self._depth >= self.queue_max:
+                metrics.inc('ironvault_password_rejected_total', {'operation': operation})
+                raise PasswordBusy(f'{self._depth} password hashes already queued')
+            self._depth += 1
+        started = time.perf_counter()
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        try:
+            result = future.result(self.timeout)
+        except FutureTimeout:
+            # it keeps its slot until it finishes, so the queue bound stays honest
+            metrics.inc('ironvault_password_rejected_total', {'operation': operation})
+            raise PasswordBusy(f'password {operation} took over {self.timeout}s')
+        metrics.observe('ironvault_password_seconds', {'operation': operation}, time.perf_counter() - started)
+        return result
+
+    def _done(self, _future):
+        with self._lock:
+            self._depth -= 1
+
+    def depth(self):
+        with self._lock:
+            return self._depth
+
+    def hash(self, password, salt):
+        """New hash in the current format, raises PasswordBusy"""
+        return self._run('hash', scrypt_hash, password, salt, *self.params)
+
+    def verify(self, password, salt, stored):
+        """Check the password on the pool, raises PasswordBusy"""
+        return self._run('verify', check, password, salt, stored)
+
+    def needs_rehash(self, stored):
+        """Legacy or outdated cost, worth rewriting after a successful login"""
+        scheme, params = parse(stored)
+        return scheme != 'scrypt' or params != self.params
@@ -0,0 +1,203 @@
+"""
+The stored procedures the app calls, and typed rows for what they return.
+
+Each procedure is declared once with the parameters the app passes (its EXEC
+statement is built from them once) and the columns of each result set:
+
+    rows = procedures.fetch(cursor, 'sp_GetAccountsByUser', UserID=user_id)
+    rows[0].Acc_Balance, rows[0]['Acc_Balance']
+
+Rows are instances of a row class made once per result shape and reused by
+every request: a tuple subclass with the columns as attributes (namedtuple's
+C-level getters), which also reads like the dicts it replaces (row['col'],
+row.get, row.keys, row.items), so json_safe, the templates and the pickled
+dashboard cache work unchanged. Per row that is one tuple, where
+dict(zip(columns, row)) built a dict and a zip and re-read cursor.description
+on every call. Results are read with fetchmany(FETCH_BATCH).
+
+A result whose columns differ from the declared ones (the procedure changed on
+the server before the registry did) still works, with a row class for the actual
+columns and a warning, once per procedure and shape.
+"""
+import threading
+from collections import namedtuple
+from functools import partial
+
+FETCH_BATCH = 500   # rows per fetchmany()
+
+class Row(tuple):
+    """Base of the row classes: attribute, index and column name access, read only"""
+    __slots__ = ()
+    _columns = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if type(key) is str:
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self):
+        return self._columns
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return zip(self._columns, self)
+
+    def _asdict(self):
+        return dict(zip(self._columns, self))
+
+    def __reduce__(self):
+        # by shape, not by class: the classes are made at runtime, each process has its own
+        return _restore_row, (self._columns, tuple(self))
+
+_row_classes = {}
+_row_classes_lock = threading.Lock()
+
+def row_class(columns):
+    """The row class for a result shape (tuple of column names), made on first use"""
+    cls = _row_classes.get(columns)
+    if cls is None:
+        with _row_classes_lock:
+            cls = _row_classes.get(columns)
+            if cls is None:
+                # rename: columns that aren't identifiers ('' for SELECT 1) keep index and key access
+                fields = namedtuple('Row', columns, rename=True)
+                cls = type('Row', (Row, fields), {
+                    '__slots__': (),
+                    '_columns': columns,
+                    '_index': {column: i for i, column in enumerate(columns)},
+                })
+                cls.from_row = partial(tuple.__new__, cls)  # C-level, no per-row Python frame
+                _row_classes[columns] = cls
+    return cls
+
+def _restore_row(columns, values):
+    return row_class(columns).from_row(values)
+
+class Procedure:
+    def __init__(self, name, params=(), results=()):
+        self.name = name
+        self.params = tuple(params)
+        self.results = tuple(tuple(columns) for columns in results)
+        self.sql = (f"EXEC dbo.{name} " + ", ".join(f"@{param} = ?" for param in self.params)).rstrip()
+        self._warned = set()
+        for columns in self.results:
+            row_class(columns)
+
+    def args(self, values):
+        """Parameter values in declaration order, from the keyword arguments of a call"""
+        missing = [param for param in self.params if param not in values]
+        unknown = [key for key in values if key not in self.params]
+        if missing or unknown:
+            raise TypeError(f"{self.name}: missing {missing}, unknown {unknown}")
+        return tuple(values[param] for param in self.params)
+
+    def columns(self, cursor, result=0):
+        """Column names of the cursor's current result set, checked against the declared ones"""
+        columns = tuple(column[0] for column in cursor.description)
+        declared = self.results[result] if result < len(self.results) else None
+        if columns != declared and (result, columns) not in self._warned:
+            self._warned.add((result, columns))
+            print(f"{self.name} result {result} returned columns {columns}, registry declares {declared}")
+        return columns
+
+_TRANSACTION = ('TransactionID', 'Transaction_Date', 'Transaction_Type', 'Amount', 'Description',
+                'SenderAccountID', 'ReceiverAccountID', 'SenderAccount', 'ReceiverAccount',
+                'SenderName', 'ReceiverName', 'Transaction_Direction')
+_AUDIT_LOG = ('LogID', 'UserID', 'User_Name', 'Role_Name', 'Action_Type', 'Status', 'Message', 'Action_Date', 'IP_Address')
+_ACTOR = ('ActorIP', 'ActorUserName', 'ActorRoleName')
+
+PROCEDURES = {procedure.name: procedure for procedure in (
+    # sign in / sign up
+    Procedure('sp_GetUserByEmail', ('Email',),
+              [('UserID', 'User_Name', 'User_PasswordHash', 'User_Salt', 'RoleID')]),
+    Procedure('sp_GetUserById', ('UserID',),
+              [('UserID', 'User_Name', 'Role_Name', 'RoleID')]),
+    Procedure('sp_CreateAccount', ('UserName', 'Email', 'PasswordHash', 'Salt', 'RoleID'), [('UserID',)]),
+    Procedure('sp_UserLogin', ('UserID', 'IP_Address')),
+    Procedure('sp_UpdatePasswordHash', ('UserID', 'PasswordHash')),
+    Procedure('sp_GetRoles', (), [('RoleID', 'Role_Name')]),
+
+    # customer reads
+    Procedure('sp_GetAccountsByUser', ('UserID',),
+              [('AccountID', 'UserID', 'User_Name', 'Acc_Number', 'Acc_Balance')]),
+    Procedure('sp_GetTransactionsByUserPage', ('UserID', 'PageSize', 'CursorDate', 'CursorID'), [_TRANSACTION]),
+    Procedure('sp_GetStatementByUser', ('UserID', 'From', 'To'), [
+        ('Acc_Number', 'Opening_Balance'),
+        ('TransactionID', 'Transaction_Date', 'Transaction_Type', 'Description', 'Transaction_Direction',
+         'Counterparty_Account', 'Counterparty_Name', 'Amount'),
+    ]),
+
+    # money movement
+    Procedure('sp_Deposit', ('UserID', 'Amount') + _ACTOR),
+    Procedure('sp_TransferFunds', ('SenderUserID', 'ReceiverAccNumber', 'Amount') + _ACTOR),
+    Procedure('sp_TransferFundsBatch', ('SenderUserID', 'Transfers') + _ACTOR,
+              [('RowNo', 'ReceiverAccNumber', 'Amount', 'Status', 'Message')]),
+
+    # admin / manager
+    Procedure('sp_GetAuditLogs', ('Top',), [_AUDIT_LOG]),
+    Procedure('sp_SearchAuditLogs', ('From', 'To', 'ActionType', 'Status', 'UserID', 'PageSize', 'CursorDate', 'CursorID'),
+              [_AUDIT_LOG]),
+    Procedure('sp_WriteAuditEvents', ('Events',)),
+    Procedure('sp_GetAllUsers', ('PageNumber', 'PageSize', 'Search', 'SortBy', 'SortDir'),
+              [('UserID', 'User_Name', 'User_Email', 'Role_Name', 'RoleID', 'Status', 'TotalCount')]),
+    Procedure('sp_GetAllCustomerAccounts', ('PageNumber', 'PageSize', 'Search', 'SortBy', 'SortDir'),
+              [('UserID', 'User_Name', 'User_Email', 'Acc_Number', 'Acc_Balance', 'TotalCount')]),
+    Procedure('sp_GetAccountActivitySummary', ('Days', 'Top'), [
+        ('Accounts', 'Total_Balance', 'Active_Accounts', 'Dormant_Accounts', 'Deposit_Count', 'Deposit_Amount',
+         'Transfer_Count', 'Transfer_Amount', 'Since'),
+        ('Activity_Date', 'Deposit_Count', 'Deposit_Amount', 'Transfer_Count', 'Transfer_Amount', 'Active_Accounts'),
+        ('UserID', 'User_Name', 'Acc_Balance', 'Transaction_Count', 'Volume'),
+    ]),
+    Procedure('sp_DeleteUser', ('UserID', 'ActorUserID', 'ActorUserName', 'ActorRoleName', 'ActorIP')),
+    Procedure('sp_UpdateUserRoleAndStatus',
+              ('TargetUserID', 'NewRoleID', 'NewStatus', 'ActorUserID', 'ActorUserName', 'ActorRoleName', 'ActorIP')),
+)}
+
+def execute(cursor, name, **params):
+    """EXEC a registered procedure, returns it (for fetch_rows / fetch_one on its results)"""
+    procedure = PROCEDURES[name]
+    cursor.execute(procedure.sql, procedure.args(params))
+    return procedure
+
+def fetch_rows(cursor, procedure, result=0, batch_size=FETCH_BATCH):
+    """Every row of the cursor's current result set, as rows of its shape"""
+    from_row = row_class(procedure.columns(cursor, result)).from_row
+    rows = []
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        rows.extend(map(from_row, batch))
+        if len(batch) < batch_size:
+            return rows
+
+def fetch_one(cursor, procedure, result=0):
+    """The first row of the current result set, or None"""
+    row = cursor.fetchone()
+    return None if row is None else row_class(procedure.columns(cursor, result)).from_row(row)
+
+def fetch(cursor, name, **params):
+    """execute() + fetch_rows() of the first result set"""
+    return fetch_rows(cursor, execute(cursor, name, **params))
+
+def fetch_first(cursor, name, **params):
+    """execute() + fetch_one(), e.g. a lookup by key"""
+    return fetch_one(cursor, execute(cursor, name, **params))
+
+def fetch_all_results(cursor, name, **params):
+    """execute() and read each declared result set in turn, a list of row lists"""
+    procedure = execute(cursor, name, **params)
+    results = []
+    for result in range(len(procedure.results)):
+        if result and not cursor.nextset():
+            break
+        results.append(fetch_rows(cursor, procedure, result))
+    return results
@@ -0,0 +1,182 @@
+"""
+Rate limiting: the limiter's key and a hybrid local/redis storage for Flask-Limiter.
+
+Requests are keyed by user id once logged in, so users behind one NAT'ed branch
+office don't share a budget, and by remote address before that (login, register).
+
+Storage, from RATELIMIT_STORAGE_URI:
+  memory://             per process, N workers allow N times the limit
+  redis://host:port     exact and shared, one round trip per limit per request
+  hybrid+redis://...    counts locally and reconciles with redis in the background:
+                        no round trip on the request path, the global count is seen
+                        with a delay of at most sync_interval (RATELIMIT_STORAGE_OPTIONS)
+
+With the hybrid storage every worker adds the hits it admitted since its last sync
+to the shared counter (INCRBY) and reads back the total of all workers. A key can
+therefore overshoot by what the other workers admit within one sync interval, which
+is the price for keeping redis off the request path. If redis is down each worker
+keeps enforcing the limit on its own counts and pushes them once it is back.
+"""
+import threading
+import os
+import time
+from collections import OrderedDict
+from flask import session
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+def rate_limit_key():
+    """user:<id> when logged in, ip:<remote address> otherwise"""
+    user_id = session.get('user_id')
+    if user_id is not None:
+        return f'user:{user_id}'
+    # SECURITY: not X-Forwarded-For, a client could rotate it to get a fresh budget per request
+    return f'ip:{get_remote_address()}'
+
+# add a worker's unsynced hits, arm the window on the first hit and read back
+# count + remaining window per key, one round trip for up to `chunk` keys
+_SYNC_SCRIPT = """
+local result = {}
+for i, key in ipairs(KEYS) do
+    local delta = tonumber(ARGV[2 * i - 1])
+    local count = redis.call('INCRBY', key, delta)
+    if count == delta then
+        redis.call('EXPIRE', key, ARGV[2 * i])
+    end
+    result[i] = {count, redis.call('PTTL', key)}
+end
+return result
+"""
+
+class _Window:
+    __slots__ = ('synced', 'pending', 'expiry', 'expires_at')
+
+    def __init__(self, expiry, now):
+        self.synced = 0      # every worker's hits, as of the last sync
+        self.pending = 0     # this worker's hits since then
+        self.expiry = expiry
+        self.expires_at = now + expiry
+
+class HybridRedisStorage(Storage):
+    """Fixed-window counters kept per process and merged into redis every sync_interval"""
+
+    STORAGE_SCHEME = ['hybrid+redis', 'hybrid+rediss']
+
+    def __init__(self, uri, wrap_exceptions=False, sync_interval=0.25, max_entries=100000,
+                 prefix='ironvault:ratelimit:', **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        import redis  # only needed when a hybrid+redis:// storage URI is configured
+        self.client = redis.Redis.from_url(uri.replace('hybrid+', '', 1), socket_timeout=1, **options)
+        self._sync_script = self.client.register_script(_SYNC_SCRIPT)
+        self.sync_interval = sync_interval
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self._windows = OrderedDict()  # key -> _Window
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._failing = False
+
+    @property
+    def base_exceptions(self):
+        import redis
+        return redis.RedisError
+
+    def _live(self, key, now):
+        window = self._windows.get(key)
+        if window is not None and window.expires_at <= now:
+            del self._windows[key]
+            window = None
+        return window
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self._cond:
+            window = self._live(key, now)
+            if window is None:
+                window = self._windows[key] = _Window(expiry, now)
+            window.pending += amount
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_entries:
+                self._windows.popitem(last=False)
+            count = window.synced + window.pending
+        self._ensure_thread()
+        return count
+
+    def get(self, key):
+        with self._cond:
+            window = self._live(key, time.time())
+            return window.synced + window.pending if window is not None else 0
+
+    def get_expiry(self, key):
+        with self._cond:
+            window = self._live(key, time.time())
+            return window.expires_at if window is not None else time.time()
+
+    def check(self):
+        try:
+            return self.client.ping()
+        except Exception:
+            return False
+
+    def clear(self, key):
+        with self._cond:
+            self._windows.pop(key, None)
+        self.client.delete(self.prefix + key)
+
+    def reset(self):
+        with self._cond:
+            self._windows.clear()
+        keys = list(self.client.scan_iter(match=self.prefix + '*', count=1000))
+        if keys:
+            self.client.delete(*keys)
+        return len(keys)
+
+    def _ensure_thread(self):
+        # started on first use and again after a fork, threads don't survive fork()
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='ratelimit-sync', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.sync_interval)
+            self.sync()
+
+    def sync(self, chunk=500):
+        """Push this worker's pending hits and pull everyone's totals, returns the keys synced"""
+        now = time.time()
+        with self._cond:
+            for key in [k for k, w in self._windows.items() if w.expires_at <= now]:
+                del self._windows[key]
+            # only keys hit since the last sync: an idle key's count only matters on its next hit,
+            # which costs at most one sync interval of staleness
+            batch = [(key, window, window.pending) for key, window in self._windows.items() if window.pending]
+
+        for start in range(0, len(batch), chunk):
+            part = batch[start:start + chunk]
+            args = []
+            for _, window, delta in part:
+                args += [delta, window.expiry]
+            try:
+                results = self._sync_script(keys=[self.prefix + key for key, _, _ in part], args=args)
+            except Exception as e:
+                # keep counting locally, the pending hits go out with the next sync
+                if not self._failing:
+                    print(f"Rate limit storage unreachable, limits are per worker until it is back: {e}")
+                self._failing = True
+                return 0
+            now = time.time()
+            with self._cond:
+                for (_, window, delta), (count, ttl) in zip(part, results):
+                    window.pending -= delta
+                    window.synced = int(count)
+                    if int(ttl) > 0:
+                        # redis owns the window, so every worker resets it at the same time
+                        window.expires_at = now + int(ttl) / 1000
+        self._failing = False
+        return len(batch)
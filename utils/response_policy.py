@@ -0,0 +1,155 @@
+"""
+Caching and compression of responses, applied by middleware.configure_security_headers.
+
+Caching:
+  HTML/JSON   no-store, every page shows balances or personal data
+  /static     with ?v=<content hash> (asset_url) public + immutable for STATIC_MAX_AGE;
+              without it, or with an outdated hash, no-cache: revalidated with the ETag
+
+Compression: text responses of at least COMPRESS_MIN_SIZE bytes are sent as brotli
+or gzip, whichever the client accepts (brotli is optional, gzip otherwise). Streamed
+responses (the CSV exports) pass through untouched. Static files are compressed once
+per ETag and kept in memory.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from flask import current_app, request, url_for
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE = frozenset({
+    'text/html', 'text/css', 'text/plain', 'text/csv',
+    'application/json', 'application/javascript', 'image/svg+xml',
+})
+
+_versions = {}  # static filename -> (mtime, content hash)
+_versions_lock = threading.Lock()
+
+def asset_version(filename):
+    """Short content hash of a file under /static, None when it doesn't exist"""
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _versions.get(filename)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    with _versions_lock:
+        _versions[filename] = (mtime, digest)
+    return digest
+
+def asset_url(filename):
+    """Versioned /static URL for templates, changes whenever the file does; None if missing"""
+    version = asset_version(filename)
+    if version is None:
+        return None
+    return url_for('static', filename=filename, v=version)
+
+def apply_cache_policy(response):
+    if request.endpoint == 'static':
+        filename = (request.view_args or {}).get('filename')
+        if filename and request.args.get('v') and request.args.get('v') == asset_version(filename):
+            response.headers['Cache-Control'] = f"public, max-age={current_app.config['STATIC_MAX_AGE']}, immutable"
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        response.headers.pop('Expires', None)
+        return response
+
+    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    response.headers['Pragma'] = 'no-cache'
+    response.headers['Expires'] = '0'
+    return response
+
+class _StaticCompressed:
+    """Compressed bodies of static files keyed by (filename, etag, encoding), LRU bounded"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, build):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        body = build()
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+_static_compressed = _StaticCompressed()
+
+def _encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        # quality 5 is the usual sweet spot for responses compressed on the fly
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=level)
+
+def compress_response(response):
+    """
+    Compress the body in place when it's worth it.
+    SECURITY: pages carry Flask-WTF CSRF tokens, which are re-signed with a new timestamp
+    every second, so they can't be recovered through compressed sizes (BREACH).
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.mimetype not in COMPRESSIBLE
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    static = request.endpoint == 'static'
+    if response.is_streamed and not static:
+        # generators (CSV exports) go out as they are produced
+        return response
+
+    encoding = _encoding()
+    if encoding is None:
+        return response
+
+    min_size = current_app.config['COMPRESS_MIN_SIZE']
+    level = current_app.config['COMPRESS_LEVEL']
+    if static:
+        if response.content_length is not None and response.content_length < min_size:
+            return response
+        etag, _ = response.get_etag()
+        response.direct_passthrough = False
+        # the file wrapper isn't read on a cache hit, close it with the response
+        close = getattr(response.response, 'close', None)
+        if close is not None:
+            response.call_on_close(close)
+        body = _static_compressed.get((request.view_args.get('filename'), etag, encoding),
+                                      lambda: _compress(response.get_data(), encoding, level))
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        body = _compress(data, encoding, level)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, _ = response.get_etag()
+    if etag:
+        # same content, different bytes: still matches If-None-Match, which compares weakly
+        response.set_etag(etag, weak=True)
+    return response
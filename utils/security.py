@@ -1,14 +1,9 @@
-from flask import request
+from flask import request, current_app
 import hashlib
+import hmac
 import os
 
-def hash_password(password, salt):
-    """
-    Combines Password + Salt and then Hashes it.
-    This creates the 'Unique Smoothie'.
-    """
-    salted_password = password + salt
-    return hashlib.sha256(salted_password.encode()).hexdigest() # use standard SHA256
+# password hashing itself lives in utils/passwords.py
 
 def generate_salt():
     """Generates a random 16-character string (The 'Spice')"""
@@ -22,4 +17,10 @@ def get_client_ip():
         ip = request.headers.get('X-Real-IP')
     else:
         ip = request.remote_addr
-    return ip
\ No newline at end of file
+    return ip
+
+def email_fingerprint(email):
+    """Keyed hash of a typed email for the audit log: attempts on one address still line up, the address itself isn't stored"""
+    key = current_app.config['SECRET_KEY'].encode()
+    digest = hmac.new(key, email.strip().lower().encode(), hashlib.sha256).hexdigest()
+    return f'email#{digest[:16]}'
@@ -0,0 +1,13 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+def json_safe(row):
+    """Make a result row JSON friendly: ISO dates and exact decimal strings"""
+    safe = {}
+    for key, value in row.items():
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        safe[key] = value
+    return safe
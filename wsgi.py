@@ -0,0 +1,10 @@
+"""
+Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+(app.py / app.run is the single-process development server)
+"""
+from app import create_app
+import os
+
+env = os.getenv('FLASK_ENV', 'production')
+if env not in ['development', 'production', 'benchmark']: env = 'production'
+app = create_app(env)